@@ -1,8 +1,68 @@
+import os
 from flask import Flask
 from .routes import main_bp
+from .utils.openai_client_utils import OpenAIClientFactory
+from .utils.concurrency_utils import RateLimiter
+from .utils.cache_utils import DiskCache, LLMResponseCache
+from .utils.image_utils import ReferenceImageCache
+from .utils.job_store_utils import create_job_store
+from .utils.render_queue_utils import RenderQueue
+from .utils.storage_utils import StorageManager
 
-def create_app():
+def create_app(config=None):
+    """
+    Builds the app and its shared services (job store, caches, render pool,
+    storage GC) from the defaults.py settings, overridden by 'config' if
+    given (e.g. {"JOB_STORE_URL": "memory://", "STORAGE_GC_MINUTES": 0} for
+    tests). Nothing is created, and no thread started, by merely importing
+    the app package.
+    """
     app = Flask(__name__)
+    app.config.from_object("defaults")
+    app.config.update(config or {})
+    cfg = app.config
+    mb = 1024 * 1024
+
+    # One OpenAI client (and connection pool) shared by every request
+    app.extensions["openai_client"] = OpenAIClientFactory(
+        max_connections=cfg["OPENAI_MAX_CONNECTIONS"],
+        max_keepalive_connections=cfg["OPENAI_KEEPALIVE_POOL"],
+        keepalive_expiry=cfg["OPENAI_KEEPALIVE_EXPIRY"],
+        connect_timeout=cfg["OPENAI_CONNECT_TIMEOUT"],
+        read_timeout=cfg["OPENAI_READ_TIMEOUT"]
+    )
+
+    job_store = create_job_store(
+        cfg["JOB_STORE_URL"], cache_size=cfg["JOB_CACHE_SIZE"], ttl_seconds=cfg["JOB_TTL_HOURS"] * 3600
+    )
+    app.extensions["job_store"] = job_store
+    app.extensions["render_queue"] = RenderQueue(max_workers=cfg["RENDER_MAX_WORKERS"], max_queue=cfg["RENDER_MAX_QUEUE"])
+    app.extensions["image_rate_limiter"] = RateLimiter(cfg["IMAGES_PER_MINUTE"])
+    app.extensions["transcript_cache"] = DiskCache(
+        os.path.join(cfg["CACHE_DIR"], "transcripts"), max_bytes=cfg["TRANSCRIPT_CACHE_MB"] * mb, name="transcript"
+    )
+    app.extensions["llm_cache"] = LLMResponseCache(
+        os.path.join(cfg["CACHE_DIR"], "llm"),
+        max_bytes=cfg["LLM_CACHE_MB"] * mb,
+        ttl_seconds=cfg["LLM_CACHE_TTL_HOURS"] * 3600
+    ) if cfg["LLM_CACHE_ENABLED"] else None
+    app.extensions["reference_cache"] = ReferenceImageCache(
+        os.path.join(cfg["CACHE_DIR"], "references"), max_bytes=cfg["REFERENCE_CACHE_MB"] * mb
+    )
+
+    storage = StorageManager(
+        os.path.join("app", "static", "projects"),
+        job_store.get,
+        job_quota_bytes=cfg["STORAGE_JOB_QUOTA_MB"] * mb,
+        global_quota_bytes=cfg["STORAGE_TOTAL_QUOTA_MB"] * mb,
+        backup_ttl_seconds=cfg["STORAGE_BACKUP_TTL_HOURS"] * 3600,
+        orphan_ttl_seconds=cfg["STORAGE_ORPHAN_TTL_HOURS"] * 3600,
+        interval_seconds=cfg["STORAGE_GC_MINUTES"] * 60
+    )
+    app.extensions["storage"] = storage
+    # A GC interval of 0 disables the background pass (check_quota still collects)
+    if cfg["STORAGE_GC_MINUTES"] > 0:
+        storage.start()
 
     # Register the blueprint from routes.py
     app.register_blueprint(main_bp)
@@ -1,37 +1,55 @@
 import os
+import copy
 import uuid
+import shutil
 import base64
 
-from flask import Blueprint, render_template, request, jsonify
-from dotenv import load_dotenv
-from openai import OpenAI
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context, current_app
+from werkzeug.local import LocalProxy
 
-from app.utils.global_utils import log, pretty_print_api_response
-from app.utils.audio_utils import transcribe_audio, chunk_transcript
-from app.utils.video_utils import create_video_from_scenes
+from app.utils.global_utils import log, pretty_print_api_response, sse_event
+from app.utils.concurrency_utils import run_bounded
+from app.utils.audio_utils import load_transcript, build_timeline, chunk_ranges, timeline_chunks
+from app.utils.video_utils import create_video_from_scenes, rendition_path, normalize_motion, MOTION_MODES, VIDEO_ENGINES
+from app.utils.ffmpeg_utils import HLS_MASTER_PLAYLIST
+from app.utils.metrics_utils import API_METRICS, metrics_context
 from app.utils.prompt_utils import (
     preprocess_image_prompt,
     preprocess_story_data,
     generate_title_and_description,
     generate_or_edit_image
 )
-from app.utils.image_utils import process_local_image
-from defaults import (
-    WORDS_PER_SCENE,
-    TEXT_MODEL,
-    IMAGES_AI_REQUESTED_SIZE,
-    VIDEO_SIZE,
-    IMAGE_PROMPT_STYLE,
-    CHARACTERS_PROMPT_STYLE,
-    IMAGE_PREPROCESSING_PROMPT,
-    FADE_IN,
-    FADE_OUT,
-    CROSSFADE_DUR,
-    IMAGES_AI_QUALITY
+from app.utils.image_utils import (
+    process_local_image,
+    write_image_derivatives,
+    image_derivative_paths
 )
 
 main_bp = Blueprint("main", __name__)
-CURRENT_JOBS = {}
+
+def _app_service(name):
+    # Shared services are built per app in create_app (see app/__init__.py)
+    return LocalProxy(lambda: current_app.extensions[name])
+
+JOB_STORE = _app_service("job_store")
+RENDER_QUEUE = _app_service("render_queue")
+IMAGE_RATE_LIMITER = _app_service("image_rate_limiter")
+TRANSCRIPT_CACHE = _app_service("transcript_cache")
+REFERENCE_CACHE = _app_service("reference_cache")
+STORAGE = _app_service("storage")
+
+def get_openai_client():
+    """
+    Returns the app's shared OpenAI client (see OpenAIClientFactory),
+    or None if OPENAI_API_KEY is not set.
+    """
+    return current_app.extensions["openai_client"].get()
+
+def get_llm_cache():
+    """
+    Returns the app's LLM response cache, or None if LLM_CACHE_ENABLED is off.
+    """
+    return current_app.extensions["llm_cache"]
 
 def rename_with_suffix(old_path, suffix):
     """
@@ -43,21 +61,47 @@ def rename_with_suffix(old_path, suffix):
         base = base[:-4]
     return os.path.join(os.path.dirname(old_path), f"{base}{suffix}{ext}")
 
+def image_urls(image_path):
+    """
+    URLs of an image under app/static: the full-size "image_url" (for editing
+    and rendering) plus the WebP "thumb_url" and "preview_url" the storyboard
+    displays, for the derivatives written along with the image (the front-end
+    falls back to the full-size image when they are missing).
+    """
+    urls = {"image_url": f"/static/{image_path.split('app/static/')[-1]}"}
+    for name, path in image_derivative_paths(image_path).items():
+        urls[f"{name}_url"] = f"/static/{path.split('app/static/')[-1]}"
+    return urls
+
+def save_uploaded_image(file, image_path):
+    """
+    Saves an uploaded image as it is, along with its WebP derivatives.
+    """
+    file.save(image_path)
+    try:
+        write_image_derivatives(image_path)
+    except Exception as e:
+        log(f"Could not write derivatives of {image_path}: {e}", "routes")
+
 @main_bp.route("/", methods=["GET"])
 def index():
+    cfg = current_app.config
     return render_template(
         "index.html",
-        default_words_per_scene=WORDS_PER_SCENE,
-        default_text_model=TEXT_MODEL,
-        default_video_size=VIDEO_SIZE,
-        default_images_ai_requested_size=IMAGES_AI_REQUESTED_SIZE,
-        default_image_prompt_style=IMAGE_PROMPT_STYLE,
-        default_characters_prompt_style=CHARACTERS_PROMPT_STYLE,
-        default_image_preprocessing_prompt=IMAGE_PREPROCESSING_PROMPT,
-        default_fade_in=FADE_IN,
-        default_fade_out=FADE_OUT,
-        default_crossfade_dur=CROSSFADE_DUR,
-        default_image_quality=IMAGES_AI_QUALITY,
+        default_words_per_scene=cfg["WORDS_PER_SCENE"],
+        default_text_model=cfg["TEXT_MODEL"],
+        default_video_size=cfg["VIDEO_SIZE"],
+        default_images_ai_requested_size=cfg["IMAGES_AI_REQUESTED_SIZE"],
+        default_image_prompt_style=cfg["IMAGE_PROMPT_STYLE"],
+        default_characters_prompt_style=cfg["CHARACTERS_PROMPT_STYLE"],
+        default_image_preprocessing_prompt=cfg["IMAGE_PREPROCESSING_PROMPT"],
+        default_fade_in=cfg["FADE_IN"],
+        default_fade_out=cfg["FADE_OUT"],
+        default_crossfade_dur=cfg["CROSSFADE_DUR"],
+        default_image_quality=cfg["IMAGES_AI_QUALITY"],
+        default_video_engine=cfg["VIDEO_ENGINE"],
+        default_video_motion=cfg["VIDEO_MOTION"],
+        default_render_stream=cfg["RENDER_STREAM"],
     )
 
 @main_bp.route("/upload-audio", methods=["POST"])
@@ -68,33 +112,34 @@ def upload_audio():
     3) Returns the job_id + raw transcription immediately
        so the UI can display audio + transcript right away.
     """
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
+    cfg = current_app.config
+    client = get_openai_client()
+    if client is None:
         return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-
-    client = OpenAI(api_key=api_key)
     file = request.files.get("audio")
     if not file:
         return jsonify({"error": "No file uploaded"}), 400
-
-    words_per_scene_str = request.form.get("words_per_scene", f"{WORDS_PER_SCENE}").strip()
-    text_model = request.form.get("text_model", TEXT_MODEL).strip()
-    images_ai_size_str = request.form.get("images_ai_requested_size", IMAGES_AI_REQUESTED_SIZE).strip()
-    video_size_str = request.form.get("video_size", VIDEO_SIZE).strip()
+    storage_error = STORAGE.check_quota()
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
+
+    words_per_scene_str = request.form.get("words_per_scene", str(cfg["WORDS_PER_SCENE"])).strip()
+    text_model = request.form.get("text_model", cfg["TEXT_MODEL"]).strip()
+    images_ai_size_str = request.form.get("images_ai_requested_size", cfg["IMAGES_AI_REQUESTED_SIZE"]).strip()
+    video_size_str = request.form.get("video_size", cfg["VIDEO_SIZE"]).strip()
     image_prompt_style = request.form.get("image_prompt_style", "")
     characters_prompt_style = request.form.get("characters_prompt_style", "")
     image_preprocessing_prompt = request.form.get("image_preprocessing_prompt", "")
-    fade_in_str = request.form.get("fade_in", f"{FADE_IN}").strip()
-    fade_out_str = request.form.get("fade_out", f"{FADE_OUT}").strip()
-    crossfade_str = request.form.get("crossfade_dur", f"{CROSSFADE_DUR}").strip()
-    images_ai_quality = request.form.get("images_ai_quality", IMAGES_AI_QUALITY).strip()
+    fade_in_str = request.form.get("fade_in", str(cfg["FADE_IN"])).strip()
+    fade_out_str = request.form.get("fade_out", str(cfg["FADE_OUT"])).strip()
+    crossfade_str = request.form.get("crossfade_dur", str(cfg["CROSSFADE_DUR"])).strip()
+    images_ai_quality = request.form.get("images_ai_quality", cfg["IMAGES_AI_QUALITY"]).strip()
     transition_displacement_str = request.form.get("transition_displacement", "0.00")
 
     try:
         wps = int(words_per_scene_str)
     except:
-        wps = WORDS_PER_SCENE
+        wps = cfg["WORDS_PER_SCENE"]
 
     try:
         iwidth_str, iheight_str = images_ai_size_str.lower().split("x")
@@ -115,15 +160,15 @@ def upload_audio():
     try:
         fade_in_val = float(fade_in_str)
     except:
-        fade_in_val = FADE_IN
+        fade_in_val = cfg["FADE_IN"]
     try:
         fade_out_val = float(fade_out_str)
     except:
-        fade_out_val = FADE_OUT
+        fade_out_val = cfg["FADE_OUT"]
     try:
         crossfade_val = float(crossfade_str)
     except:
-        crossfade_val = CROSSFADE_DUR
+        crossfade_val = cfg["CROSSFADE_DUR"]
 
     try:
         transition_displacement_val = float(transition_displacement_str)
@@ -140,18 +185,25 @@ def upload_audio():
     audio_path = os.path.join(job_folder, file.filename)
     file.save(audio_path)
 
-    # Transcribe with Whisper (store segments in "whisper_data")
+    # Transcribe with Whisper (or reuse the cached transcript of the same audio)
     try:
-        whisper_data = transcribe_audio(client, audio_path)
+        with metrics_context(job_id=job_id, stage="transcription"):
+            transcript = load_transcript(
+                client,
+                audio_path,
+                cache=TRANSCRIPT_CACHE,
+                split_seconds=cfg["TRANSCRIBE_SPLIT_SECONDS"],
+                workers=cfg["TRANSCRIBE_WORKERS"]
+            )
     except Exception as e:
         return jsonify({"error": f"Failed to transcribe audio: {str(e)}"}), 500
 
-    full_text = whisper_data.text.strip()
+    full_text = transcript["text"]
     log(f"Full Text for {job_id}: {full_text}", "routes")
 
-    CURRENT_JOBS[job_id] = {
+    JOB_STORE.create(job_id, {
         "audio_path": audio_path,
-        "whisper_data": whisper_data,
+        "timeline": build_timeline(transcript["segments"]),
         "full_text": full_text,
         "words_per_scene": wps,
         "text_model": text_model,
@@ -175,7 +227,7 @@ def upload_audio():
         "prompts": None,
         "job_folder": job_folder,
         "reference_images": []
-    }
+    })
 
     return jsonify({
         "job_id": job_id,
@@ -185,21 +237,24 @@ def upload_audio():
 @main_bp.route("/extract-details", methods=["POST"])
 def extract_details():
     """
-    1) Takes job_id, loads the stored whisper_data,
-    2) Generates title, description, story ingredients,
-    3) Chunks the transcript,
-    4) Allocates images/prompts arrays,
-    5) Returns them.
+    1) Takes job_id, loads the stored transcript timeline,
+    2) Chunks the transcript and allocates images/prompts arrays,
+    3) Generates title/description and story ingredients concurrently
+       (neither depends on the other),
+    4) Streams each result as a server-sent event as soon as it is ready:
+      event: chunks            => {"chunks": [{"index", "raw_text", "start", "end"}]}
+      event: title             => {"title", "description"}
+      event: story_ingredients => {"story_ingredients"}
+      event: error             => {"stage", "error"}  (ends the stream)
+      event: done              => {}
     """
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
+    client = get_openai_client()
+    if client is None:
         return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-    client = OpenAI(api_key=api_key)
 
     data = request.json
     job_id = data.get("job_id")
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
 
@@ -211,39 +266,121 @@ def extract_details():
     characters_prompt_style = job_data["characters_prompt_style"]
     wps = job_data["words_per_scene"]
 
-    # 1) Title & desc
-    try:
-        td = generate_title_and_description(client, full_text, text_model)
-    except Exception as e:
-        return jsonify({"error": f"Failed to get title/description: {str(e)}"}), 500
-
-    # 2) story_ingredients
+    # Chunking is local and fast, so it is done (and validated) up front
     try:
-        si = preprocess_story_data(client, full_text, text_model, characters_prompt_style)
-    except Exception as e:
-        return jsonify({"error": f"Failed to get story ingredients: {str(e)}"}), 500
-
-    # 3) chunk
-    try:
-        chunks = chunk_transcript(job_data["whisper_data"], wps)
+        chunks = timeline_chunks(job_data["timeline"], wps)
     except Exception as e:
         return jsonify({"error": f"Failed to chunk transcript: {str(e)}"}), 500
 
     if not chunks:
         return jsonify({"error": "No chunks created."}), 500
 
-    job_data["title"] = td["title"]
-    job_data["description"] = td["description"]
-    job_data["story_ingredients"] = si
-    job_data["chunks"] = chunks
-    job_data["images"] = [None]*len(chunks)
-    job_data["prompts"] = [None]*len(chunks)
+    JOB_STORE.update(job_id, chunks=chunks, images=[None]*len(chunks), prompts=[None]*len(chunks))
 
-    return jsonify({
-        "title": td["title"],
-        "description": td["description"],
-        "story_ingredients": si,
-        "chunks": [
+    bypass_cache = bool(data.get("regenerate"))
+    llm_stages = {
+        "title": lambda: generate_title_and_description(
+            client, full_text, text_model, cache=get_llm_cache(), bypass_cache=bypass_cache
+        ),
+        "story_ingredients": lambda: preprocess_story_data(
+            client, full_text, text_model, characters_prompt_style, cache=get_llm_cache(), bypass_cache=bypass_cache
+        ),
+    }
+    stage_errors = {
+        "title": "Failed to get title/description",
+        "story_ingredients": "Failed to get story ingredients",
+    }
+
+    def run_stage(name):
+        with metrics_context(job_id=job_id, stage=name):
+            return llm_stages[name]()
+
+    def generate():
+        yield sse_event("chunks", {
+            "chunks": [
+                {
+                    "index": i,
+                    "raw_text": c["text"],
+                    "start": c["start"],
+                    "end": c["end"]
+                } for i, c in enumerate(chunks)
+            ]
+        })
+
+        for stage, result, error in run_bounded(run_stage, list(llm_stages), len(llm_stages)):
+            if error:
+                yield sse_event("error", {"stage": stage, "error": f"{stage_errors[stage]}: {str(error)}"})
+                return
+
+            if stage == "title":
+                JOB_STORE.update(job_id, title=result["title"], description=result["description"])
+                yield sse_event("title", {"title": result["title"], "description": result["description"]})
+            else:
+                JOB_STORE.update(job_id, story_ingredients=result)
+                yield sse_event("story_ingredients", {"story_ingredients": result})
+
+        yield sse_event("done", {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@main_bp.route("/rechunk", methods=["POST"])
+def rechunk():
+    """
+    Recomputes the scene boundaries for another words_per_scene from the job's
+    precomputed timeline (word-count prefix sums), cheap enough for a live
+    slider preview. Body: {"job_id", "words_per_scene", "apply"}
+
+    Without 'apply', only the preview is returned:
+      {"words_per_scene", "scene_count", "scenes": [{"index", "start", "end", "word_count"}]}
+    With "apply": true, the job switches to the new chunks (its prompts and
+    image slots are reset) and the full chunks are returned as well, like
+    /extract-details does.
+    """
+    data = request.json
+    job_id = data.get("job_id")
+    job_data = JOB_STORE.get(job_id)
+    if not job_data:
+        return jsonify({"error": "No such job"}), 400
+
+    try:
+        wps = int(data.get("words_per_scene"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid words_per_scene"}), 400
+    if wps < 1:
+        return jsonify({"error": "Invalid words_per_scene"}), 400
+
+    timeline = job_data["timeline"]
+    word_prefix = timeline["word_prefix"]
+    ranges = chunk_ranges(timeline, wps)
+    result = {
+        "words_per_scene": wps,
+        "scene_count": len(ranges),
+        "scenes": [
+            {
+                "index": i,
+                "start": timeline["starts"][first],
+                "end": timeline["ends"][end - 1],
+                "word_count": word_prefix[end] - word_prefix[first]
+            } for i, (first, end) in enumerate(ranges)
+        ]
+    }
+
+    if data.get("apply"):
+        chunks = timeline_chunks(timeline, wps)
+        if not chunks:
+            return jsonify({"error": "No chunks created."}), 500
+        JOB_STORE.update(
+            job_id,
+            words_per_scene=wps,
+            chunks=chunks,
+            images=[None]*len(chunks),
+            prompts=[None]*len(chunks)
+        )
+        result["chunks"] = [
             {
                 "index": i,
                 "raw_text": c["text"],
@@ -251,45 +388,129 @@ def extract_details():
                 "end": c["end"]
             } for i, c in enumerate(chunks)
         ]
-    })
+
+    return jsonify(result)
 
 @main_bp.route("/preprocess-chunk", methods=["POST"])
 def preprocess_chunk():
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
+    client = get_openai_client()
+    if client is None:
         return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-
-    client = OpenAI(api_key=api_key)
     data = request.json
     job_id = data.get("job_id")
     chunk_index = data.get("chunk_index")
     new_story_ingredients = data.get("story_ingredients", None)
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
 
     if new_story_ingredients is not None:
-        job_data["story_ingredients"] = new_story_ingredients
+        job_data = JOB_STORE.update(job_id, story_ingredients=new_story_ingredients)
 
     try:
         raw_text = job_data["chunks"][chunk_index]["text"]
     except (IndexError, KeyError):
         return jsonify({"error": "Invalid chunk index"}), 400
 
-    final_prompt = preprocess_image_prompt(
-        client=client,
-        full_story=job_data["full_text"],
-        story_ingredients=job_data["story_ingredients"],
-        style_prefix=job_data["image_prompt_style"],
-        scene_text=raw_text,
-        text_model=job_data["text_model"],
-        image_preprocessing_prompt=job_data["image_preprocessing_prompt"],
-        characters_prompt_style=job_data["characters_prompt_style"]
+    with metrics_context(job_id=job_id, stage="scene_prompt"):
+        final_prompt = preprocess_image_prompt(
+            client=client,
+            full_story=job_data["full_text"],
+            story_ingredients=job_data["story_ingredients"],
+            style_prefix=job_data["image_prompt_style"],
+            scene_text=raw_text,
+            text_model=job_data["text_model"],
+            image_preprocessing_prompt=job_data["image_preprocessing_prompt"],
+            characters_prompt_style=job_data["characters_prompt_style"],
+            cache=get_llm_cache(),
+            bypass_cache=bool(data.get("regenerate")),
+            on_usage=lambda usage: JOB_STORE.increment(job_id, "prompt_usage", usage)
+        )
+    job_data = JOB_STORE.set_item(job_id, "prompts", chunk_index, final_prompt)
+    return jsonify({"preprocessed_prompt": final_prompt, "prompt_usage": job_data.get("prompt_usage")})
+
+@main_bp.route("/preprocess-all", methods=["POST"])
+def preprocess_all():
+    """
+    Preprocesses the prompts of every chunk (or of 'chunk_indexes' if given)
+    on a bounded thread pool, and streams each result back as a server-sent
+    event as soon as it finishes:
+      event: prompt  => {"index", "preprocessed_prompt"}
+      event: error   => {"index", "error"}
+      event: done    => {"completed", "failed", "prompt_usage"}
+    The job's prompts are stored as results arrive. "regenerate": true skips
+    the LLM response cache (when enabled).
+    """
+    cfg = current_app.config
+    client = get_openai_client()
+    if client is None:
+        return jsonify({"error": "OPENAI_API_KEY not set"}), 500
+    data = request.json
+    job_id = data.get("job_id")
+    new_story_ingredients = data.get("story_ingredients", None)
+
+    job_data = JOB_STORE.get(job_id)
+    if not job_data:
+        return jsonify({"error": "No such job"}), 400
+    if not job_data["chunks"]:
+        return jsonify({"error": "No chunks to preprocess"}), 400
+
+    if new_story_ingredients is not None:
+        job_data = JOB_STORE.update(job_id, story_ingredients=new_story_ingredients)
+
+    try:
+        concurrency = int(data.get("concurrency", cfg["PREPROCESS_WORKERS"]))
+    except (TypeError, ValueError):
+        concurrency = cfg["PREPROCESS_WORKERS"]
+    concurrency = max(1, min(concurrency, cfg["MAX_PREPROCESS_WORKERS"]))
+
+    bypass_cache = bool(data.get("regenerate"))
+    chunk_indexes = data.get("chunk_indexes")
+    if chunk_indexes is None:
+        chunk_indexes = list(range(len(job_data["chunks"])))
+    if any(not isinstance(i, int) or i < 0 or i >= len(job_data["chunks"]) for i in chunk_indexes):
+        return jsonify({"error": "Invalid chunk index"}), 400
+
+    def preprocess_one(chunk_index):
+        with metrics_context(job_id=job_id, stage="scene_prompt"):
+            return preprocess_image_prompt(
+                client=client,
+                full_story=job_data["full_text"],
+                story_ingredients=job_data["story_ingredients"],
+                style_prefix=job_data["image_prompt_style"],
+                scene_text=job_data["chunks"][chunk_index]["text"],
+                text_model=job_data["text_model"],
+                image_preprocessing_prompt=job_data["image_preprocessing_prompt"],
+                characters_prompt_style=job_data["characters_prompt_style"],
+                cache=get_llm_cache(),
+                bypass_cache=bypass_cache,
+                on_usage=lambda usage: JOB_STORE.increment(job_id, "prompt_usage", usage)
+            )
+
+    def generate():
+        completed = 0
+        failed = 0
+        for chunk_index, final_prompt, error in run_bounded(preprocess_one, chunk_indexes, concurrency):
+            if error:
+                failed += 1
+                log(f"Preprocessing chunk #{chunk_index} of {job_id} failed: {error}", "routes")
+                yield sse_event("error", {"index": chunk_index, "error": str(error)})
+                continue
+            completed += 1
+            JOB_STORE.set_item(job_id, "prompts", chunk_index, final_prompt)
+            yield sse_event("prompt", {"index": chunk_index, "preprocessed_prompt": final_prompt})
+        yield sse_event("done", {
+            "completed": completed,
+            "failed": failed,
+            "prompt_usage": JOB_STORE.get(job_id).get("prompt_usage")
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    job_data["prompts"][chunk_index] = final_prompt
-    return jsonify({"preprocessed_prompt": final_prompt})
 
 @main_bp.route("/generate-image", methods=["POST"])
 def generate_image_route():
@@ -300,13 +521,12 @@ def generate_image_route():
       - editing a single existing scene image,
       - reference_card mode,
       - editing an existing reference card
+    References are uploaded as prepared copies (see ReferenceImageCache), and
+    responses include the job's "reference_uploads" byte counters.
     """
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
+    client = get_openai_client()
+    if client is None:
         return jsonify({"error": "OPENAI_API_KEY not set"}), 500
-
-    client = OpenAI(api_key=api_key)
     data = request.json
     job_id = data.get("job_id")
     scene_index = data.get("scene_index")
@@ -314,9 +534,12 @@ def generate_image_route():
     mode = data.get("mode", "normal")
     reference_list = data.get("references", [])
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
 
     images_folder = os.path.join(job_data["job_folder"], "images")
     os.makedirs(images_folder, exist_ok=True)
@@ -329,34 +552,27 @@ def generate_image_route():
         out_filename = f"reference-{short_uniq}.png"
         out_path = os.path.join(images_folder, out_filename)
 
-        references_paths = []
-        for ref_filename in reference_list:
-            if ref_filename.startswith("/static/default-reference-images/"):
-                default_img_abs = os.path.join(
-                    "app", "static", "default-reference-images",
-                    os.path.basename(ref_filename)
-                )
-                if os.path.isfile(default_img_abs):
-                    references_paths.append(default_img_abs)
-            else:
-                full_ref_path = os.path.join(images_folder, ref_filename)
-                if os.path.isfile(full_ref_path):
-                    references_paths.append(full_ref_path)
-
-        new_image_path = generate_or_edit_image(
-            client=client,
-            final_prompt=new_prompt,
-            reference_paths=references_paths,
-            width=job_data["images_ai_width"],
-            height=job_data["images_ai_height"],
-            quality=job_data["images_ai_quality"],
-            output_path=out_path
-        )
+        references_paths = resolve_reference_paths(reference_list, images_folder)
+
+        with metrics_context(job_id=job_id, stage="reference_image"):
+            new_image_path = generate_or_edit_image(
+                client=client,
+                final_prompt=new_prompt,
+                reference_paths=references_paths,
+                width=job_data["images_ai_width"],
+                height=job_data["images_ai_height"],
+                quality=job_data["images_ai_quality"],
+                output_path=out_path,
+                reference_cache=REFERENCE_CACHE,
+                on_references=lambda counters: JOB_STORE.increment(job_id, "reference_uploads", counters)
+            )
         if not new_image_path:
             return jsonify({"error": "Failed to generate reference image"}), 500
 
-        rel_path = new_image_path.split("app/static/")[-1]
-        return jsonify({"image_url": f"/static/{rel_path}"})
+        return jsonify({
+            **image_urls(new_image_path),
+            "reference_uploads": JOB_STORE.get(job_id).get("reference_uploads")
+        })
 
     # --------------------------------------------------
     # EDITING AN EXISTING REFERENCE CARD
@@ -380,22 +596,25 @@ def generate_image_route():
         new_ref_filename = f"reference_edit_{short_uniq}.png"
         new_full_path = os.path.join(images_folder, new_ref_filename)
 
-        new_image_path = generate_or_edit_image(
-            client=client,
-            final_prompt=new_prompt,
-            reference_paths=references_paths,
-            width=job_data["images_ai_width"],
-            height=job_data["images_ai_height"],
-            quality=job_data["images_ai_quality"],
-            output_path=new_full_path
-        )
+        with metrics_context(job_id=job_id, stage="reference_edit"):
+            new_image_path = generate_or_edit_image(
+                client=client,
+                final_prompt=new_prompt,
+                reference_paths=references_paths,
+                width=job_data["images_ai_width"],
+                height=job_data["images_ai_height"],
+                quality=job_data["images_ai_quality"],
+                output_path=new_full_path,
+                reference_cache=REFERENCE_CACHE,
+                on_references=lambda counters: JOB_STORE.increment(job_id, "reference_uploads", counters)
+            )
         if not new_image_path:
             return jsonify({"error": "Failed to edit reference image"}), 500
 
-        rel_path = new_image_path.split("app/static/")[-1]
         return jsonify({
-            "image_url": f"/static/{rel_path}",
-            "unused_old_image": f"/static/{unused_path.split('app/static/')[-1]}"
+            **image_urls(new_image_path),
+            "unused_old_image": f"/static/{unused_path.split('app/static/')[-1]}",
+            "reference_uploads": JOB_STORE.get(job_id).get("reference_uploads")
         })
 
     # --------------------------------------------------
@@ -414,56 +633,82 @@ def generate_image_route():
         new_prompt += " - Please edit the image provided. Only change what is in the prompt, it is very important to keep everything else as is."
 
         out_path = os.path.join(images_folder, f"scene_{scene_index}.png")
-        new_image_path = generate_or_edit_image(
-            client=client,
-            final_prompt=new_prompt,
-            reference_paths=references_paths,
-            width=job_data["images_ai_width"],
-            height=job_data["images_ai_height"],
-            quality=job_data["images_ai_quality"],
-            output_path=out_path
-        )
+        with metrics_context(job_id=job_id, stage="scene_edit"):
+            new_image_path = generate_or_edit_image(
+                client=client,
+                final_prompt=new_prompt,
+                reference_paths=references_paths,
+                width=job_data["images_ai_width"],
+                height=job_data["images_ai_height"],
+                quality=job_data["images_ai_quality"],
+                output_path=out_path,
+                reference_cache=REFERENCE_CACHE,
+                on_references=lambda counters: JOB_STORE.increment(job_id, "reference_uploads", counters)
+            )
         if not new_image_path:
             return jsonify({"error": "Failed to edit scene image"}), 500
 
-        job_data["images"][scene_index] = new_image_path
-        rel_path = new_image_path.split("app/static/")[-1]
+        job_data = JOB_STORE.set_item(job_id, "images", scene_index, new_image_path)
         return jsonify({
-            "image_url": f"/static/{rel_path}",
-            "unused_old_image": f"/static/{renamed_path.split('app/static/')[-1]}"
+            **image_urls(new_image_path),
+            "unused_old_image": f"/static/{renamed_path.split('app/static/')[-1]}",
+            "reference_uploads": job_data.get("reference_uploads")
         })
 
     # --------------------------------------------------
     # NORMAL MODE (NEW SCENE)
     # --------------------------------------------------
     else:
-        references_paths = []
-        for ref_filename in reference_list:
-            if ref_filename.startswith("/static/default-reference-images/"):
-                default_img_abs = os.path.join(
-                    "app", "static", "default-reference-images",
-                    os.path.basename(ref_filename)
-                )
-                if os.path.isfile(default_img_abs):
-                    references_paths.append(default_img_abs)
-            else:
-                full_ref_path = os.path.join(images_folder, ref_filename)
-                if os.path.isfile(full_ref_path):
-                    references_paths.append(full_ref_path)
+        result = generate_scene_image(client, job_id, job_data, scene_index, new_prompt, reference_list)
+        if not result:
+            return jsonify({"error": "Failed to generate image"}), 500
+        return jsonify(result)
+
+def resolve_reference_paths(reference_list, images_folder):
+    """
+    Maps the reference names sent by the front-end to existing files:
+    "/static/default-reference-images/..." entries point to the default
+    references, anything else is a file in the job's images folder.
+    """
+    references_paths = []
+    for ref_filename in reference_list:
+        if ref_filename.startswith("/static/default-reference-images/"):
+            default_img_abs = os.path.join(
+                "app", "static", "default-reference-images",
+                os.path.basename(ref_filename)
+            )
+            if os.path.isfile(default_img_abs):
+                references_paths.append(default_img_abs)
+        else:
+            full_ref_path = os.path.join(images_folder, ref_filename)
+            if os.path.isfile(full_ref_path):
+                references_paths.append(full_ref_path)
+    return references_paths
+
+def generate_scene_image(client, job_id, job_data, scene_index, new_prompt, reference_list):
+    """
+    Generates scene_{scene_index}.png (normal mode), keeping any previous image
+    as an _unused- backup. Returns its image URLs, "unused_old_image" and the
+    job's "reference_uploads" totals, or None on failure.
+    """
+    images_folder = os.path.join(job_data["job_folder"], "images")
+    os.makedirs(images_folder, exist_ok=True)
 
-        if references_paths:
-            new_prompt += " - It is very important to use the provided reference images only as a visual style guide for the image style and especially the characters design. Characters need to match perfectly with the reference images, but the final visual composition needs to be based on the prompt, and not on the images provided, since the provided images are just to show you the visual style for characters and general elements. You need to extract the visual details in them and adapt them to the current requested image, adjusting the perspective, the angle, making sure they are very consistent."
+    references_paths = resolve_reference_paths(reference_list, images_folder)
+    if references_paths:
+        new_prompt += " - It is very important to use the provided reference images only as a visual style guide for the image style and especially the characters design. Characters need to match perfectly with the reference images, but the final visual composition needs to be based on the prompt, and not on the images provided, since the provided images are just to show you the visual style for characters and general elements. You need to extract the visual details in them and adapt them to the current requested image, adjusting the perspective, the angle, making sure they are very consistent."
 
-        existing_image_path = os.path.join(images_folder, f"scene_{scene_index}.png")
-        unused_old_image = None
-        if os.path.isfile(existing_image_path):
-            short_uniq = str(uuid.uuid4())[:6]
-            renamed_path = rename_with_suffix(existing_image_path, f"_unused-{short_uniq}")
-            os.rename(existing_image_path, renamed_path)
-            renamed_rel_path = renamed_path.split("app/static/")[-1]
-            unused_old_image = f"/static/{renamed_rel_path}"
+    existing_image_path = os.path.join(images_folder, f"scene_{scene_index}.png")
+    unused_old_image = None
+    if os.path.isfile(existing_image_path):
+        short_uniq = str(uuid.uuid4())[:6]
+        renamed_path = rename_with_suffix(existing_image_path, f"_unused-{short_uniq}")
+        os.rename(existing_image_path, renamed_path)
+        renamed_rel_path = renamed_path.split("app/static/")[-1]
+        unused_old_image = f"/static/{renamed_rel_path}"
 
-        out_path = os.path.join(images_folder, f"scene_{scene_index}.png")
+    out_path = os.path.join(images_folder, f"scene_{scene_index}.png")
+    with metrics_context(job_id=job_id, stage="scene_image"):
         new_image_path = generate_or_edit_image(
             client=client,
             final_prompt=new_prompt,
@@ -471,18 +716,99 @@ def generate_image_route():
             width=job_data["images_ai_width"],
             height=job_data["images_ai_height"],
             quality=job_data["images_ai_quality"],
-            output_path=out_path
+            output_path=out_path,
+            reference_cache=REFERENCE_CACHE,
+            on_references=lambda counters: JOB_STORE.increment(job_id, "reference_uploads", counters)
         )
-        if not new_image_path:
-            return jsonify({"error": "Failed to generate image"}), 500
+    if not new_image_path:
+        return None
 
-        job_data["images"][scene_index] = new_image_path
-        rel_path = new_image_path.split("app/static/")[-1]
-        return jsonify({
-            "image_url": f"/static/{rel_path}",
-            "unused_old_image": unused_old_image
+    job_data = JOB_STORE.set_item(job_id, "images", scene_index, new_image_path)
+    return {
+        **image_urls(new_image_path),
+        "unused_old_image": unused_old_image,
+        "reference_uploads": job_data.get("reference_uploads")
+    }
+
+@main_bp.route("/generate-images-batch", methods=["POST"])
+def generate_images_batch():
+    """
+    Generates several scene images at once (normal mode).
+    Body: {"job_id", "scenes": [{"scene_index", "prompt", "references"}], "concurrency"}
+
+    Scenes run on a bounded thread pool, and every API call waits for the
+    shared IMAGE_RATE_LIMITER so the account's images-per-minute limit holds
+    across concurrent batches. Each scene_{i}.png is written as soon as it
+    arrives, and progress is streamed as server-sent events:
+      event: image  => {"scene_index", "image_url", "thumb_url", "preview_url", "unused_old_image"}
+      event: error  => {"scene_index", "error"}
+      event: done   => {"completed", "failed", "reference_uploads"}
+    """
+    cfg = current_app.config
+    client = get_openai_client()
+    if client is None:
+        return jsonify({"error": "OPENAI_API_KEY not set"}), 500
+
+    data = request.json
+    job_id = data.get("job_id")
+    scenes = data.get("scenes", [])
+
+    job_data = JOB_STORE.get(job_id)
+    if not job_data:
+        return jsonify({"error": "No such job"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
+    if not scenes:
+        return jsonify({"error": "No scenes requested"}), 400
+    scene_count = len(job_data["images"] or [])
+    for scene in scenes:
+        if not isinstance(scene.get("scene_index"), int) or not 0 <= scene["scene_index"] < scene_count:
+            return jsonify({"error": "Invalid scene index"}), 400
+        if not scene.get("prompt"):
+            return jsonify({"error": f"Missing prompt for scene {scene['scene_index']}"}), 400
+    # Two requests for one scene would race over the same scene_{i}.png
+    if len({scene["scene_index"] for scene in scenes}) != len(scenes):
+        return jsonify({"error": "Each scene can only be requested once per batch"}), 400
+
+    try:
+        concurrency = int(data.get("concurrency", cfg["IMAGE_BATCH_WORKERS"]))
+    except (TypeError, ValueError):
+        concurrency = cfg["IMAGE_BATCH_WORKERS"]
+    concurrency = max(1, min(concurrency, cfg["MAX_IMAGE_BATCH_WORKERS"]))
+
+    def generate_one(scene):
+        IMAGE_RATE_LIMITER.acquire()
+        result = generate_scene_image(
+            client, job_id, job_data, scene["scene_index"], scene["prompt"], scene.get("references", [])
+        )
+        if not result:
+            raise RuntimeError("Failed to generate image")
+        return result
+
+    def generate():
+        completed = 0
+        failed = 0
+        for scene, result, error in run_bounded(generate_one, scenes, concurrency):
+            if error:
+                failed += 1
+                yield sse_event("error", {"scene_index": scene["scene_index"], "error": str(error)})
+                continue
+            completed += 1
+            yield sse_event("image", {"scene_index": scene["scene_index"], **result})
+        job_data = JOB_STORE.get(job_id) or {}
+        yield sse_event("done", {
+            "completed": completed,
+            "failed": failed,
+            "reference_uploads": job_data.get("reference_uploads")
         })
 
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @main_bp.route("/upload-local-image", methods=["POST"])
 def upload_local_image():
     job_id = request.form.get("job_id")
@@ -491,9 +817,12 @@ def upload_local_image():
     if not job_id or scene_index is None:
         return jsonify({"error": "Missing job_id or scene_index"}), 400
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
 
     image_file = request.files.get("image_file")
     if not image_file:
@@ -507,9 +836,8 @@ def upload_local_image():
         short_uniq = str(uuid.uuid4())[:6]
         ref_filename = f"reference-{short_uniq}.png"
         ref_path = os.path.join(images_folder, ref_filename)
-        image_file.save(ref_path)
-        rel_path = ref_path.split("app/static/")[-1]
-        return jsonify({"image_url": f"/static/{rel_path}"})
+        save_uploaded_image(image_file, ref_path)
+        return jsonify(image_urls(ref_path))
 
     # OVERLAY mode
     if mode == "scene_overlay":
@@ -601,22 +929,19 @@ def upload_local_image():
     except Exception as e:
         return jsonify({"error": f"Could not process/crop image: {str(e)}"}), 500
 
-    job_data["images"][int(scene_index)] = output_path
+    JOB_STORE.set_item(job_id, "images", int(scene_index), output_path)
 
     add_ref = request.form.get("crop_add_ref", "false").lower() == "true"
     added_ref_filename = None
     if add_ref:
         # We'll store the final scene_{scene_index}.png in reference_images
         scene_png = f"scene_{scene_index}.png"
-        if scene_png not in job_data["reference_images"]:
-            job_data["reference_images"].append(scene_png)
+        if JOB_STORE.append_item(job_id, "reference_images", scene_png):
             added_ref_filename = scene_png
 
-    rel_path = output_path.split("app/static/")[-1]
-
     # If we added to references, we return that info so front-end can update the thumbs
     return jsonify({
-        "image_url": f"/static/{rel_path}",
+        **image_urls(output_path),
         "unused_old_image": unused_old_image,
         "added_ref_filename": added_ref_filename  # may be None if not added
     })
@@ -626,15 +951,19 @@ def upload_reference_image():
     """
     Allows uploading reference images (files) for the job,
     stored in the images/ subfolder, appended to job_data["reference_images"].
-    Returns the filename used to store it, which front-end can attach to references.
+    Returns the filename used to store it, which front-end can attach to
+    references, and its image URLs (see image_urls).
     """
     job_id = request.form.get("job_id", "")
     if not job_id:
         return jsonify({"error": "No job_id provided"}), 400
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
 
     ref_file = request.files.get("reference_file")
     if not ref_file:
@@ -646,52 +975,303 @@ def upload_reference_image():
     os.makedirs(images_folder, exist_ok=True)
     ref_path = os.path.join(images_folder, ref_filename)
 
-    ref_file.save(ref_path)
-    job_data["reference_images"].append(ref_filename)
+    save_uploaded_image(ref_file, ref_path)
+    JOB_STORE.append_item(job_id, "reference_images", ref_filename)
 
-    return jsonify({"reference_path": ref_filename})
+    return jsonify({"reference_path": ref_filename, **image_urls(ref_path)})
 
 @main_bp.route("/create-video", methods=["POST"])
 def create_video_endpoint():
+    """
+    Queues the render in the background render pool and returns a render_id
+    right away. Poll /render-status/<render_id> for phase and progress.
+    "draft": true renders a low resolution, low frame rate preview to
+    {job_id}-draft.mp4 instead, so the final video is never overwritten.
+    "vfr": true (ffmpeg engine) writes a variable frame rate MP4 that stores
+    the still holds as a few long frames.
+    "stream": true (ffmpeg engine) also publishes the render as a growing HLS
+    playlist; its "stream_url" is returned right away and can be played once
+    the first segment is written (the URL answers 404 until then). Streaming
+    renders in one process, without the segment workers or the render cache.
+    "renditions": ["1280x720", "1080x1920", ...] renders those sizes in the
+    same pass; their "rendition_urls" are returned right away too.
+    "motion": "kenburns" pans/zooms the scenes (see /scene-motion for one scene).
+    """
+    cfg = current_app.config
     data = request.json
     job_id = data.get("job_id")
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
 
-    chunks = job_data["chunks"]
-    audio_path = job_data["audio_path"]
+    engine = data.get("engine", cfg["VIDEO_ENGINE"])
+    if engine not in VIDEO_ENGINES:
+        return jsonify({"error": f"Unknown render engine: {engine}"}), 400
+    try:
+        workers = max(1, int(data.get("workers", cfg["RENDER_SEGMENT_WORKERS"])))
+    except (TypeError, ValueError):
+        workers = cfg["RENDER_SEGMENT_WORKERS"]
+    incremental = bool(data.get("incremental", cfg["RENDER_INCREMENTAL_CACHE"]))
+    draft = bool(data.get("draft"))
+    vfr = bool(data.get("vfr", cfg["RENDER_VFR"]))
+    motion = data.get("motion", cfg["VIDEO_MOTION"])
+    if motion not in MOTION_MODES:
+        return jsonify({"error": f"Unknown motion mode: {motion}"}), 400
+    output_name = f"{job_id}-draft.mp4" if draft else f"{job_id}.mp4"
+    output_video_path = os.path.join(job_data["job_folder"], output_name)
+
+    # Positive even sizes (yuv420p needs them); the main size is the video itself
+    renditions = []
+    for size in data.get("renditions", cfg["VIDEO_RENDITIONS"]) or []:
+        try:
+            rwidth_str, rheight_str = str(size).lower().split("x")
+            rwidth, rheight = int(rwidth_str), int(rheight_str)
+        except ValueError:
+            return jsonify({"error": f"Invalid rendition size: {size}"}), 400
+        if rwidth <= 0 or rheight <= 0 or rwidth % 2 or rheight % 2:
+            return jsonify({"error": f"Rendition sizes must be positive even numbers: {size}"}), 400
+        if (rwidth, rheight) != (job_data["video_width"], job_data["video_height"]) and (rwidth, rheight) not in renditions:
+            renditions.append((rwidth, rheight))
+
+    # A new folder per render, so a player never picks up the previous render's playlist
+    stream_folder = None
+    if data.get("stream", cfg["RENDER_STREAM"]) and engine == "ffmpeg":
+        short_uniq = str(uuid.uuid4())[:6]
+        stream_folder = os.path.join(job_data["job_folder"], "stream", short_uniq)
+
+    render_id = RENDER_QUEUE.submit(
+        job_id,
+        render_job_video,
+        job_id=job_id,
+        output_video_path=output_video_path,
+        engine=engine,
+        workers=workers,
+        incremental=incremental,
+        draft=draft,
+        vfr=vfr,
+        stream_folder=stream_folder,
+        renditions=renditions,
+        motion=motion
+    )
+    if not render_id:
+        return jsonify({"error": "Render queue is full, please try again later", **RENDER_QUEUE.stats()}), 429
+
+    response = {
+        "render_id": render_id,
+        "status_url": f"/render-status/{render_id}"
+    }
+    if stream_folder:
+        master_path = os.path.join(stream_folder, HLS_MASTER_PLAYLIST)
+        response["stream_url"] = f"/static/{master_path.split('app/static/')[-1]}"
+    if renditions and not draft:
+        response["rendition_urls"] = {
+            f"{w}x{h}": f"/static/{rendition_path(output_video_path, w, h).split('app/static/')[-1]}"
+            for w, h in renditions
+        }
+    return jsonify(response), 202
+
+def render_job_video(
+    job_id, output_video_path, engine, workers=1, incremental=False, draft=False, vfr=False,
+    stream_folder=None, renditions=None, motion="static", progress_callback=None
+):
+    """
+    Runs inside a render worker: renders the job's scenes (as stored when the
+    render starts) and stores the video path (draft_video_path for drafts).
+    With 'incremental', encoded scene segments are kept in the job's render_cache
+    folder so the next render only re-encodes the scenes that changed.
+    The HLS playlists of earlier renders are removed first (all but 'stream_folder').
+    Extra 'renditions' are stored as rendition_paths ({"WxH": path}).
+    Returns the video URL and the engine that rendered it (drafts always
+    render with ffmpeg).
+    """
+    job_data = JOB_STORE.get(job_id)
+    if not job_data:
+        raise RuntimeError("Job no longer exists")
+    streams_root = os.path.join(job_data["job_folder"], "stream")
+    if not draft and os.path.isdir(streams_root):
+        for name in os.listdir(streams_root):
+            if not stream_folder or name != os.path.basename(stream_folder):
+                shutil.rmtree(os.path.join(streams_root, name), ignore_errors=True)
     images_folder = os.path.join(job_data["job_folder"], "images")
-    output_video_path = os.path.join(job_data["job_folder"], f"{job_id}.mp4")
+    cache_folder = os.path.join(job_data["job_folder"], "render_cache") if incremental else None
+    render_stats = {}
+    # The stored job is a shared snapshot; the renderer adjusts chunk timings in place
+    result_path = create_video_from_scenes(
+        copy.deepcopy(job_data["chunks"]),
+        images_folder,
+        job_data["audio_path"],
+        output_video_path,
+        job_data["video_width"],
+        job_data["video_height"],
+        fade_in=job_data["fade_in"],
+        fade_out=job_data["fade_out"],
+        crossfade_dur=job_data["crossfade_dur"],
+        transition_displacement=job_data["transition_displacement"],
+        engine=engine,
+        progress_callback=progress_callback,
+        workers=workers,
+        cache_folder=cache_folder,
+        draft=draft,
+        vfr=vfr,
+        stream_folder=stream_folder,
+        renditions=renditions,
+        motion=motion,
+        render_stats=render_stats
+    )
+    if not result_path:
+        raise RuntimeError("No valid scenes to render")
 
-    try:
-        create_video_from_scenes(
-            chunks,
-            images_folder,
-            audio_path,
-            output_video_path,
-            job_data["video_width"],
-            job_data["video_height"],
-            fade_in=job_data["fade_in"],
-            fade_out=job_data["fade_out"],
-            crossfade_dur=job_data["crossfade_dur"],
-            transition_displacement=job_data["transition_displacement"]
+    engine_used = render_stats["engine_used"]
+    if draft:
+        JOB_STORE.update(job_id, draft_video_path=result_path)
+    else:
+        JOB_STORE.update(
+            job_id,
+            video_path=result_path,
+            video_engine=engine_used,
+            rendition_paths={
+                f"{w}x{h}": rendition_path(result_path, w, h)
+                for w, h in renditions or []
+                if (w, h) != (job_data["video_width"], job_data["video_height"])
+            }
         )
-    except Exception as e:
-        return jsonify({"error": f"Failed to create video: {str(e)}"}), 500
+    rel_path = result_path.split("app/static/")[-1]
+    return {"video_url": f"/static/{rel_path}", "engine_used": engine_used}
+
+@main_bp.route("/scene-motion", methods=["POST"])
+def scene_motion():
+    """
+    Sets the Ken Burns motion of one scene: {"zoom": [start, end],
+    "pan": [[x, y], [x, y]]} (see video_utils.normalize_motion), used whatever
+    the render's "motion" mode. A null motion drops the scene's own setting.
+    """
+    data = request.json
+    job_id = data.get("job_id")
+    chunk_index = data.get("chunk_index")
+    job_data = JOB_STORE.get(job_id)
+    if not job_data:
+        return jsonify({"error": "No such job"}), 400
+
+    # A negative index would silently edit a scene counted from the end
+    if not isinstance(chunk_index, int) or not 0 <= chunk_index < len(job_data["chunks"]):
+        return jsonify({"error": "Invalid chunk index"}), 400
+    try:
+        motion = normalize_motion(data.get("motion"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    chunk = dict(job_data["chunks"][chunk_index])
+
+    if data.get("motion") is None:
+        chunk.pop("motion", None)
+    else:
+        # A static motion is stored too, so it overrides "kenburns" mode
+        chunk["motion"] = motion or {"zoom": [1.0, 1.0], "pan": [[0.5, 0.5], [0.5, 0.5]]}
+    JOB_STORE.set_item(job_id, "chunks", chunk_index, chunk)
+    return jsonify({"chunk_index": chunk_index, "motion": chunk.get("motion")})
+
+@main_bp.route("/render-status/<render_id>", methods=["GET"])
+def render_status(render_id):
+    status = RENDER_QUEUE.status(render_id)
+    if not status:
+        return jsonify({"error": "No such render"}), 404
+
+    result = status.pop("result", None)
+    if status["phase"] == "done":
+        status.update(result)
+    return jsonify(status)
+
+@main_bp.route("/openai-stats", methods=["GET"])
+def openai_stats():
+    """
+    Connection reuse and latency of the shared OpenAI client.
+    """
+    return jsonify(current_app.extensions["openai_client"].stats())
 
-    job_data["video_path"] = output_video_path
-    rel_path = output_video_path.split("app/static/")[-1]
-    return jsonify({"video_url": f"/static/{rel_path}"})
+@main_bp.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    """
+    Hit/miss counters and sizes of the transcript, LLM response and reference
+    image caches (the LLM one also reports the tokens its hits saved, the
+    reference one the upload bytes).
+    """
+    return jsonify({
+        "transcripts": TRANSCRIPT_CACHE.stats(),
+        "references": REFERENCE_CACHE.stats(),
+        "llm": get_llm_cache().stats() if get_llm_cache() else None
+    })
+
+@main_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus text exposition: OpenAI call counters (requests, errors,
+    retries, tokens, images, audio seconds, estimated cost) by endpoint,
+    model, stage and job, a latency histogram, plus render queue, cache,
+    storage and connection pool gauges.
+    """
+    lines = API_METRICS.prometheus_lines()
+
+    render = RENDER_QUEUE.stats()
+    lines.append("# TYPE render_queue_jobs gauge")
+    lines.append(f'render_queue_jobs{{state="queued"}} {render["queue_depth"]}')
+    lines.append(f'render_queue_jobs{{state="active"}} {render["active_renders"]}')
+
+    caches = {
+        "transcripts": TRANSCRIPT_CACHE.stats(),
+        "references": REFERENCE_CACHE.stats(),
+        "llm": get_llm_cache().stats() if get_llm_cache() else None
+    }
+    for name, metric in (("hits", "cache_hits_total"), ("misses", "cache_misses_total"), ("bytes", "cache_bytes")):
+        lines.append(f"# TYPE {metric} {'gauge' if name == 'bytes' else 'counter'}")
+        for cache_name, stats in caches.items():
+            if stats:
+                lines.append(f'{metric}{{cache="{cache_name}"}} {stats[name]}')
+
+    lines.append("# TYPE storage_bytes gauge")
+    lines.append(f"storage_bytes {STORAGE.stats()['total_bytes']}")
+
+    pool = current_app.extensions["openai_client"].stats()
+    lines.append("# TYPE openai_connections_total counter")
+    lines.append(f'openai_connections_total{{kind="new"}} {pool["new_connections"]}')
+    lines.append(f'openai_connections_total{{kind="reused"}} {pool["reused_connections"]}')
+
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@main_bp.route("/metrics/job/<job_id>", methods=["GET"])
+def job_metrics(job_id):
+    """
+    Per-stage OpenAI totals of one job (JSON), e.g. cost of its scene images.
+    """
+    return jsonify(API_METRICS.job_summary(job_id))
 
 @main_bp.route("/cancel-job", methods=["POST"])
 def cancel_job():
+    """
+    Forgets the job and flags its project folder for removal by the storage GC.
+    """
     data = request.json
     job_id = data.get("job_id")
-    if job_id in CURRENT_JOBS:
-        del CURRENT_JOBS[job_id]
+    if job_id:
+        JOB_STORE.delete(job_id)
+        STORAGE.mark_cancelled(job_id)
     return jsonify({"status": "cancelled"})
 
+@main_bp.route("/storage-stats", methods=["GET"])
+def storage_stats():
+    """
+    Disk usage of the project folders against the quotas; with ?job_id=...
+    also that job's usage. ?collect=1 runs a GC pass first.
+    """
+    if request.args.get("collect"):
+        STORAGE.collect()
+    stats = STORAGE.stats()
+    job_id = request.args.get("job_id")
+    if job_id:
+        stats["job_bytes"] = STORAGE.job_usage(job_id)
+    return jsonify(stats)
+
 @main_bp.route("/list-default-references", methods=["GET"])
 def list_default_references():
     """
@@ -711,7 +1291,7 @@ def list_default_references():
 def add_reference():
     """
     Add an existing image (already in the job folder 'images' or default references)
-    to the job's reference_images list.
+    to the job's reference_images list. Job images also get their image URLs back.
     """
     data = request.json
     job_id = data.get("job_id")
@@ -719,19 +1299,19 @@ def add_reference():
     if not job_id or not ref_path:
         return jsonify({"error": "Missing job_id or ref_path"}), 400
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
 
     if ref_path.startswith("/static/default-reference-images/"):
-        if ref_path not in job_data["reference_images"]:
-            job_data["reference_images"].append(ref_path)
-    else:
-        base_name = os.path.basename(ref_path)
-        if base_name not in job_data["reference_images"]:
-            job_data["reference_images"].append(base_name)
+        JOB_STORE.append_item(job_id, "reference_images", ref_path)
+        return jsonify({"status": "ok"})
 
-    return jsonify({"status": "ok"})
+    ref_filename = os.path.basename(ref_path)
+    JOB_STORE.append_item(job_id, "reference_images", ref_filename)
+    full_path = os.path.join(job_data["job_folder"], "images", ref_filename)
+    urls = image_urls(full_path) if os.path.isfile(full_path) else {}
+    return jsonify({"status": "ok", **urls})
 
 # NEW route to merge an overlay over a scene
 from app.utils.image_utils import overlay_images
@@ -748,7 +1328,7 @@ def overlay_scene_image():
     overlay_filename = data.get("overlay_filename", "")
     opacity_str = data.get("opacity", "80")
 
-    job_data = CURRENT_JOBS.get(job_id)
+    job_data = JOB_STORE.get(job_id)
     if not job_data:
         return jsonify({"error": "No such job"}), 400
 
@@ -759,6 +1339,9 @@ def overlay_scene_image():
         return jsonify({"error": "Base scene image not found"}), 400
     if not os.path.isfile(overlay_path):
         return jsonify({"error": "Overlay file not found"}), 400
+    storage_error = STORAGE.check_quota(job_id)
+    if storage_error:
+        return jsonify({"error": storage_error}), 507
 
     try:
         opacity_val = float(opacity_str)
@@ -779,10 +1362,9 @@ def overlay_scene_image():
     except Exception as e:
         return jsonify({"error": f"Could not overlay images: {str(e)}"}), 500
 
-    job_data["images"][int(scene_index)] = scene_path
-    rel_path = scene_path.split("app/static/")[-1]
+    JOB_STORE.set_item(job_id, "images", int(scene_index), scene_path)
 
     return jsonify({
-        "image_url": f"/static/{rel_path}",
+        **image_urls(scene_path),
         "unused_old_image": f"/static/{backup_scene_path.split('app/static/')[-1]}"
     })
@@ -19,6 +19,10 @@ window.chunkProcessingStatus = null;
 window.scenesContainer = null;
 window.videoGenerationSection = null;
 window.generateVideoBtn = null;
+window.previewVideoBtn = null;
+window.videoEngineSelect = null;
+window.videoMotionSelect = null;
+window.videoStreamCheckbox = null;
 window.videoProgress = null;
 window.finalVideoSection = null;
 window.finalVideoSource = null;
@@ -120,6 +124,37 @@ window.formatDuration = function(startSec, endSec) {
     return `from ${s} to ${e}`;
 };
 
+// Utility: readEventStream
+// Reads a text/event-stream fetch response and calls onEvent(eventName, data)
+// for every event (awaited, so handlers may be async), with data parsed from JSON.
+window.readEventStream = async function(resp, onEvent) {
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+
+            let eventName = 'message';
+            let dataLines = [];
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (dataLines.length) {
+                await onEvent(eventName, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+};
+
 // Utility: resetUI
 window.resetUI = function() {
     window.currentJobId = null;
@@ -154,12 +189,20 @@ window.resetUI = function() {
         generateVideoBtn.disabled = true;
         generateVideoBtn.style.display = 'inline-block';
     }
+    if (previewVideoBtn) {
+        previewVideoBtn.disabled = false;
+        previewVideoBtn.style.display = 'inline-block';
+    }
     if (videoProgress) {
         videoProgress.style.display = 'none';
         videoProgress.textContent = '';
     }
     if (finalVideoSource) finalVideoSource.src = '';
-    if (finalVideo) finalVideo.load();
+    if (finalVideo) {
+        // A streamed render plays from the video's own src
+        finalVideo.removeAttribute('src');
+        finalVideo.load();
+    }
     if (finalVideoPathEl) finalVideoPathEl.textContent = '';
 
     if (mainHeader) mainHeader.textContent = "Make your story alive";
@@ -190,6 +233,10 @@ document.addEventListener('DOMContentLoaded', function() {
 
     window.videoGenerationSection = document.getElementById('video-generation-section');
     window.generateVideoBtn       = document.getElementById('generate-video-btn');
+    window.previewVideoBtn        = document.getElementById('preview-video-btn');
+    window.videoEngineSelect      = document.getElementById('video-engine');
+    window.videoMotionSelect      = document.getElementById('video-motion');
+    window.videoStreamCheckbox    = document.getElementById('video-stream');
     window.videoProgress          = document.getElementById('video-progress');
 
     window.finalVideoSection      = document.getElementById('final-video-section');
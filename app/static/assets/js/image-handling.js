@@ -192,6 +192,12 @@ function closeEditModal() {
     }
 }
 
+/** Shows the WebP preview of a server image, keeping the full-size URL in data-fullsrc for editing */
+function showServerImage(imgEl, data) {
+    imgEl.src = data.preview_url || (data.image_url + "?t=" + Date.now());
+    imgEl.setAttribute("data-fullsrc", data.image_url);
+}
+
 async function processImageResponse(response, sceneCard, editBtn) {
     const data = await response.json();
     if (data.error) {
@@ -202,7 +208,7 @@ async function processImageResponse(response, sceneCard, editBtn) {
     if (sceneCard) {
         const imgEl = sceneCard.querySelector('figure img');
         if (imgEl) {
-            imgEl.src = data.image_url + "?t=" + Date.now();
+            showServerImage(imgEl, data);
         }
     }
 
@@ -235,7 +241,7 @@ async function doEditReferenceImage(imgEl, attempt = 1) {
         newEditPrompt = "Refine this reference image";
     }
 
-    const srcNoQ = imgEl.src.split("?")[0];
+    const srcNoQ = (imgEl.getAttribute("data-fullsrc") || imgEl.src).split("?")[0];
     const relativePath = srcNoQ.replace(/^.*\/static\//, "");
     const oldRefFilename = relativePath.split("/").pop();
 
@@ -262,7 +268,7 @@ async function doEditReferenceImage(imgEl, attempt = 1) {
             return;
         }
 
-        imgEl.src = result.data.image_url + "?t=" + Date.now();
+        showServerImage(imgEl, result.data);
         showReferenceImageModal(result.data.image_url);
 
     } catch (err) {
@@ -385,11 +391,12 @@ async function addReference(refPath) {
     if (!window.currentJobId) return;
     const body = { job_id: window.currentJobId, ref_path: refPath };
     try {
-        await fetch("/add-reference", {
+        const resp = await fetch("/add-reference", {
             method: "POST",
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(body)
         });
+        const data = await resp.json();
 
         const isDefault = refPath.startsWith("/static/default-reference-images/");
         if (isDefault) {
@@ -413,6 +420,8 @@ async function addReference(refPath) {
                 referenceImagesLocal.push({
                     filename: bname,
                     url: finalURL,
+                    thumb_url: data.thumb_url,
+                    preview_url: data.preview_url,
                     selected: true
                 });
             }
@@ -453,6 +462,8 @@ async function handleUploadReferenceFiles() {
             referenceImagesLocal.push({
                 filename: data.reference_path,
                 url: finalURL,
+                thumb_url: data.thumb_url,
+                preview_url: data.preview_url,
                 selected: true
             });
             updateReferenceFilesList();
@@ -485,7 +496,7 @@ function updateReferenceFilesList() {
         wrapper.appendChild(removeBtn);
 
         const img = document.createElement("img");
-        img.src = ref.url;
+        img.src = ref.thumb_url || ref.url;
         img.className = "ref-thumb";
 
         if (ref.selected) {
@@ -510,7 +521,7 @@ function updateReferenceFilesList() {
         let hoverTimer = null;
         img.addEventListener("mouseenter", () => {
             hoverTimer = setTimeout(() => {
-                showReferencePreview(ref.url);
+                showReferencePreview(ref.preview_url || ref.url);
             }, 300);
         });
         img.addEventListener("mouseleave", () => {
@@ -639,7 +650,7 @@ window.handleGenerateImage = async function(sceneIndex, textArea, imgEl, regenBt
             return;
         }
 
-        imgEl.src = result.data.image_url + "?t=" + Date.now();
+        showServerImage(imgEl, result.data);
 
         if (!sceneGenerated[sceneIndex]) {
             sceneGenerated[sceneIndex] = true;
@@ -776,7 +787,7 @@ async function doCropConfirm() {
             const sceneCard = document.getElementById(`scene-card-${sceneIndex}`);
             if (sceneCard) {
                 const figureEl = sceneCard.querySelector('figure img');
-                figureEl.src = data.image_url + '?t=' + Date.now();
+                showServerImage(figureEl, data);
 
                 const overlayBtn = sceneCard.querySelector('.overlay-btn');
                 if (overlayBtn) {
@@ -835,7 +846,7 @@ async function applyOverlayToScene(sceneIndex, overlayFilename, opacityVal) {
             const sceneCard = document.getElementById(`scene-card-${sceneIndex}`);
             if (sceneCard) {
                 const figureEl = sceneCard.querySelector('figure img');
-                figureEl.src = data.image_url + '?t=' + Date.now();
+                showServerImage(figureEl, data);
             }
         }
     } catch (err) {
@@ -908,7 +919,7 @@ window.handleGenerateReferenceCardImage = async function(textArea, imgEl, button
             return;
         }
 
-        imgEl.src = result.data.image_url + "?t=" + Date.now();
+        showServerImage(imgEl, result.data);
         showReferenceImageModal(result.data.image_url);
 
         editBtn.style.display = 'inline-block';
@@ -969,7 +980,7 @@ window.handleSelectLocalReferenceImage = function(imgEl, editRefBtn) {
                 buttonsManager.handleAction('finish_generation');
                 return;
             }
-            imgEl.src = data.image_url + "?t=" + Date.now();
+            showServerImage(imgEl, data);
             showReferenceImageModal(data.image_url);
 
             editRefBtn.style.display = 'inline-block';
@@ -17,14 +17,12 @@ document.addEventListener('DOMContentLoaded', function() {
 
         const updatedIngredients = storyIngredientsTextarea.value || "";
 
-        // For each scene
-        for (let i = 0; i < window.totalScenes; i++) {
-            const finalPrompt = await preprocessChunk(window.currentJobId, i, updatedIngredients);
-            const sceneCard = document.getElementById(`scene-card-${i}`);
-            if (sceneCard) {
-                fillPromptTab(sceneCard, finalPrompt);
-            }
-            chunkProcessingStatus.textContent = `Generated prompt for scene ${i + 1} of ${window.totalScenes}`;
+        // All scenes at once: the server preprocesses them concurrently
+        // and streams every prompt back as soon as it is ready
+        try {
+            await preprocessAllChunks(window.currentJobId, updatedIngredients);
+        } catch (err) {
+            console.error("Error generating prompts:", err);
         }
 
         // Done with prompt generation
@@ -38,6 +36,37 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+async function preprocessAllChunks(jobId, storyIngr) {
+    const resp = await fetch('/preprocess-all', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            job_id: jobId,
+            story_ingredients: storyIngr
+        })
+    });
+    if (!resp.ok) {
+        const data = await resp.json();
+        throw data.error;
+    }
+
+    let finished = 0;
+    await readEventStream(resp, (eventName, data) => {
+        if (eventName === 'prompt') {
+            const sceneCard = document.getElementById(`scene-card-${data.index}`);
+            if (sceneCard) {
+                fillPromptTab(sceneCard, data.preprocessed_prompt);
+            }
+        } else if (eventName === 'error') {
+            console.error(`Error generating prompt for scene ${data.index + 1}:`, data.error);
+        }
+        if (eventName === 'prompt' || eventName === 'error') {
+            finished++;
+            chunkProcessingStatus.textContent = `Generated prompt for ${finished} of ${window.totalScenes} scenes`;
+        }
+    });
+}
+
 async function preprocessChunk(jobId, chunkIndex, storyIngr) {
     const resp = await fetch('/preprocess-chunk', {
         method: 'POST',
@@ -79,7 +79,8 @@ async function handleAudioUpload() {
     }
 }
 
-// Step 2: /extract-details => get final data
+// Step 2: /extract-details => streamed results (chunks, then title and
+// story ingredients in whichever order the server finishes them)
 async function extractDetails(jobId) {
     try {
         const resp = await fetch('/extract-details', {
@@ -87,54 +88,71 @@ async function extractDetails(jobId) {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ job_id: jobId })
         });
-        const data = await resp.json();
-        if (data.error) {
+        if (!resp.ok) {
+            const data = await resp.json();
             alert(data.error);
             resetUI();
             return;
         }
 
-        whisperLoading.style.display = 'none';
-        mainHeader.textContent = data.title;
-        storyDescription.textContent = data.description;
-        storyDescription.style.display = 'block';
+        let failed = false;
+        await readEventStream(resp, async (eventName, data) => {
+            if (eventName === 'chunks') {
+                await buildStoryboard(jobId, data.chunks);
+            } else if (eventName === 'title') {
+                mainHeader.textContent = data.title;
+                storyDescription.textContent = data.description;
+                storyDescription.style.display = 'block';
+            } else if (eventName === 'story_ingredients') {
+                storyIngredientsTextarea.value = data.story_ingredients;
+                storyIngredientsContainer.style.display = 'block';
+            } else if (eventName === 'error') {
+                failed = true;
+                alert(data.error);
+            }
+        });
 
-        storyIngredientsTextarea.value = data.story_ingredients;
-        storyIngredientsContainer.style.display = 'block';
+        if (failed) {
+            resetUI();
+            return;
+        }
+        whisperLoading.style.display = 'none';
+    } catch (err) {
+        console.error("Error extracting details:", err);
+        alert("Could not extract details");
+        resetUI();
+    }
+}
 
-        chunksData = data.chunks;
-        totalScenes = data.chunks.length;
-        imagesGenerated = 0;
-        sceneGenerated = new Array(totalScenes).fill(false);
-        scenesContainer.innerHTML = '';
+async function buildStoryboard(jobId, chunks) {
+    chunksData = chunks;
+    totalScenes = chunks.length;
+    imagesGenerated = 0;
+    sceneGenerated = new Array(totalScenes).fill(false);
+    scenesContainer.innerHTML = '';
 
-        currentJobId = jobId;
+    currentJobId = jobId;
 
-        // First: create the "Reference Generator Card"
-        createReferenceGeneratorCard();
+    // First: create the "Reference Generator Card"
+    createReferenceGeneratorCard();
 
-        // Then create all scene cards
-        for (let i = 0; i < totalScenes; i++) {
-            const { index } = data.chunks[i];
-            const sceneCard = createSceneCard(index);
-            scenesContainer.appendChild(sceneCard);
-        }
+    // Then create all scene cards
+    for (let i = 0; i < totalScenes; i++) {
+        const { index } = chunks[i];
+        const sceneCard = createSceneCard(index);
+        scenesContainer.appendChild(sceneCard);
+    }
 
-        // Show references bar now that everything is processed
-        const refBar = document.getElementById("reference-bar");
-        if (refBar) {
-            refBar.style.display = "flex";
-        }
+    // Show references bar now that the scenes exist
+    const refBar = document.getElementById("reference-bar");
+    if (refBar) {
+        refBar.style.display = "flex";
+    }
 
-        // Preload default references
-        await preloadDefaultReferences();
+    // Preload default references
+    await preloadDefaultReferences();
 
-        videoGenerationSection.style.display = 'none';
-    } catch (err) {
-        console.error("Error extracting details:", err);
-        alert("Could not extract details");
-        resetUI();
-    }
+    videoGenerationSection.style.display = 'none';
 }
 
 async function preloadDefaultReferences() {
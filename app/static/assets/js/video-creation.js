@@ -1,8 +1,40 @@
 // Manages final video assembly
 
 document.addEventListener('DOMContentLoaded', function() {
+    // Draft preview: rendered next to the storyboard, which stays editable
+    previewVideoBtn.addEventListener('click', async () => {
+        previewVideoBtn.disabled = true;
+        videoProgress.style.display = 'inline-block';
+        videoProgress.textContent = 'Rendering draft...';
+
+        try {
+            const resp = await fetch('/create-video', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    job_id: currentJobId,
+                    draft: true,
+                    motion: videoMotionSelect ? videoMotionSelect.value : 'static'
+                })
+            });
+            const data = await resp.json();
+            if (data.error) {
+                console.error("Error creating draft:", data.error);
+            } else {
+                const videoUrl = await waitForRender(data.render_id);
+                showVideoFile(videoUrl + "?t=" + Date.now());
+                finalVideoPathEl.textContent = "Draft preview: " + videoUrl;
+            }
+        } catch (err) {
+            console.error("Error creating draft:", err);
+        }
+        videoProgress.style.display = 'none';
+        previewVideoBtn.disabled = false;
+    });
+
     generateVideoBtn.addEventListener('click', async () => {
         generateVideoBtn.style.display = 'none';
+        previewVideoBtn.style.display = 'none';
         const sceneCards = Array.from(document.querySelectorAll('.scene-card'));
         let delay = 0;
 
@@ -21,25 +53,164 @@ document.addEventListener('DOMContentLoaded', function() {
                 const resp = await fetch('/create-video', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ job_id: currentJobId })
+                    body: JSON.stringify({
+                        job_id: currentJobId,
+                        engine: videoEngineSelect ? videoEngineSelect.value : 'ffmpeg',
+                        motion: videoMotionSelect ? videoMotionSelect.value : 'static',
+                        stream: videoStreamCheckbox ? videoStreamCheckbox.checked : false
+                    })
                 });
                 const data = await resp.json();
                 if (data.error) {
                     console.error("Error creating video:", data.error);
                     videoProgress.style.display = 'none';
                     generateVideoBtn.style.display = 'inline-block';
+                    previewVideoBtn.style.display = 'inline-block';
                     return;
                 }
-                finalVideoSource.src = data.video_url;
-                finalVideo.load();
-                finalVideoSection.style.display = 'block';
+
+                // Start watching while the render is still encoding
+                const stream = data.stream_url ? new RenderStream(data.stream_url) : null;
+                const videoUrl = await waitForRender(data.render_id);
+                if (!stream || !(await stream.finish())) {
+                    showVideoFile(videoUrl);
+                }
                 videoProgress.style.display = 'none';
-                finalVideoPathEl.textContent = "Saved at: " + data.video_url;
+                finalVideoPathEl.textContent = "Saved at: " + videoUrl;
             } catch (err) {
                 console.error("Error creating video:", err);
                 videoProgress.style.display = 'none';
                 generateVideoBtn.style.display = 'inline-block';
+                previewVideoBtn.style.display = 'inline-block';
             }
         }, delay + 300);
     });
 });
+
+// Polls /render-status until the render is done, updating the progress text.
+// Resolves with the video URL, rejects with the render error.
+async function waitForRender(renderId, intervalMs = 2000) {
+    while (true) {
+        const resp = await fetch(`/render-status/${renderId}`);
+        const status = await resp.json();
+        if (status.error) throw status.error;
+        if (status.phase === 'done') return status.video_url;
+
+        if (status.phase === 'queued') {
+            videoProgress.textContent = `Waiting for a free renderer (position ${status.queue_position} of ${status.queue_depth})...`;
+        } else if (status.phase === 'encoding') {
+            videoProgress.textContent = `Generating video... ${Math.round(status.progress)}%`;
+        } else {
+            videoProgress.textContent = 'Generating video...';
+        }
+
+        await sleep(intervalMs);
+    }
+}
+
+// Plays a finished MP4 in the final video player.
+function showVideoFile(url) {
+    finalVideo.removeAttribute('src');
+    finalVideoSource.src = url;
+    finalVideo.load();
+    finalVideoSection.style.display = 'block';
+}
+
+// Plays a render's growing HLS playlist (fragmented MP4 segments) while it
+// encodes: natively where the browser plays HLS, otherwise by appending each
+// new segment to a MediaSource. finish() is called once the render is done;
+// it resolves true if the whole stream was played, false if the playlist never
+// appeared or never ended (e.g. the render failed), in which
+// case the caller shows the MP4 instead.
+class RenderStream {
+    constructor(masterUrl, intervalMs = 2000) {
+        this.masterUrl = masterUrl;
+        this.baseUrl = masterUrl.slice(0, masterUrl.lastIndexOf('/') + 1);
+        this.intervalMs = intervalMs;
+        this.renderDone = false;
+        this.done = this.run().catch(err => {
+            console.error("Error streaming video:", err);
+            return false;
+        });
+    }
+
+    async finish() {
+        this.renderDone = true;
+        return this.done;
+    }
+
+    async fetchText(url) {
+        const resp = await fetch(url, { cache: 'no-store' });
+        return resp.ok ? resp.text() : null;
+    }
+
+    async run() {
+        // The master playlist is written with the first segment
+        let master = null;
+        while (master === null) {
+            const renderDone = this.renderDone;
+            master = await this.fetchText(this.masterUrl);
+            if (master === null) {
+                if (renderDone) return false;
+                await sleep(this.intervalMs);
+            }
+        }
+        const variant = master.split('\n').map(line => line.trim()).find(line => line && !line.startsWith('#'));
+        const codecs = (master.match(/CODECS="([^"]+)"/) || [])[1] || 'avc1.640028,mp4a.40.2';
+        const playlistUrl = this.baseUrl + variant;
+
+        finalVideo.removeAttribute('src');
+        finalVideoSource.removeAttribute('src');
+        finalVideoSection.style.display = 'block';
+        finalVideoPathEl.textContent = 'Streaming while the video renders...';
+
+        let append = null;
+        if (finalVideo.canPlayType('application/vnd.apple.mpegurl')) {
+            finalVideo.src = this.masterUrl;
+        } else if (window.MediaSource && MediaSource.isTypeSupported(`video/mp4; codecs="${codecs}"`)) {
+            append = await this.openMediaSource(codecs);
+        } else {
+            return false;
+        }
+
+        const appended = new Set();
+        while (true) {
+            const renderDone = this.renderDone;
+            const playlist = await this.fetchText(playlistUrl);
+            if (playlist === null) return false;
+            if (append) {
+                const init = playlist.match(/#EXT-X-MAP:URI="([^"]+)"/);
+                const uris = playlist.split('\n').map(line => line.trim()).filter(line => line && !line.startsWith('#'));
+                for (const uri of (init ? [init[1]] : []).concat(uris)) {
+                    if (appended.has(uri)) continue;
+                    const resp = await fetch(this.baseUrl + uri, { cache: 'no-store' });
+                    await append(await resp.arrayBuffer());
+                    appended.add(uri);
+                }
+            }
+            if (playlist.includes('#EXT-X-ENDLIST')) {
+                if (append) this.mediaSource.endOfStream();
+                return true;
+            }
+            // Checked against the state before the fetch, so the final playlist is always read
+            if (renderDone) return false;
+            await sleep(this.intervalMs);
+        }
+    }
+
+    async openMediaSource(codecs) {
+        this.mediaSource = new MediaSource();
+        finalVideo.src = URL.createObjectURL(this.mediaSource);
+        await new Promise(resolve => this.mediaSource.addEventListener('sourceopen', resolve, { once: true }));
+        const sourceBuffer = this.mediaSource.addSourceBuffer(`video/mp4; codecs="${codecs}"`);
+        return data => new Promise((resolve, reject) => {
+            sourceBuffer.addEventListener('updateend', resolve, { once: true });
+            sourceBuffer.addEventListener('error', reject, { once: true });
+            sourceBuffer.appendBuffer(data);
+        });
+    }
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
@@ -1,89 +1,243 @@
 import os
+import bisect
+import tempfile
 from dotenv import load_dotenv
 from openai import OpenAI
-from .global_utils import log, pretty_print_api_response
+from .global_utils import log, pretty_print_api_response, file_sha256
+from .cache_utils import cache_key
+from .concurrency_utils import run_bounded
+from .metrics_utils import call_openai
+from .ffmpeg_utils import run_ffmpeg, detect_silences, probe_media, decode_duration
 
-def transcribe_audio(client: OpenAI, audio_path: str):
+TRANSCRIPTION_MODEL = "whisper-1"
+# Whisper rejects uploads over 25 MB; stay a little below
+TRANSCRIPTION_MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
+def transcribe_audio(client: OpenAI, audio_path: str, model: str = TRANSCRIPTION_MODEL):
     """
     Transcribes audio using Whisper, returning a 'TranscriptionVerbose' object
-    with .text and .segments.
+    with .text and .segments. Rate limit errors are retried with backoff.
     """
     log(f"Transcribing audio with Whisper: {audio_path}", "audio_utils")
     with open(audio_path, "rb") as f:
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
+        response = call_openai(
+            "audio.transcriptions",
+            client.audio.transcriptions.create,
+            model=model,
             file=f,
             response_format="verbose_json",
         )
     return response
 
-def chunk_transcript(whisper_data, words_per_scene: int):
+def audio_duration(audio_path: str) -> float:
     """
-    1) Removes silent time gaps by aligning each segment's .start to the end of
-       the previous segment, if there's a gap.
-    2) Accumulates segments until we reach or exceed 'words_per_scene' words,
-       then breaks at that segment boundary to start a new chunk.
-    3) Keeps a final leftover chunk even if it's under 'words_per_scene',
-       so the last portion is not merged or omitted.
+    Length of the audio in seconds: from the file header, or by decoding the
+    file when the header has none (e.g. FLAC or MKA uploads written as a stream).
     """
-    segments = whisper_data.segments
-    if not segments:
-        return []
+    try:
+        return probe_media(audio_path)["duration"]
+    except RuntimeError:
+        log(f"No duration in the header of {audio_path}, decoding it to measure", "audio_utils")
+        return decode_duration(audio_path)
 
-    # --- 1) Remove silent time gaps between segments ---
-    last_end = 0.0
-    for seg in segments:
-        if seg.start > last_end:
-            gap = seg.start - last_end
-            seg.start = last_end
-            seg.end -= gap
-        last_end = seg.end
-
-    # --- 2) Accumulate segments into chunks until we reach/exceed words_per_scene ---
-    chunks = []
-    current_chunk = []
-    current_word_count = 0
-    chunk_start = None
+def plan_audio_pieces(duration: float, silences, max_piece_seconds: float):
+    """
+    Splits [0, duration] into pieces of at most 'max_piece_seconds', cutting in
+    the middle of a silence (from detect_silences) near the end of each piece
+    when there is one, so no word is cut in half. Falls back to a hard cut.
+    Returns [(start, end), ...].
+    """
+    midpoints = sorted((s + e) / 2 for s, e in silences)
+    pieces = []
+    start = 0.0
+    while duration - start > max_piece_seconds:
+        limit = start + max_piece_seconds
+        # Prefer the latest silence in the last quarter of the piece
+        candidates = [m for m in midpoints if limit - max_piece_seconds / 4 <= m <= limit]
+        cut = candidates[-1] if candidates else limit
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, duration))
+    return pieces
 
-    for seg in segments:
-        seg_text = seg.text.strip()
-        seg_words = seg_text.split()
-        seg_word_count = len(seg_words)
-
-        # Mark chunk_start the first time we add a segment
-        if chunk_start is None:
-            chunk_start = seg.start
-
-        # If adding this segment crosses the threshold and we already
-        # have something in current_chunk, flush that chunk now.
-        if current_word_count + seg_word_count >= words_per_scene and current_word_count > 0:
-            # Close out the current chunk at the previous segment boundary
-            chunk_text = " ".join(s.text.strip() for s in current_chunk)
-            chunk_end = current_chunk[-1].end
-
-            chunks.append({
-                "start": chunk_start,
-                "end": chunk_end,
-                "text": chunk_text
+def transcribe_audio_split(
+    client: OpenAI,
+    audio_path: str,
+    max_piece_seconds: float,
+    workers: int = 4,
+    model: str = TRANSCRIPTION_MODEL,
+    duration: float = None
+):
+    """
+    Long-audio mode: cuts the file at silences into pieces of at most
+    'max_piece_seconds' (re-encoded to mono 64 kbps MP3, well under the upload
+    limit), transcribes them concurrently and merges the results back into one
+    {"text", "segments"} transcript, with every segment shifted by its piece's
+    start so chunk_transcript sees one continuous timeline. 'duration' is
+    measured (see audio_duration) when not given.
+    """
+    if duration is None:
+        duration = audio_duration(audio_path)
+    pieces = plan_audio_pieces(duration, detect_silences(audio_path), max_piece_seconds)
+    log(f"Transcribing {audio_path} in {len(pieces)} pieces ({duration:.0f}s total)", "audio_utils")
+
+    with tempfile.TemporaryDirectory(prefix="transcribe-") as tmp_dir:
+        def transcribe_piece(i):
+            start, end = pieces[i]
+            piece_path = os.path.join(tmp_dir, f"piece_{i}.mp3")
+            run_ffmpeg([
+                "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", audio_path,
+                "-vn", "-ac", "1", "-c:a", "libmp3lame", "-b:a", "64k", piece_path
+            ])
+            return transcribe_audio(client, piece_path, model)
+
+        results = {}
+        for i, whisper_data, error in run_bounded(transcribe_piece, range(len(pieces)), workers):
+            if error:
+                raise RuntimeError(f"Transcription of piece {i + 1}/{len(pieces)} failed: {error}")
+            results[i] = whisper_data
+
+    texts = []
+    segments = []
+    for i, (start, end) in enumerate(pieces):
+        texts.append(results[i].text.strip())
+        for seg in compact_segments(results[i]):
+            segments.append({
+                "start": start + seg["start"],
+                "end": start + min(seg["end"], end - start),
+                "text": seg["text"]
             })
+    return {"text": " ".join(t for t in texts if t), "segments": segments}
+
+def load_transcript(
+    client: OpenAI,
+    audio_path: str,
+    cache=None,
+    model: str = TRANSCRIPTION_MODEL,
+    split_seconds: float = 0,
+    workers: int = 4
+):
+    """
+    Returns {"text", "segments"} (segments as in compact_segments()) for the audio.
 
-            # Start a new chunk with the current segment
-            current_chunk = [seg]
-            current_word_count = seg_word_count
-            chunk_start = seg.start
-        else:
-            # Still below threshold, so accumulate
-            current_chunk.append(seg)
-            current_word_count += seg_word_count
-
-    # --- 3) Flush any leftover as a final chunk, even if under threshold ---
-    if current_chunk:
-        chunk_text = " ".join(s.text.strip() for s in current_chunk)
-        chunk_end = current_chunk[-1].end
-        chunks.append({
-            "start": chunk_start,
-            "end": chunk_end,
-            "text": chunk_text
+    With a DiskCache, transcripts are keyed by the SHA-256 of the audio bytes
+    plus the model, so re-uploading the same file (e.g. to try other scene
+    settings) skips the Whisper call. Cached segments are stored as compact
+    [start, end, text] triples.
+
+    With 'split_seconds', audio longer than that (or too big to upload in one
+    request) goes through transcribe_audio_split.
+    """
+    key = cache_key("transcript", file_sha256(audio_path), model) if cache else None
+    if key:
+        cached = cache.get(key)
+        if cached:
+            log(f"Transcript cache hit for {audio_path}", "audio_utils")
+            return {
+                "text": cached["text"],
+                "segments": [{"start": s, "end": e, "text": t} for s, e, t in cached["segments"]]
+            }
+
+    duration = audio_duration(audio_path) if split_seconds else None
+    needs_split = split_seconds and (
+        os.path.getsize(audio_path) > TRANSCRIPTION_MAX_UPLOAD_BYTES
+        or duration > split_seconds
+    )
+    if needs_split:
+        transcript = transcribe_audio_split(client, audio_path, split_seconds, workers, model, duration)
+    else:
+        whisper_data = transcribe_audio(client, audio_path, model)
+        transcript = {"text": whisper_data.text.strip(), "segments": compact_segments(whisper_data)}
+    if key:
+        cache.put(key, {
+            "text": transcript["text"],
+            "segments": [[seg["start"], seg["end"], seg["text"]] for seg in transcript["segments"]]
         })
+    return transcript
+
+def compact_segments(whisper_data):
+    """
+    Keeps only what chunking needs from a Whisper response, as plain
+    JSON-serializable dicts: [{"start", "end", "text"}, ...]
+    """
+    return [
+        {"start": float(seg.start), "end": float(seg.end), "text": seg.text}
+        for seg in (whisper_data.segments or [])
+    ]
+
+def build_timeline(segments):
+    """
+    Normalizes the segments (dicts from compact_segments()) ONCE into the
+    compact, JSON-friendly form every chunking runs on:
+      {"starts": [...], "ends": [...], "texts": [...], "word_prefix": [...]}
+    - silent gaps are closed: each segment starts where the previous one ended,
+    - texts are stripped,
+    - word_prefix[i] is the number of words in segments 0..i-1
+      (len(word_prefix) == len(segments) + 1).
+    The input segments are not modified.
+    """
+    starts, ends, texts, word_prefix = [], [], [], [0]
+    last_end = 0.0
+    for seg in segments:
+        start, end = seg["start"], seg["end"]
+        if start > last_end:
+            gap = start - last_end
+            start = last_end
+            end -= gap
+        last_end = end
+
+        text = seg["text"].strip()
+        starts.append(start)
+        ends.append(end)
+        texts.append(text)
+        word_prefix.append(word_prefix[-1] + len(text.split()))
+    return {"starts": starts, "ends": ends, "texts": texts, "word_prefix": word_prefix}
+
+def chunk_ranges(timeline, words_per_scene: int):
+    """
+    Scene boundaries for 'words_per_scene' as [(first_segment, end_segment), ...]
+    (end exclusive), with the word counts read from the prefix sums instead of
+    re-splitting texts: one binary search per scene.
 
-    return chunks
+    Same rule as always: segments accumulate until adding the next one would
+    reach/exceed 'words_per_scene' (and the chunk is not empty), then the chunk
+    is closed at that segment boundary; the leftover is kept as a last chunk.
+    """
+    prefix = timeline["word_prefix"]
+    n = len(prefix) - 1
+    ranges = []
+    i = 0
+    while i < n:
+        # First segment j whose words would make the chunk reach the target...
+        j = bisect.bisect_left(prefix, prefix[i] + words_per_scene, lo=i + 1) - 1
+        # ...but only once the chunk already holds some words
+        k = bisect.bisect_right(prefix, prefix[i], lo=i + 1) - 1
+        j = max(j, k + 1, i + 1)
+        if j >= n:
+            ranges.append((i, n))
+            break
+        ranges.append((i, j))
+        i = j
+    return ranges
+
+def timeline_chunks(timeline, words_per_scene: int):
+    """
+    Chunks ({"start", "end", "text"}) of a timeline from build_timeline().
+    """
+    return [
+        {
+            "start": timeline["starts"][first],
+            "end": timeline["ends"][end - 1],
+            "text": " ".join(timeline["texts"][first:end])
+        }
+        for first, end in chunk_ranges(timeline, words_per_scene)
+    ]
+
+def chunk_transcript(segments, words_per_scene: int):
+    """
+    Chunks the transcript segments (dicts from compact_segments()) into scenes
+    of about 'words_per_scene' words. See build_timeline() and chunk_ranges().
+    """
+    if not segments:
+        return []
+    return timeline_chunks(build_timeline(segments), words_per_scene)
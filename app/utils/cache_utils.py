@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from .global_utils import log
+
+def cache_key(*parts) -> str:
+    """
+    Stable SHA-256 key of any JSON-serializable parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """
+    Small content-addressed JSON cache on disk: one file per key, under
+    folder/<key[:2]>/<key>.json, written atomically (tmp file + rename) so
+    several processes can share the folder. Subclasses can store other file
+    types by changing 'suffix' (see ReferenceImageCache).
+
+    - Size-bounded LRU: a hit refreshes the entry's mtime, and when the folder
+      grows beyond 'max_bytes' the least recently used entries are removed.
+    - Optional 'ttl_seconds': older entries count as misses and are removed.
+    - stats() reports hits/misses and the current size.
+    """
+
+    suffix = ".json"
+
+    def __init__(self, folder: str, max_bytes: int, ttl_seconds: float = None, name: str = "cache"):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._total_bytes = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], f"{key}{self.suffix}")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if self.ttl_seconds is not None and time.time() - stat.st_mtime > self.ttl_seconds:
+                self._remove(path, stat.st_size)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+        return value
+
+    def put(self, key: str, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, separators=(",", ":"), ensure_ascii=False)
+        self._commit(tmp_path, path)
+
+    def _commit(self, tmp_path: str, path: str):
+        # Moves a fully written tmp file into place and keeps the size bounded
+        size = os.path.getsize(tmp_path)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size - old_size
+            over_limit = self._current_size() > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else None,
+                "bytes": self._current_size(),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.folder):
+            return entries
+        for sub in os.listdir(self.folder):
+            sub_path = os.path.join(self.folder, sub)
+            if not os.path.isdir(sub_path):
+                continue
+            for filename in os.listdir(sub_path):
+                if not filename.endswith(self.suffix):
+                    continue
+                path = os.path.join(sub_path, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _current_size(self):
+        # Called with the lock held; the folder is only scanned once
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        return self._total_bytes
+
+    def _remove(self, path: str, size: int):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        # Evict down to 90% so we don't rescan on every put
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._total_bytes = total
+        log(f"Evicted {removed} entries from the {self.name} cache ({total} bytes left)", "cache_utils")
+
+class LLMResponseCache(DiskCache):
+    """
+    DiskCache for chat completion results, keyed by model + messages +
+    reasoning effort (see chat_key). Entries keep the token usage of the
+    original call, so stats() can also report the tokens hits have saved.
+    """
+
+    def __init__(self, folder: str, max_bytes: int, ttl_seconds: float = None):
+        super().__init__(folder, max_bytes, ttl_seconds=ttl_seconds, name="llm")
+        self._saved_prompt_tokens = 0
+        self._saved_completion_tokens = 0
+
+    @staticmethod
+    def chat_key(model: str, messages, reasoning_effort=None) -> str:
+        return cache_key("chat", model, messages, reasoning_effort)
+
+    def get_completion(self, key: str):
+        """
+        Returns the cached message content, or None.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._saved_prompt_tokens += entry.get("prompt_tokens", 0)
+            self._saved_completion_tokens += entry.get("completion_tokens", 0)
+        return entry["content"]
+
+    def put_completion(self, key: str, content: str, usage=None):
+        self.put(key, {
+            "content": content,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        })
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["saved_prompt_tokens"] = self._saved_prompt_tokens
+            stats["saved_completion_tokens"] = self._saved_completion_tokens
+        return stats
@@ -0,0 +1,87 @@
+import random
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai import RateLimitError, APIConnectionError, InternalServerError
+from .global_utils import log
+
+# Errors worth another attempt (rate limits, dropped connections and timeouts, 5xx).
+# The OpenAI client is built without its own retries, so these are the only ones.
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+def call_with_backoff(
+    fn,
+    *args,
+    retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    on_retry=None,
+    **kwargs
+):
+    """
+    Calls fn(*args, **kwargs), retrying on RETRYABLE_ERRORS (OpenAI rate
+    limits, connection errors and server errors) with exponential backoff +
+    jitter. A 'retry-after' header sent by the API wins over the computed
+    delay. Any other error is raised right away.
+    on_retry(attempt, delay) is called before each retry.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt >= retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * (0.5 + random.random() / 2)
+            response = getattr(e, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after:
+                try:
+                    delay = min(max_delay, float(retry_after))
+                except ValueError:
+                    pass
+            log(f"{e.__class__.__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{retries})", "concurrency_utils")
+            if on_retry:
+                on_retry(attempt + 1, delay)
+            time.sleep(delay)
+
+def run_bounded(fn, items, max_workers: int):
+    """
+    Runs fn(item) for every item on a pool of at most 'max_workers' threads and
+    yields (item, result, error) as each call finishes (not in input order).
+    error is None on success. If the consumer stops early (e.g. the HTTP client
+    went away), calls that have not started yet are cancelled.
+    Each call runs in a copy of the caller's context variables.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {executor.submit(contextvars.copy_context().run, fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class RateLimiter:
+    """
+    Spaces calls so that no more than 'per_minute' of them start in any
+    60-second window (evenly spread, one every 60/per_minute seconds).
+    Thread-safe; acquire() blocks until the caller may start its call.
+    Shared between requests, because API limits are per account, not per request.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,130 @@
+import io
+import base64
+import random
+import threading
+import time
+from types import SimpleNamespace
+import httpx
+from openai import RateLimitError
+from PIL import Image
+from .audio_utils import audio_duration
+
+class FakeOpenAI:
+    """
+    Local stand-in for the OpenAI client, for tests and load experiments.
+
+    It implements the few calls this app makes (chat completions, image
+    generate/edit and Whisper transcriptions) with a configurable latency,
+    so concurrency limits and streaming can be exercised without network
+    access or API spend:
+
+        client = FakeOpenAI(latency=2.0, jitter=0.5)
+
+    The first 'rate_limit_errors' calls raise a RateLimitError (with a
+    'retry-after: 0' header), to exercise the retries. max_in_flight records
+    the most calls that were running at the same time.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        transcription_duration: float = None,
+        rate_limit_errors: int = 0,
+        **_ignored
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.transcription_duration = transcription_duration
+        self.rate_limit_errors = rate_limit_errors
+        self.calls = {"chat": 0, "images": 0, "transcriptions": 0}
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._seen_prefixes = set()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_create))
+        self.images = SimpleNamespace(generate=self._images_generate, edit=self._images_edit)
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcriptions_create))
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _sleep(self):
+        with self._lock:
+            if self.rate_limited < self.rate_limit_errors:
+                self.rate_limited += 1
+                request = httpx.Request("POST", "https://api.openai.com/v1/fake")
+                raise RateLimitError(
+                    "Fake rate limit",
+                    response=httpx.Response(429, headers={"retry-after": "0"}, request=request),
+                    body=None
+                )
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _chat_create(self, model=None, messages=None, **kwargs):
+        self._sleep()
+        self._count("chat")
+        last = messages[-1]["content"] if messages else ""
+        # Mimic provider prompt caching: a first message seen before counts as cached
+        prefix = messages[0]["content"] if messages else ""
+        with self._lock:
+            cached_tokens = len(prefix) // 4 if prefix in self._seen_prefixes else 0
+            self._seen_prefixes.add(prefix)
+        content = f"title: Fake title\ndescription: Fake answer from {model} to: {last[:80]}"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(m["content"]) // 4 for m in messages or []),
+                completion_tokens=len(content) // 4,
+                total_tokens=0,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+                completion_tokens_details=SimpleNamespace(reasoning_tokens=0),
+            ),
+        )
+
+    def _fake_image(self, size):
+        width, height = (int(v) for v in size.lower().split("x"))
+        color = tuple(random.randint(0, 255) for _ in range(3))
+        buf = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(buf, format="PNG")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(buf.getvalue()).decode("ascii"))])
+
+    def _images_generate(self, model=None, prompt=None, size="1024x1024", **kwargs):
+        self._sleep()
+        self._count("images")
+        return self._fake_image(size)
+
+    def _images_edit(self, model=None, image=None, prompt=None, size="1024x1024", **kwargs):
+        self._sleep()
+        self._count("images")
+        return self._fake_image(size)
+
+    def _transcriptions_create(self, model=None, file=None, **kwargs):
+        """
+        Returns fake 5-second segments covering 'transcription_duration' seconds,
+        or the real duration of the uploaded file when that is not set.
+        """
+        self._sleep()
+        self._count("transcriptions")
+        duration = self.transcription_duration
+        if duration is None:
+            duration = audio_duration(file.name) if file is not None else 30.0
+        segments = []
+        t = 0.0
+        while t < duration:
+            end = min(duration, t + 5.0)
+            segments.append(SimpleNamespace(start=t, end=end, text=f" Fake words from {t:.0f} to {end:.0f} seconds."))
+            t = end
+        return SimpleNamespace(
+            text="".join(s.text for s in segments).strip(),
+            segments=segments,
+            duration=duration,
+        )
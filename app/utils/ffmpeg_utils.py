@@ -0,0 +1,547 @@
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+from moviepy.config import FFMPEG_BINARY
+from .global_utils import log
+
+# ffprobe is optional (the imageio ffmpeg build has none): next to ffmpeg, else on the PATH
+_FFPROBE_SIBLING = os.path.join(os.path.dirname(FFMPEG_BINARY), "ffprobe")
+FFPROBE_BINARY = _FFPROBE_SIBLING if os.path.isfile(_FFPROBE_SIBLING) else shutil.which("ffprobe")
+
+# Audio codecs browsers play inside MP4: stream-copied as they are, anything else is transcoded to AAC once
+MP4_AUDIO_CODECS = ("aac", "mp3")
+# Longest a still frame is held in VFR output, so seeking and players keep up
+VFR_MAX_HOLD_SECONDS = 2.0
+# Progressive HLS output: segment length (one keyframe each) and playlist names
+HLS_SEGMENT_SECONDS = 4
+HLS_PLAYLIST = "index.m3u8"
+HLS_MASTER_PLAYLIST = "master.m3u8"
+# Ken Burns scenes are panned over an image scaled to this multiple of the output size,
+# so zoompan's whole-pixel crop positions move in sub-pixel steps of the output
+KEN_BURNS_SUPERSAMPLE = 2
+
+def plan_frame_layout(scene_plan, fps: int, crossfade_dur: float, total_duration: float):
+    """
+    Converts a scene plan into whole-frame timing:
+      - starts[j]: first output frame of scene j (the first scene always starts at 0)
+      - transition_frames[j]: length of the crossfade INTO scene j
+        (clamped for a short last scene)
+      - lengths[j]: frames of scene j's stream (its hold + the outgoing crossfade)
+    Working in frames keeps the xfade offsets exactly in line with the length of
+    the already-chained timeline.
+    """
+    total_frames = max(1, int(round(total_duration * fps)))
+    crossfade_frames = max(0, int(round(crossfade_dur * fps)))
+
+    starts = [int(round(scene["start"] * fps)) for scene in scene_plan]
+    if starts:
+        starts[0] = 0
+
+    transition_frames = [0] * len(scene_plan)
+    for j in range(1, len(scene_plan)):
+        transition_frames[j] = max(0, min(crossfade_frames, total_frames - starts[j]))
+
+    lengths = []
+    for j in range(len(scene_plan)):
+        if j < len(scene_plan) - 1:
+            lengths.append(starts[j + 1] - starts[j] + transition_frames[j + 1])
+        else:
+            lengths.append(total_frames - starts[j])
+
+    return {
+        "starts": starts,
+        "transition_frames": transition_frames,
+        "lengths": lengths,
+        "total_frames": total_frames,
+    }
+
+def scene_cut_frames(layout):
+    """
+    Frames where the timeline can be cut into independent segments: the first
+    frame after the crossfade into a scene, where that scene is the only one on
+    screen (and the scene still has a hold left after the crossfade).
+    """
+    starts = layout["starts"]
+    transition_frames = layout["transition_frames"]
+    total_frames = layout["total_frames"]
+
+    cuts = []
+    for j in range(1, len(starts)):
+        cut = starts[j] + transition_frames[j]
+        hold_end = starts[j + 1] if j + 1 < len(starts) else total_frames
+        if 0 < cut < hold_end:
+            cuts.append(cut)
+    return cuts
+
+def find_split_frames(layout, parts: int):
+    """
+    Picks up to parts-1 scene cuts (see scene_cut_frames), the ones closest to
+    an even split of the timeline.
+    """
+    candidates = scene_cut_frames(layout)
+    total_frames = layout["total_frames"]
+
+    splits = set()
+    for p in range(1, parts):
+        if not candidates:
+            break
+        target = total_frames * p / parts
+        splits.add(min(candidates, key=lambda c: abs(c - target)))
+    return sorted(splits)
+
+def changing_frame_ranges(scene_plan, layout, fps: int, fade_in: float, fade_out: float):
+    """
+    Inclusive (first, last) frame ranges where the picture changes: fades from
+    and to black, the crossfades between scenes and whole scenes with a Ken
+    Burns motion. Each range also covers the first frame after the
+    transition, the clean picture that is then held.
+    """
+    starts = layout["starts"]
+    lengths = layout["lengths"]
+    transition_frames = layout["transition_frames"]
+    last_frame = layout["total_frames"] - 1
+
+    ranges = []
+    for j, scene in enumerate(scene_plan):
+        if scene.get("motion") and scene["image_path"]:
+            ranges.append((starts[j], starts[j] + lengths[j]))
+        if transition_frames[j] > 0:
+            ranges.append((starts[j], starts[j] + transition_frames[j]))
+        if scene["fade_in"] and fade_in > 0:
+            ranges.append((starts[j], starts[j] + min(lengths[j], int(round(fade_in * fps)))))
+        if scene["fade_out"] and fade_out > 0:
+            end = starts[j] + lengths[j]
+            ranges.append((end - min(lengths[j], int(round(fade_out * fps))), end - 1))
+    return sorted((first, min(last, last_frame)) for first, last in ranges if first <= last_frame)
+
+def _vfr_selection(scene_plan, layout, fps: int, fade_in: float, fade_out: float, window=None):
+    # Window length, hold step and changing ranges, all in frames relative to the window start
+    window_start, window_end = window or (0, layout["total_frames"])
+    hold_step = max(1, int(round(VFR_MAX_HOLD_SECONDS * fps)))
+    ranges = [
+        (max(first, window_start) - window_start, min(last, window_end - 1) - window_start)
+        for first, last in changing_frame_ranges(scene_plan, layout, fps, fade_in, fade_out)
+        if last >= window_start and first < window_end
+    ]
+    return window_end - window_start, window_start, hold_step, ranges
+
+def vfr_select_filter(scene_plan, layout, fps: int, fade_in: float, fade_out: float, window=None):
+    """
+    'select' filter keeping every frame of the changing ranges (see
+    changing_frame_ranges) and, during holds, one frame every
+    VFR_MAX_HOLD_SECONDS plus the first and last frame of the window. Encoded
+    with '-fps_mode vfr', each kept hold frame lasts until the next one.
+    """
+    length, offset, hold_step, ranges = _vfr_selection(scene_plan, layout, fps, fade_in, fade_out, window)
+    terms = ["eq(n,0)", f"eq(n,{length - 1})", f"not(mod(n+{offset},{hold_step}))"]
+    terms += [f"between(n,{first},{last})" for first, last in ranges]
+    return "select='" + "+".join(terms) + "'"
+
+def vfr_frame_count(scene_plan, layout, fps: int, fade_in: float, fade_out: float, window=None) -> int:
+    """
+    Number of frames vfr_select_filter keeps, for progress reporting.
+    """
+    length, offset, hold_step, ranges = _vfr_selection(scene_plan, layout, fps, fade_in, fade_out, window)
+    kept = {0, length - 1}
+    kept.update(n for n in range((-offset) % hold_step, length, hold_step))
+    for first, last in ranges:
+        kept.update(range(first, last + 1))
+    return len(kept)
+
+def zoompan_filter(motion, width: int, height: int, fps: int, frames: int) -> str:
+    """
+    'zoompan' filter moving linearly from the start to the end of a scene
+    motion (see video_utils.normalize_motion) over 'frames' output frames.
+    Zoom 1 shows the whole input; pan (0, 0) puts the zoomed window in the
+    top-left corner, (1, 1) in the bottom-right one.
+    """
+    (zoom_start, zoom_end), ((x_start, y_start), (x_end, y_end)) = motion["zoom"], motion["pan"]
+    progress = f"on/{max(1, frames - 1)}"
+    return (
+        f"zoompan=z='{zoom_start:.5f}+({zoom_end - zoom_start:.5f})*{progress}'"
+        f":x='(iw-iw/zoom)*({x_start:.5f}+({x_end - x_start:.5f})*{progress})'"
+        f":y='(ih-ih/zoom)*({y_start:.5f}+({y_end - y_start:.5f})*{progress})'"
+        f":d={frames}:s={width}x{height}:fps={fps}"
+    )
+
+def build_slideshow_filter_graph(
+    scene_plan,
+    width: int,
+    height: int,
+    fps: int,
+    fade_in: float,
+    fade_out: float,
+    crossfade_dur: float,
+    total_duration: float,
+    window=None,
+    vfr=False
+):
+    """
+    Turns a scene plan (see video_utils.build_scene_plan) into ffmpeg input
+    arguments and a single filter_complex string.
+
+    Every still image is decoded and scaled ONCE, then repeated with the
+    'loop' filter, so no per-frame resampling happens. Scenes with a "motion"
+    are scaled once to KEN_BURNS_SUPERSAMPLE times the output size instead,
+    and 'zoompan' crops and resamples each frame from that. Scenes are chained with
+    'xfade' (or 'concat' when there is no crossfade), and the first/last
+    scenes get 'fade' in/out from black.
+
+    'window' is an optional (start_frame, end_frame) range to render only a
+    part of the timeline; its start must be a cut from find_split_frames.
+
+    'vfr' drops the repeated frames of the holds (see vfr_select_filter).
+
+    Returns (input_args, filter_complex, output_label).
+    """
+    input_args, filter_complex, labels = build_rendition_filter_graph(
+        scene_plan, [{"width": width, "height": height}], fps,
+        fade_in, fade_out, crossfade_dur, total_duration, window, vfr
+    )
+    return input_args, filter_complex, labels[0]
+
+def build_rendition_filter_graph(
+    scene_plan,
+    renditions,
+    fps: int,
+    fade_in: float,
+    fade_out: float,
+    crossfade_dur: float,
+    total_duration: float,
+    window=None,
+    vfr=False
+):
+    """
+    build_slideshow_filter_graph for several output sizes at once. Each
+    rendition is a dict with "width", "height" and optionally "crops": per
+    scene, an (x, y, w, h) box of the source image to scale instead of the
+    whole image (see image_utils.smart_crop_box), or None.
+
+    Every image is decoded once and fanned out with 'split'; each branch is
+    cropped and scaled once for its rendition before being looped, and has
+    its own fade/xfade chain, so every output can go to its own encoder.
+
+    Returns (input_args, filter_complex, output_labels) with one label per rendition.
+    """
+    layout = plan_frame_layout(scene_plan, fps, crossfade_dur, total_duration)
+    starts = layout["starts"]
+    transition_frames = layout["transition_frames"]
+    lengths = layout["lengths"]
+    window_start, window_end = window or (0, layout["total_frames"])
+    # Label suffixes only with several renditions, so a single one keeps the plain graph
+    suffixes = [f"_{r}" for r in range(len(renditions))] if len(renditions) > 1 else [""]
+
+    input_args = []
+    filters = []
+    labels = [[] for _ in renditions]
+    input_idx = 0
+    for j, scene in enumerate(scene_plan):
+        # Part of scene j's stream that falls inside the window
+        first = max(0, window_start - starts[j])
+        last = min(lengths[j], window_end - starts[j])
+        if last <= first:
+            continue
+
+        sources = None
+        if scene["image_path"]:
+            input_args += ["-i", scene["image_path"]]
+            if len(renditions) > 1:
+                sources = [f"s{j}{suffix}" for suffix in suffixes]
+                filters.append(f"[{input_idx}:v]split={len(renditions)}" + "".join(f"[{src}]" for src in sources))
+            else:
+                sources = [f"{input_idx}:v"]
+            input_idx += 1
+
+        for r, rendition in enumerate(renditions):
+            width, height = rendition["width"], rendition["height"]
+            label = f"v{j}{suffixes[r]}"
+            if sources:
+                crops = rendition.get("crops")
+                crop = crops[j] if crops else None
+                chain = f"[{sources[r]}]"
+                if crop:
+                    chain += "crop={2}:{3}:{0}:{1},".format(*crop)
+                if scene.get("motion"):
+                    chain += (
+                        f"scale={width * KEN_BURNS_SUPERSAMPLE}:{height * KEN_BURNS_SUPERSAMPLE}:flags=lanczos,"
+                        f"setsar=1,format=yuv420p,{zoompan_filter(scene['motion'], width, height, fps, lengths[j])},"
+                        f"setsar=1,trim=end_frame={lengths[j]}"
+                    )
+                else:
+                    chain += (
+                        f"scale={width}:{height}:flags=lanczos,setsar=1,format=yuv420p,"
+                        f"loop=loop=-1:size=1,setpts=N/{fps}/TB,fps={fps},"
+                        f"trim=end_frame={lengths[j]}"
+                    )
+            else:
+                # Missing image => black hold, same as the empty CompositeVideoClip background
+                chain = (
+                    f"color=c=black:s={width}x{height}:r={fps},format=yuv420p,"
+                    f"trim=end_frame={lengths[j]}"
+                )
+
+            if scene["fade_in"] and fade_in > 0:
+                fade_frames = min(lengths[j], int(round(fade_in * fps)))
+                chain += f",fade=t=in:start_frame=0:nb_frames={fade_frames}"
+            if scene["fade_out"] and fade_out > 0:
+                fade_frames = min(lengths[j], int(round(fade_out * fps)))
+                chain += f",fade=t=out:start_frame={lengths[j] - fade_frames}:nb_frames={fade_frames}"
+
+            if first > 0 or last < lengths[j]:
+                chain += f",trim=start_frame={first}:end_frame={last},setpts=PTS-STARTPTS,fps={fps}"
+
+            filters.append(f"{chain}[{label}]")
+            labels[r].append((j, label))
+
+    if not labels[0]:
+        raise ValueError("Scene plan produced no renderable scenes")
+
+    outputs = []
+    for r, rendition_labels in enumerate(labels):
+        # Chain the scenes one after another
+        current = rendition_labels[0][1]
+        for step, (j, label) in enumerate(rendition_labels[1:], start=1):
+            out_label = f"x{step}{suffixes[r]}"
+            if transition_frames[j] > 0:
+                filters.append(
+                    f"[{current}][{label}]xfade=transition=fade:"
+                    f"duration={transition_frames[j] / fps:.6f}:"
+                    f"offset={(starts[j] - window_start) / fps:.6f}[{out_label}]"
+                )
+            else:
+                filters.append(f"[{current}][{label}]concat=n=2:v=1:a=0[{out_label}]")
+            current = out_label
+
+        if vfr:
+            filters.append(
+                f"[{current}]{vfr_select_filter(scene_plan, layout, fps, fade_in, fade_out, window)}[vfr{suffixes[r]}]"
+            )
+            current = f"vfr{suffixes[r]}"
+        outputs.append(current)
+
+    return input_args, ";".join(filters), outputs
+
+def concat_segments(segment_paths, output_path: str, extra_inputs=None, output_args=None):
+    """
+    Joins already-encoded segments with the concat demuxer and stream copy
+    (no re-encode). extra_inputs (e.g. ["-i", audio_path]) are added after the
+    concatenated video, which is always input 0.
+    """
+    list_path = output_path + ".concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        run_ffmpeg(
+            ["-f", "concat", "-safe", "0", "-i", list_path]
+            + (extra_inputs or [])
+            + (output_args or ["-c", "copy"])
+            + [output_path]
+        )
+    finally:
+        os.remove(list_path)
+
+def streaming_output_args(output_path: str, stream_folder: str):
+    """
+    Output args writing the MP4 and, from the same encode (tee muxer), a
+    growing HLS event playlist of fragmented MP4 segments in 'stream_folder'.
+    A keyframe every HLS_SEGMENT_SECONDS lets each segment be published as
+    soon as it is encoded; HLS_MASTER_PLAYLIST carries the CODECS a player
+    needs. The playlist gets #EXT-X-ENDLIST when the render is complete.
+    """
+    playlist_path = os.path.join(stream_folder, HLS_PLAYLIST)
+    hls_options = ":".join([
+        "f=hls",
+        f"hls_time={HLS_SEGMENT_SECONDS}",
+        "hls_playlist_type=event",
+        "hls_segment_type=fmp4",
+        f"master_pl_name={HLS_MASTER_PLAYLIST}",
+    ])
+    return [
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        "-flags", "+global_header",
+        "-f", "tee",
+        f"[f=mp4:movflags=+faststart]{_tee_escape(output_path)}|[{hls_options}]{_tee_escape(playlist_path)}",
+    ]
+
+def _tee_escape(path: str) -> str:
+    for char in ("\\", "|", "[", "]"):
+        path = path.replace(char, "\\" + char)
+    return path
+
+def run_ffmpeg(args, progress_callback=None, total_frames=None, capture_stderr=False):
+    """
+    Runs the bundled ffmpeg binary (the same one MoviePy uses) with the given
+    arguments. Raises RuntimeError with the tail of stderr on failure.
+
+    If progress_callback is given, ffmpeg's machine-readable progress output is
+    parsed and progress_callback(frames_encoded, total_frames) is called on
+    every update. With capture_stderr, the full stderr text is returned
+    (analysis filters such as silencedetect report there).
+    """
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-y"]
+    if progress_callback:
+        cmd += ["-progress", "pipe:1", "-nostats"]
+    cmd += args
+    log(f"Running ffmpeg with {len(args)} args", "ffmpeg_utils")
+
+    # stderr goes to a temp file so a chatty ffmpeg can never block on a full pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE if progress_callback else subprocess.DEVNULL,
+            stderr=stderr_file
+        )
+        if progress_callback:
+            for raw_line in proc.stdout:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if line.startswith("frame="):
+                    try:
+                        progress_callback(int(line.split("=", 1)[1]), total_frames)
+                    except ValueError:
+                        pass
+            proc.stdout.close()
+        returncode = proc.wait()
+
+        if returncode != 0 or capture_stderr:
+            stderr_file.seek(0)
+            stderr_text = stderr_file.read().decode("utf-8", errors="replace")
+        if returncode != 0:
+            stderr_tail = stderr_text.strip().splitlines()[-10:]
+            raise RuntimeError("ffmpeg failed:\n" + "\n".join(stderr_tail))
+        if capture_stderr:
+            return stderr_text
+
+def probe_media(path: str, fallback_duration: float = None):
+    """
+    Reads the container header (nothing is decoded) and returns
+    {"duration": seconds, "audio_codec": name or None}: with ffprobe's JSON
+    output when an ffprobe binary is available, else from 'ffmpeg -i'.
+
+    Some inputs (streams, some VBR MP3s) have no duration in their header
+    ("N/A"); 'fallback_duration' (e.g. the transcript length) is used for
+    those. Raises RuntimeError if there is neither.
+    """
+    info = _probe_with_ffprobe(path) if FFPROBE_BINARY else None
+    if info is None:
+        # Without an output ffmpeg exits non-zero after printing the stream info, so run_ffmpeg doesn't fit
+        proc = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-i", path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        info = parse_ffmpeg_info(proc.stderr.decode("utf-8", errors="replace"))
+
+    if info["duration"] is None:
+        if fallback_duration is None:
+            raise RuntimeError(f"Could not read the duration of {path}")
+        log(f"No duration in the header of {path}, using {fallback_duration:.2f}s", "ffmpeg_utils")
+        info["duration"] = float(fallback_duration)
+    return info
+
+def _probe_with_ffprobe(path: str):
+    proc = subprocess.run(
+        [
+            FFPROBE_BINARY, "-v", "error",
+            "-show_entries", "format=duration:stream=codec_type,codec_name",
+            "-of", "json", path
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if proc.returncode != 0:
+        return None
+    return parse_ffprobe_json(proc.stdout.decode("utf-8", errors="replace"))
+
+def parse_ffprobe_json(output: str):
+    """
+    {"duration", "audio_codec"} from 'ffprobe -show_entries
+    format=duration:stream=codec_type,codec_name -of json' output.
+    """
+    data = json.loads(output or "{}")
+    try:
+        duration = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        # Missing, or "N/A"
+        duration = None
+    audio_codec = next(
+        (stream.get("codec_name") for stream in data.get("streams", []) if stream.get("codec_type") == "audio"),
+        None
+    )
+    return {"duration": duration, "audio_codec": audio_codec}
+
+def parse_ffmpeg_info(info: str):
+    """
+    {"duration", "audio_codec"} from the stream info 'ffmpeg -i' prints on
+    stderr. duration is None for "Duration: N/A".
+    """
+    duration = None
+    audio_codec = None
+    for line in info.splitlines():
+        line = line.strip()
+        if line.startswith("Duration:") and duration is None:
+            value = line[len("Duration:"):].split(",")[0].strip()
+            try:
+                hours, minutes, seconds = value.split(":")
+                duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            except ValueError:
+                pass
+        elif line.startswith("Stream #") and ": Audio: " in line and audio_codec is None:
+            audio_codec = line.split(": Audio: ", 1)[1].split()[0].rstrip(",")
+    return {"duration": duration, "audio_codec": audio_codec}
+
+def audio_mux_args(audio_codec: str):
+    """
+    Output args for the audio track: stream copy when the codec can go into
+    an MP4 as it is, otherwise a single AAC transcode.
+    """
+    if audio_codec in MP4_AUDIO_CODECS:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+def mux_audio(video_path: str, audio_path: str, output_path: str, duration: float, audio_codec: str):
+    """
+    Joins a silent video with the original audio file, copying the video
+    stream and the audio as well when possible (see audio_mux_args).
+    """
+    run_ffmpeg(
+        ["-i", video_path, "-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy"]
+        + audio_mux_args(audio_codec)
+        + ["-t", f"{duration:.3f}", "-movflags", "+faststart", output_path]
+    )
+
+def detect_silences(audio_path: str, noise_db: float = -35.0, min_duration: float = 0.4):
+    """
+    Runs ffmpeg's silencedetect over the audio and returns [(start, end), ...]
+    for every silence of at least 'min_duration' seconds below 'noise_db'.
+    """
+    stderr_text = run_ffmpeg(
+        ["-i", audio_path, "-vn", "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}", "-f", "null", "-"],
+        capture_stderr=True
+    )
+    silences = []
+    silence_start = None
+    for line in stderr_text.splitlines():
+        if "silence_start:" in line:
+            silence_start = float(line.split("silence_start:")[1].split()[0])
+        elif "silence_end:" in line and silence_start is not None:
+            silence_end = float(line.split("silence_end:")[1].split("|")[0].strip())
+            silences.append((max(0.0, silence_start), silence_end))
+            silence_start = None
+    return silences
+
+def decode_duration(path: str) -> float:
+    """
+    Length of the audio in seconds, measured by decoding the whole file (for
+    inputs with no duration in their header, see probe_media).
+    """
+    stderr_text = run_ffmpeg(["-i", path, "-vn", "-f", "null", "-"], capture_stderr=True)
+    # The last progress line holds the decoded length: "... time=00:01:02.50 ..."
+    position = stderr_text.rfind("time=")
+    if position < 0:
+        raise RuntimeError(f"Could not measure the duration of {path}")
+    hours, minutes, seconds = stderr_text[position + len("time="):].split()[0].split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
@@ -5,3 +5,38 @@ import pprint
 def pretty_print_api_response(response_data):
     pp = pprint.PrettyPrinter(indent=2, width=100)
     pp.pprint(response_data)
+
+import json
+def sse_event(event: str, data) -> str:
+    """
+    Formats one server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+import os
+import hashlib
+import threading
+_FILE_HASHES = {}
+_FILE_HASHES_LOCK = threading.Lock()
+def file_sha256(path: str) -> str:
+    """
+    Streaming SHA-256 of a file's content. Results are memoized per
+    (path, size, mtime), so unchanged files are only read once.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _FILE_HASHES_LOCK:
+        if memo_key in _FILE_HASHES:
+            return _FILE_HASHES[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+
+    with _FILE_HASHES_LOCK:
+        if len(_FILE_HASHES) > 4096:
+            _FILE_HASHES.clear()
+        _FILE_HASHES[memo_key] = value
+    return value
@@ -1,5 +1,115 @@
 import os
+import uuid
+import threading
+from collections import OrderedDict
+import numpy as np
 from PIL import Image
+from .global_utils import file_sha256
+from .cache_utils import DiskCache, cache_key
+
+# WebP derivatives served to the storyboard instead of the full-size PNGs
+DERIVATIVE_WIDTHS = {"thumb": 320, "preview": 960}
+DERIVATIVE_WEBP_QUALITY = 80
+DERIVATIVES_FOLDER = "derivatives"
+REFERENCE_WEBP_QUALITY = 90
+
+def _webp_mode(pil_img):
+    # Keep transparency where the source has it
+    return "RGBA" if pil_img.mode in ("RGBA", "LA", "P") else "RGB"
+
+def _derivative_paths(image_path):
+    digest = file_sha256(image_path)[:20]
+    folder = os.path.join(os.path.dirname(image_path), DERIVATIVES_FOLDER)
+    return {name: os.path.join(folder, f"{digest}-{name}.webp") for name in DERIVATIVE_WIDTHS}
+
+def image_derivative_paths(image_path):
+    """
+    {name: path} of the WebP derivatives already written for 'image_path'
+    (see write_image_derivatives); never writes any.
+    """
+    return {name: path for name, path in _derivative_paths(image_path).items() if os.path.isfile(path)}
+
+def write_image_derivatives(image_path):
+    """
+    Writes WebP versions of 'image_path' (one per DERIVATIVE_WIDTHS entry)
+    into a 'derivatives' folder next to it, and returns {name: path}.
+    Called wherever an image is written, so URLs only have to look them up.
+
+    Files are named by content hash, so an image that did not change (or an
+    _unused- backup of it) is never re-encoded, and a new version of a scene
+    gets a new URL that browsers can cache forever.
+    """
+    paths = _derivative_paths(image_path)
+    folder = os.path.join(os.path.dirname(image_path), DERIVATIVES_FOLDER)
+    missing = [name for name, path in paths.items() if not os.path.isfile(path)]
+    if not missing:
+        return paths
+
+    os.makedirs(folder, exist_ok=True)
+    with Image.open(image_path) as pil_img:
+        pil_img = pil_img.convert(_webp_mode(pil_img))
+        for name in missing:
+            width = min(DERIVATIVE_WIDTHS[name], pil_img.width)
+            height = max(1, round(pil_img.height * width / pil_img.width))
+            derivative = pil_img.resize((width, height), Image.LANCZOS) if width != pil_img.width else pil_img
+            # Write + rename, so concurrent requests never serve a partial file
+            tmp_path = f"{paths[name]}.{uuid.uuid4().hex[:8]}.tmp"
+            derivative.save(tmp_path, format="WEBP", quality=DERIVATIVE_WEBP_QUALITY, method=4)
+            os.replace(tmp_path, paths[name])
+    return paths
+
+class ReferenceImageCache(DiskCache):
+    """
+    Reference images prepared for images.edit uploads: downscaled so their
+    longest side is at most the requested output's, and re-encoded as WebP.
+    Prepared files are cached by (content hash, max side), so the reference
+    cards a story reuses for every scene are only prepared once.
+
+    stats() also reports the upload bytes saved.
+    """
+
+    suffix = ".webp"
+
+    def __init__(self, folder: str, max_bytes: int):
+        super().__init__(folder, max_bytes, name="reference")
+        self._saved_bytes = 0
+
+    def prepare(self, image_path: str, max_side: int):
+        """
+        Returns (path to upload, original bytes, upload bytes). The original
+        is kept when the prepared copy would not be smaller.
+        """
+        original_bytes = os.path.getsize(image_path)
+        path = self._path(cache_key("reference", file_sha256(image_path), max_side, REFERENCE_WEBP_QUALITY))
+        try:
+            os.utime(path)
+            hit = True
+        except FileNotFoundError:
+            hit = False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with Image.open(image_path) as pil_img:
+                pil_img = pil_img.convert(_webp_mode(pil_img))
+                pil_img.thumbnail((max_side, max_side), Image.LANCZOS)
+                pil_img.save(tmp_path, format="WEBP", quality=REFERENCE_WEBP_QUALITY, method=6)
+            self._commit(tmp_path, path)
+        prepared_bytes = os.path.getsize(path)
+
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+            if prepared_bytes >= original_bytes:
+                return image_path, original_bytes, original_bytes
+            self._saved_bytes += original_bytes - prepared_bytes
+        return path, original_bytes, prepared_bytes
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["saved_upload_bytes"] = self._saved_bytes
+        return stats
 
 def process_local_image(input_file_stream, output_path, target_width, target_height,
                         crop_x, crop_y, crop_w, crop_h,
@@ -11,7 +121,7 @@ def process_local_image(input_file_stream, output_path, target_width, target_hei
        so we must scale it to the original (native) image resolution.
     3) Crop at that bounding box.
     4) Resize the result to (target_width, target_height).
-    5) Save as PNG.
+    5) Save as PNG, and write its WebP derivatives (returned, see write_image_derivatives).
     """
     pil_img = Image.open(input_file_stream).convert("RGBA")
     orig_w, orig_h = pil_img.size
@@ -40,12 +150,13 @@ def process_local_image(input_file_stream, output_path, target_width, target_hei
     final_img = cropped.resize((target_width, target_height), Image.LANCZOS)
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     final_img.save(output_path, format="PNG")
+    return write_image_derivatives(output_path)
 
 def overlay_images(base_image_path, overlay_image_path, output_path, opacity_percent):
     """
     Overlays 'overlay_image_path' on top of 'base_image_path'
     with the given opacity (0..100).
-    Saves to output_path.
+    Saves to output_path and returns its WebP derivatives.
     """
     base_img = Image.open(base_image_path).convert("RGBA")
     overlay_img = Image.open(overlay_image_path).convert("RGBA")
@@ -65,3 +176,108 @@ def overlay_images(base_image_path, overlay_image_path, output_path, opacity_per
     result = Image.alpha_composite(base_img, overlay_copy)
 
     result.save(output_path, format="PNG")
+    return write_image_derivatives(output_path)
+
+SCALED_FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_SCALED_FRAMES = OrderedDict()
+_SCALED_FRAMES_BYTES = 0
+_SCALED_FRAMES_LOCK = threading.Lock()
+
+def load_scaled_frame(image_path, width, height, stats=None, crop=None):
+    """
+    Decodes 'image_path' and Lanczos-scales it to (width, height) ONCE,
+    returning a read-only RGB uint8 array ready to feed an ImageClip.
+    'crop' is an optional (x, y, w, h) box of the source to scale instead of
+    the whole image (see smart_crop_box).
+
+    Frames are cached by (content hash, width, height) in a size-bounded LRU,
+    so re-rendering a job reuses every unchanged scene without decoding it again.
+    Transparent pixels are composited over black, like the video background.
+
+    If a 'stats' dict is given, it counts "resize_calls" and "frame_cache_hits".
+    """
+    global _SCALED_FRAMES_BYTES
+    key = (file_sha256(image_path), width, height, crop)
+
+    with _SCALED_FRAMES_LOCK:
+        frame = _SCALED_FRAMES.get(key)
+        if frame is not None:
+            _SCALED_FRAMES.move_to_end(key)
+    if frame is not None:
+        if stats is not None:
+            stats["frame_cache_hits"] = stats.get("frame_cache_hits", 0) + 1
+        return frame
+
+    pil_img = Image.open(image_path)
+    if pil_img.mode != "RGB":
+        rgba = pil_img.convert("RGBA")
+        pil_img = Image.new("RGB", rgba.size, (0, 0, 0))
+        pil_img.paste(rgba, mask=rgba.split()[-1])
+
+    if crop:
+        x, y, w, h = crop
+        pil_img = pil_img.crop((x, y, x + w, y + h))
+
+    if pil_img.size != (width, height):
+        pil_img = pil_img.resize((width, height), Image.LANCZOS)
+        if stats is not None:
+            stats["resize_calls"] = stats.get("resize_calls", 0) + 1
+
+    frame = np.asarray(pil_img, dtype=np.uint8)
+    frame.setflags(write=False)
+
+    with _SCALED_FRAMES_LOCK:
+        if key not in _SCALED_FRAMES:
+            _SCALED_FRAMES[key] = frame
+            _SCALED_FRAMES_BYTES += frame.nbytes
+        while _SCALED_FRAMES_BYTES > SCALED_FRAME_CACHE_MAX_BYTES and len(_SCALED_FRAMES) > 1:
+            _, evicted = _SCALED_FRAMES.popitem(last=False)
+            _SCALED_FRAMES_BYTES -= evicted.nbytes
+    return frame
+
+SMART_CROP_ANALYSIS_WIDTH = 256
+# Share of the score that prefers the middle of the image, so flat images crop centered
+SMART_CROP_CENTER_WEIGHT = 0.25
+
+def smart_crop_box(image_path, width_fraction: float, height_fraction: float):
+    """
+    Picks the (x, y, w, h) box of 'width_fraction' x 'height_fraction' of the
+    image, in source pixels, that keeps the most detail. Detail is the
+    gradient energy of a small grayscale copy, and the window slides along
+    the one axis that is cropped. E.g. (0.316, 1.0) cuts a 9:16 frame out of
+    an image shown at 16:9.
+    """
+    with Image.open(image_path) as pil_img:
+        src_w, src_h = pil_img.size
+        scale = min(1.0, SMART_CROP_ANALYSIS_WIDTH / src_w)
+        small = pil_img.convert("L").resize(
+            (max(1, int(src_w * scale)), max(1, int(src_h * scale))), Image.BILINEAR
+        )
+
+    crop_w = max(1, min(src_w, int(round(src_w * width_fraction))))
+    crop_h = max(1, min(src_h, int(round(src_h * height_fraction))))
+    if crop_w == src_w and crop_h == src_h:
+        return (0, 0, src_w, src_h)
+
+    gray = np.asarray(small, dtype=np.float32)
+    energy = np.zeros_like(gray)
+    energy[:, 1:] += np.abs(np.diff(gray, axis=1))
+    energy[1:, :] += np.abs(np.diff(gray, axis=0))
+
+    # Energy profile along the cropped axis, and the window length on it
+    horizontal = crop_w < src_w
+    profile = energy.sum(axis=0 if horizontal else 1)
+    window = max(1, int(round((crop_w / src_w if horizontal else crop_h / src_h) * len(profile))))
+    sums = np.convolve(profile, np.ones(window), mode="valid")
+
+    positions = np.arange(len(sums))
+    span = max(1, len(sums) - 1)
+    center_bias = 1.0 - np.abs(positions - span / 2) / (span / 2 or 1)
+    score = (1 - SMART_CROP_CENTER_WEIGHT) * sums / (sums.max() or 1) + SMART_CROP_CENTER_WEIGHT * center_bias
+    best = int(np.argmax(score)) / max(1, len(profile))
+
+    if horizontal:
+        x = min(src_w - crop_w, int(round(best * src_w)))
+        return (x, 0, crop_w, crop_h)
+    y = min(src_h - crop_h, int(round(best * src_h)))
+    return (0, y, crop_w, crop_h)
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .global_utils import log
+
+class JobStore(ABC):
+    """
+    Interface of the job store (job_id -> JSON-serializable dict).
+
+    Dicts returned by get() are shared snapshots and must be treated as
+    read-only: every change goes through update() / set_item() /
+    append_item() / increment(), which write through to the backing store atomically, so
+    concurrent requests (or worker processes) never overwrite each other's
+    fields.
+    """
+
+    @abstractmethod
+    def create(self, job_id: str, data: dict):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str):
+        ...
+
+    def update(self, job_id: str, **fields):
+        return self._modify(job_id, lambda data: data.update(fields))
+
+    def set_item(self, job_id: str, field: str, index: int, value):
+        """
+        data[field][index] = value (e.g. one scene's prompt or image).
+        """
+        def apply(data):
+            items = list(data[field])
+            items[index] = value
+            data[field] = items
+        return self._modify(job_id, apply)
+
+    def append_item(self, job_id: str, field: str, value, unique: bool = True):
+        """
+        Appends value to data[field] (skipped if already present and 'unique').
+        Returns True if it was appended.
+        """
+        appended = []
+        def apply(data):
+            items = list(data.get(field) or [])
+            if unique and value in items:
+                return
+            items.append(value)
+            data[field] = items
+            appended.append(True)
+        self._modify(job_id, apply)
+        return bool(appended)
+
+    def increment(self, job_id: str, field: str, deltas: dict):
+        """
+        Adds 'deltas' to the numeric counters in data[field] (a dict, created
+        if missing), e.g. per-job token usage from concurrent calls.
+        """
+        def apply(data):
+            counters = dict(data.get(field) or {})
+            for name, delta in deltas.items():
+                counters[name] = round(counters.get(name, 0) + delta, 3)
+            data[field] = counters
+        return self._modify(job_id, apply)
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def _modify(self, job_id: str, apply):
+        ...
+
+class MemoryJobStore(JobStore):
+    """
+    Process-local store, for tests and single-process development.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, data: dict):
+        with self._lock:
+            self._jobs[job_id] = dict(data)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _modify(self, job_id: str, apply):
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(job_id)
+            data = dict(self._jobs[job_id])
+            apply(data)
+            self._jobs[job_id] = data
+            return data
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs persisted in a SQLite file, so they survive restarts and can be
+    served by several worker processes (e.g. gunicorn -w 4).
+
+    - Each job is one row holding its JSON document and a version counter.
+    - Writes run in a BEGIN IMMEDIATE transaction (read, modify, write), so
+      concurrent updates of different fields or list items never clash.
+    - Decoded jobs are kept in a small LRU; get() only pays a primary key
+      lookup of the version to check the cached copy is still current.
+    - Jobs not updated for 'ttl_seconds' are no longer returned by get(), and
+      are evicted on create() or when get() finds one expired.
+    """
+
+    def __init__(self, path: str, cache_size: int = 64, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+
+    def _conn(self):
+        # One connection per thread; autocommit mode, transactions are explicit
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, data: dict):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, version, updated_at) VALUES (?, ?, 1, ?)",
+            (job_id, json.dumps(data, separators=(",", ":")), now)
+        )
+        self._cache_put(job_id, 1, dict(data))
+        self.evict_expired()
+
+    def get(self, job_id: str):
+        row = self._conn().execute("SELECT version, updated_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            self._cache_drop(job_id)
+            return None
+        if row[1] < time.time() - self.ttl_seconds:
+            self.evict_expired()
+            return None
+
+        with self._cache_lock:
+            cached = self._cache.get(job_id)
+            if cached and cached[0] == row[0]:
+                self._cache.move_to_end(job_id)
+                return cached[1]
+
+        row = self._conn().execute("SELECT version, data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[1])
+        self._cache_put(job_id, row[0], data)
+        return data
+
+    def delete(self, job_id: str):
+        self._conn().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        self._cache_drop(job_id)
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._conn()
+        expired = [r[0] for r in conn.execute("SELECT job_id FROM jobs WHERE updated_at < ?", (cutoff,))]
+        if not expired:
+            return
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+        for job_id in expired:
+            self._cache_drop(job_id)
+        log(f"Evicted {len(expired)} expired jobs", "job_store_utils")
+
+    def _modify(self, job_id: str, apply):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version, data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            data = json.loads(row[1])
+            apply(data)
+            version = row[0] + 1
+            conn.execute(
+                "UPDATE jobs SET data = ?, version = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(data, separators=(",", ":")), version, time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._cache_put(job_id, version, data)
+        return data
+
+    def _cache_put(self, job_id: str, version: int, data: dict):
+        with self._cache_lock:
+            cached = self._cache.get(job_id)
+            if cached and cached[0] > version:
+                return
+            self._cache[job_id] = (version, data)
+            self._cache.move_to_end(job_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, job_id: str):
+        with self._cache_lock:
+            self._cache.pop(job_id, None)
+
+def create_job_store(url: str, **kwargs):
+    """
+    Builds a job store from a URL: "sqlite:///path/to/jobs.sqlite3" or "memory://".
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):], **kwargs)
+    if url.startswith("memory://"):
+        return MemoryJobStore()
+    raise ValueError(f"Unsupported job store URL: {url}")
@@ -0,0 +1,208 @@
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from .concurrency_utils import call_with_backoff
+
+# Rough list prices (USD) used for the cost estimate; unknown models count as 0
+CHAT_PRICES_PER_MTOK = {
+    # model: (input, cached input, output)
+    "o4-mini": (1.10, 0.275, 4.40),
+    "o3": (2.00, 0.50, 8.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+IMAGE_PRICES = {
+    # (model, quality): (square, landscape/portrait) per image
+    ("gpt-image-1", "low"): (0.011, 0.016),
+    ("gpt-image-1", "medium"): (0.042, 0.063),
+    ("gpt-image-1", "high"): (0.167, 0.25),
+}
+AUDIO_PRICES_PER_MINUTE = {"whisper-1": 0.006}
+
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+MAX_TRACKED_JOBS = 200
+
+_job = contextvars.ContextVar("metrics_job", default="")
+_stage = contextvars.ContextVar("metrics_stage", default="")
+
+@contextmanager
+def metrics_context(job_id: str = None, stage: str = None):
+    """
+    Labels every OpenAI call made inside the block with the job and stage
+    (e.g. "scene_prompt"). run_bounded carries the context into its worker
+    threads; other thread pools need it set inside the worker.
+    """
+    tokens = []
+    if job_id is not None:
+        tokens.append((_job, _job.set(job_id)))
+    if stage is not None:
+        tokens.append((_stage, _stage.set(stage)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+class APIMetrics:
+    """
+    In-process aggregation of OpenAI call metrics, by (endpoint, model, stage, job).
+
+    Only the MAX_TRACKED_JOBS most recent jobs keep their own series; older
+    ones are folded into job="_other" so the label set stays bounded.
+    Latency histograms are kept by (endpoint, stage) only.
+    """
+
+    COUNTERS = (
+        "requests", "errors", "retries", "duration_seconds",
+        "prompt_tokens", "cached_tokens", "completion_tokens", "reasoning_tokens",
+        "images", "audio_seconds", "cost_usd",
+    )
+
+    def __init__(self, max_jobs: int = MAX_TRACKED_JOBS):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._series = {}
+        self._jobs = OrderedDict()
+        self._histograms = {}
+
+    def record(self, endpoint: str, model: str, duration: float, values: dict, job: str = None, stage: str = None):
+        job = _job.get() if job is None else job
+        stage = _stage.get() if stage is None else stage
+        with self._lock:
+            if job:
+                self._jobs[job] = True
+                self._jobs.move_to_end(job)
+                while len(self._jobs) > self.max_jobs:
+                    self._fold_job(self._jobs.popitem(last=False)[0])
+
+            key = (endpoint, model or "", stage, job)
+            series = self._series.setdefault(key, dict.fromkeys(self.COUNTERS, 0))
+            series["requests"] += 1
+            series["duration_seconds"] += duration
+            for name, value in values.items():
+                series[name] += value
+
+            # Cumulative buckets (the last one is +Inf), then the sum
+            histogram = self._histograms.setdefault((endpoint, stage), [0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+
+    def _fold_job(self, job: str):
+        for key in [k for k in self._series if k[3] == job]:
+            series = self._series.pop(key)
+            other = self._series.setdefault(key[:3] + ("_other",), dict.fromkeys(self.COUNTERS, 0))
+            for name, value in series.items():
+                other[name] += value
+
+    def job_summary(self, job: str):
+        """
+        Per-stage totals of one job: {stage: {counter: value}}.
+        """
+        with self._lock:
+            summary = {}
+            for (endpoint, model, stage, series_job), series in self._series.items():
+                if series_job != job:
+                    continue
+                totals = summary.setdefault(stage or "other", dict.fromkeys(self.COUNTERS, 0))
+                for name, value in series.items():
+                    totals[name] += value
+            return summary
+
+    def prometheus_lines(self):
+        with self._lock:
+            series = sorted(self._series.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        for name in self.COUNTERS:
+            metric = f"openai_{name}_total" if name != "duration_seconds" else "openai_request_duration_seconds_sum"
+            lines.append(f"# TYPE {metric} counter")
+            for (endpoint, model, stage, job), values in series:
+                labels = _labels(endpoint=endpoint, model=model, stage=stage, job=job)
+                lines.append(f"{metric}{{{labels}}} {_number(values[name])}")
+
+        lines.append("# TYPE openai_request_latency_seconds histogram")
+        for (endpoint, stage), histogram in histograms:
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram):
+                labels = _labels(endpoint=endpoint, stage=stage, le=str(bound))
+                lines.append(f"openai_request_latency_seconds_bucket{{{labels}}} {count}")
+            labels = _labels(endpoint=endpoint, stage=stage)
+            lines.append(f"openai_request_latency_seconds_sum{{{labels}}} {_number(histogram[-1])}")
+            lines.append(f"openai_request_latency_seconds_count{{{labels}}} {histogram[-2]}")
+        return lines
+
+API_METRICS = APIMetrics()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+def _number(value):
+    return f"{value:.6f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+
+def estimate_cost(endpoint: str, model: str, values: dict, size: str = None, quality: str = None) -> float:
+    if endpoint == "chat" and model in CHAT_PRICES_PER_MTOK:
+        input_price, cached_price, output_price = CHAT_PRICES_PER_MTOK[model]
+        uncached = values.get("prompt_tokens", 0) - values.get("cached_tokens", 0)
+        return (
+            uncached * input_price
+            + values.get("cached_tokens", 0) * cached_price
+            + values.get("completion_tokens", 0) * output_price
+        ) / 1_000_000
+    if endpoint.startswith("images") and (model, quality) in IMAGE_PRICES:
+        square, rectangular = IMAGE_PRICES[(model, quality)]
+        width, _, height = (size or "").partition("x")
+        return values.get("images", 0) * (square if width == height else rectangular)
+    if endpoint == "audio.transcriptions" and model in AUDIO_PRICES_PER_MINUTE:
+        return values.get("audio_seconds", 0) / 60 * AUDIO_PRICES_PER_MINUTE[model]
+    return 0.0
+
+def usage_values(response) -> dict:
+    """
+    Token counters of a response's usage (chat or images), 0 when absent.
+    """
+    usage = getattr(response, "usage", None)
+    prompt_details = getattr(usage, "prompt_tokens_details", None)
+    completion_details = getattr(usage, "completion_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", 0) or 0,
+        "cached_tokens": getattr(prompt_details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0) or 0,
+        "reasoning_tokens": getattr(completion_details, "reasoning_tokens", 0) or 0,
+    }
+
+def call_openai(endpoint: str, fn, *args, **kwargs):
+    """
+    Calls fn(*args, **kwargs) through call_with_backoff and records wall time,
+    model, token usage, image count/size/quality, audio seconds, retries and
+    errors into API_METRICS, labelled with the current metrics_context.
+    """
+    model = kwargs.get("model")
+    retries = [0]
+    started_at = time.perf_counter()
+    try:
+        response = call_with_backoff(fn, *args, on_retry=lambda attempt, delay: retries.__setitem__(0, attempt), **kwargs)
+    except Exception:
+        API_METRICS.record(endpoint, model, time.perf_counter() - started_at, {"errors": 1, "retries": retries[0]})
+        raise
+    duration = time.perf_counter() - started_at
+
+    values = usage_values(response)
+    values["retries"] = retries[0]
+    if endpoint.startswith("images"):
+        values["images"] = len(getattr(response, "data", None) or [])
+    if endpoint == "audio.transcriptions":
+        values["audio_seconds"] = float(getattr(response, "duration", 0) or 0)
+    values["cost_usd"] = estimate_cost(endpoint, model, values, kwargs.get("size"), kwargs.get("quality"))
+
+    API_METRICS.record(endpoint, model, duration, values)
+    return response
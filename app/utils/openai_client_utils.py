@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+from collections import deque
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI
+from .global_utils import log
+from .fake_openai_utils import FakeOpenAI
+
+class OpenAIClientFactory:
+    """
+    App-scoped OpenAI client (created once in create_app).
+
+    One client means one httpx connection pool, so TLS connections to the API
+    are kept alive and reused between requests instead of being rebuilt by a
+    fresh OpenAI(...) per request. The client is built lazily on first use
+    (.env is read once, and again only while no key has been found).
+
+    The client makes no retries of its own: every call goes through
+    metrics_utils.call_openai, whose backoff (concurrency_utils.call_with_backoff)
+    owns the retries, so each one is counted in the "retries" metric.
+
+    With OPENAI_FAKE_LATENCY set (seconds), a FakeOpenAI with that latency is
+    returned instead, for tests and load experiments.
+
+    stats() reports request counts, new vs reused connections and latency.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 300.0,
+        latency_window: int = 500
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._new_connections = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def get(self):
+        """
+        Returns the shared client, or None if OPENAI_API_KEY is not set.
+        """
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None:
+                self._client = self._build()
+        return self._client
+
+    def _build(self):
+        load_dotenv()
+        fake_latency = os.getenv("OPENAI_FAKE_LATENCY", "")
+        if fake_latency:
+            log(f"Using FakeOpenAI with {fake_latency}s latency", "openai_client_utils")
+            return FakeOpenAI(latency=float(fake_latency))
+
+        api_key = os.getenv("OPENAI_API_KEY", "")
+        if not api_key:
+            return None
+
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            event_hooks={"request": [self._on_request], "response": [self._on_response]}
+        )
+        log(
+            f"Created shared OpenAI client (pool {self.max_connections}, keep-alive {self.max_keepalive_connections})",
+            "openai_client_utils"
+        )
+        return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def _on_request(self, request):
+        request.extensions["trace"] = self._trace
+        request.extensions["started_at"] = time.perf_counter()
+
+    def _on_response(self, response):
+        elapsed = time.perf_counter() - response.request.extensions.get("started_at", time.perf_counter())
+        with self._stats_lock:
+            self._requests += 1
+            if response.status_code >= 400:
+                self._errors += 1
+            self._latencies.append(elapsed)
+
+    def _trace(self, event_name, info):
+        # httpcore only connects when no idle pooled connection could be reused
+        if event_name == "connection.connect_tcp.complete":
+            with self._stats_lock:
+                self._new_connections += 1
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            requests = self._requests
+            new_connections = self._new_connections
+            errors = self._errors
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "requests": requests,
+            "errors": errors,
+            "new_connections": new_connections,
+            "reused_connections": max(0, requests - new_connections),
+            "connection_reuse_ratio": round(1 - new_connections / requests, 3) if requests else None,
+            "latency_p50_s": percentile(0.50),
+            "latency_p95_s": percentile(0.95),
+            "latency_max_s": round(latencies[-1], 3) if latencies else None,
+        }
@@ -1,11 +1,65 @@
 import requests
 import base64
 import json
+import time
 
 from openai import OpenAI
 from .global_utils import log, pretty_print_api_response
+from .metrics_utils import call_openai
+from .image_utils import write_image_derivatives
 
-def generate_title_and_description(client: OpenAI, full_text: str, text_model: str) -> dict:
+def usage_summary(usage, latency_s: float = 0.0) -> dict:
+    """
+    Flattens a chat completion's usage into plain counters, including the
+    prompt tokens the provider served from its prompt cache.
+    """
+    prompt_details = getattr(usage, "prompt_tokens_details", None)
+    completion_details = getattr(usage, "completion_tokens_details", None)
+    return {
+        "calls": 1,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(prompt_details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "reasoning_tokens": getattr(completion_details, "reasoning_tokens", 0) or 0,
+        "latency_s": round(latency_s, 3),
+    }
+
+def create_chat_completion(client: OpenAI, cache=None, bypass_cache: bool = False, on_usage=None, **request) -> str:
+    """
+    Runs client.chat.completions.create(**request) (with rate limit backoff)
+    and returns the stripped message content.
+
+    With an LLMResponseCache, identical requests (model, messages, reasoning
+    effort) are answered from disk. 'bypass_cache' forces a fresh call (e.g. a
+    "regenerate" click) whose answer then replaces the cached one.
+    on_usage(usage_summary(...)) is called after every API call.
+    """
+    key = None
+    if cache is not None:
+        key = cache.chat_key(request.get("model"), request.get("messages"), request.get("reasoning_effort"))
+        if not bypass_cache:
+            content = cache.get_completion(key)
+            if content is not None:
+                log(f"LLM cache hit ({request.get('model')})", "prompt_utils")
+                return content
+
+    started_at = time.perf_counter()
+    completion = call_openai("chat", client.chat.completions.create, **request)
+    if on_usage and getattr(completion, "usage", None) is not None:
+        on_usage(usage_summary(completion.usage, time.perf_counter() - started_at))
+    pretty_print_api_response(completion.choices[0])
+    content = completion.choices[0].message.content.strip()
+    if key and content:
+        cache.put_completion(key, content, getattr(completion, "usage", None))
+    return content
+
+def generate_title_and_description(
+    client: OpenAI,
+    full_text: str,
+    text_model: str,
+    cache=None,
+    bypass_cache: bool = False
+) -> dict:
     """
     Generates a short title & description in the same language as the provided story text.
     """
@@ -19,11 +73,13 @@ def generate_title_and_description(client: OpenAI, full_text: str, text_model: s
         "Now output only the two items with no newlines or extra commentary for each item, because it will be processed programmatically and needs to be just two lines, one for title:, and one for description:."
     )
     try:
-        response = client.chat.completions.create(
+        raw_output = create_chat_completion(
+            client,
+            cache=cache,
+            bypass_cache=bypass_cache,
             model=text_model,
             messages=[{"role": "user", "content": prompt_text}],
         )
-        raw_output = response.choices[0].message.content.strip()
         title = ""
         description = ""
         for line in raw_output.split("\n"):
@@ -40,13 +96,18 @@ def preprocess_story_data(
     client: OpenAI,
     full_story: str,
     text_model: str,
-    characters_prompt_style: str
+    characters_prompt_style: str,
+    cache=None,
+    bypass_cache: bool = False
 ) -> str:
     """
     Extract story ingredients from the text + incorporate characters_prompt_style.
     """
     try:
-        completion = client.chat.completions.create(
+        return create_chat_completion(
+            client,
+            cache=cache,
+            bypass_cache=bypass_cache,
             model=text_model,
             messages=[
                 {
@@ -74,8 +135,6 @@ def preprocess_story_data(
             ],
             reasoning_effort="high",
         )
-        pretty_print_api_response(completion.choices[0])
-        return completion.choices[0].message.content.strip()
     except Exception as e:
         log(f"Error calling story data preprocessor: {e}", "prompt_utils")
         return ""
@@ -88,13 +147,26 @@ def preprocess_image_prompt(
     scene_text: str,
     text_model: str,
     image_preprocessing_prompt: str,
-    characters_prompt_style: str
+    characters_prompt_style: str,
+    cache=None,
+    bypass_cache: bool = False,
+    on_usage=None
 ) -> str:
     """
     Incorporates characters_prompt_style as [character_types].
+    Rate limit errors are retried with backoff, since many scenes may be
+    preprocessed concurrently.
+
+    The developer message only holds what is the same for every scene of a
+    job, so it is a byte-identical prefix the provider can serve from its
+    prompt cache; the scene text comes last, in the user message.
     """
     try:
-        completion = client.chat.completions.create(
+        return create_chat_completion(
+            client,
+            cache=cache,
+            bypass_cache=bypass_cache,
+            on_usage=on_usage,
             model=text_model,
             messages=[
                 {
@@ -104,18 +176,20 @@ def preprocess_image_prompt(
                         + "\n"
                         f"[image_style] (important details):\n{style_prefix}\n\n"
                         f"[character_types] (important details, must not omit anything about them):\n{characters_prompt_style}\n\n"
-                        f"[story] (just for context):\n{full_story}\n\n"
                         f"[story_items_style] (important details context):\n{story_ingredients}\n\n"
-                        f"[current_sequence] (main focus for the final image, final prompt should be unique for current scene):\n{scene_text}"
+                        f"[story] (just for context):\n{full_story}"
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"[current_sequence] (main focus for the final image, final prompt should be unique for current scene):\n{scene_text}\n\n"
+                        "Generate the final image prompt now."
                     ),
                 },
-                {"role": "user", "content": "Generate the final image prompt now."},
             ],
             reasoning_effort="high",
         )
-        pretty_print_api_response(completion.choices[0])
-        refined_prompt = completion.choices[0].message.content.strip()
-        return refined_prompt
     except Exception as e:
         log(f"Error calling GPT for prompt preprocessing: {e}", "prompt_utils")
         fallback = f"{style_prefix} {scene_text}"
@@ -128,20 +202,30 @@ def generate_or_edit_image(
     width: int,
     height: int,
     quality: str,
-    output_path: str
+    output_path: str,
+    reference_cache=None,
+    on_references=None
 ):
     """
     If reference_paths is empty => generate
     If reference_paths is not empty => edit
     Using model="gpt-image-1", we get a Python object with .data[0].b64_json
-    (not JSON with "data" array). We'll decode & save to output_path.
+    (not JSON with "data" array). We'll decode & save to output_path, along
+    with its WebP thumbnail/preview (see write_image_derivatives) when they
+    can be written.
+
+    With a 'reference_cache' (ReferenceImageCache), references are uploaded as
+    downscaled WebP copies, and on_references({"files", "original_bytes",
+    "uploaded_bytes", "saved_bytes"}) is called after a successful edit.
     """
     log(f"Image generation/edit with prompt:\n{final_prompt}", "prompt_utils")
 
     try:
         if not reference_paths:
             # Normal generation
-            response = client.images.generate(
+            response = call_openai(
+                "images.generate",
+                client.images.generate,
                 model="gpt-image-1",
                 prompt=final_prompt,
                 size=f"{width}x{height}",
@@ -151,11 +235,24 @@ def generate_or_edit_image(
         else:
             # Edit with references
             pretty_print_api_response(reference_paths)
+            upload_paths = list(reference_paths)
+            upload_counters = {"files": len(upload_paths), "original_bytes": 0, "uploaded_bytes": 0, "saved_bytes": 0}
+            if reference_cache is not None:
+                upload_paths = []
+                for ref_path in reference_paths:
+                    upload_path, original_bytes, uploaded_bytes = reference_cache.prepare(ref_path, max(width, height))
+                    upload_paths.append(upload_path)
+                    upload_counters["original_bytes"] += original_bytes
+                    upload_counters["uploaded_bytes"] += uploaded_bytes
+                    upload_counters["saved_bytes"] += original_bytes - uploaded_bytes
+
             image_files = []
-            for ref_path in reference_paths:
-                image_files.append(open(ref_path, "rb"))
+            for upload_path in upload_paths:
+                image_files.append(open(upload_path, "rb"))
 
-            response = client.images.edit(
+            response = call_openai(
+                "images.edit",
+                client.images.edit,
                 model="gpt-image-1",
                 image=image_files,
                 prompt=final_prompt,
@@ -165,11 +262,19 @@ def generate_or_edit_image(
             image_base64 = response.data[0].b64_json
             for f in image_files:
                 f.close()
+            if reference_cache is not None and on_references:
+                on_references(upload_counters)
 
         image_bytes = base64.b64decode(image_base64)
         with open(output_path, "wb") as f:
             f.write(image_bytes)
-        return output_path
     except Exception as e:
         log(f"Error generating/editing image: {e}", "prompt_utils")
         return None
+
+    # The image is already paid for and saved; without derivatives it is served full size
+    try:
+        write_image_derivatives(output_path)
+    except Exception as e:
+        log(f"Could not write derivatives of {output_path}: {e}", "prompt_utils")
+    return output_path
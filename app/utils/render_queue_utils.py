@@ -0,0 +1,142 @@
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .global_utils import log
+
+class RenderQueue:
+    """
+    Bounded background pool for video renders.
+
+    - At most 'max_workers' renders run at the same time.
+    - At most 'max_queue' renders wait for a free worker; submit() refuses
+      anything beyond that so a burst of clicks can't pile up hours of work.
+    - Every render gets a short render_id whose phase/progress can be polled.
+    - Renders of the same job run one after the other (they share the job's
+      render cache folder): a render waits, without holding a worker, until
+      the job's previous one finished.
+
+    Renders run in worker threads: the ffmpeg engine does the heavy lifting in a
+    child process, so the Flask threads keep serving requests meanwhile.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, keep_finished: int = 200):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._renders = OrderedDict()
+        # job_id -> renders waiting for the job's running render, in order
+        self._job_waiting = {}
+
+    def submit(self, job_id: str, render_fn, /, **kwargs):
+        """
+        Queues render_fn(progress_callback=..., **kwargs), to run in a copy of
+        the caller's context variables (e.g. the Flask app context).
+        render_fn must return the output path (or any value stored as 'result',
+        e.g. a dict of the output URL and how it was rendered).
+        Returns the render_id, or None if the queue is full.
+        """
+        render_fn = functools.partial(contextvars.copy_context().run, render_fn)
+        with self._lock:
+            if self._count_phase("queued") >= self.max_queue:
+                return None
+
+            render_id = str(uuid.uuid4())[:8]
+            self._renders[render_id] = {
+                "render_id": render_id,
+                "job_id": job_id,
+                "phase": "queued",
+                "progress": 0.0,
+                "result": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._evict_finished()
+
+            waiting = self._job_waiting.get(job_id)
+            if waiting is None:
+                self._job_waiting[job_id] = []
+                self._executor.submit(self._run, render_id, render_fn, kwargs)
+            else:
+                waiting.append((render_id, render_fn, kwargs))
+        log(f"Queued render {render_id} for job {job_id}", "render_queue_utils")
+        return render_id
+
+    def status(self, render_id: str):
+        """
+        Returns a copy of the render record plus queue information, or None.
+        """
+        with self._lock:
+            record = self._renders.get(render_id)
+            if record is None:
+                return None
+            status = dict(record)
+            if record["phase"] == "queued":
+                queued_ids = [rid for rid, r in self._renders.items() if r["phase"] == "queued"]
+                status["queue_position"] = queued_ids.index(render_id) + 1
+            status.update(self._queue_info())
+        return status
+
+    def stats(self):
+        with self._lock:
+            return self._queue_info()
+
+    def _queue_info(self):
+        return {
+            "queue_depth": self._count_phase("queued"),
+            "active_renders": sum(
+                1 for r in self._renders.values() if r["phase"] not in ("queued", "done", "failed")
+            ),
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+    def _count_phase(self, phase: str):
+        return sum(1 for r in self._renders.values() if r["phase"] == phase)
+
+    def _evict_finished(self):
+        finished = [rid for rid, r in self._renders.items() if r["phase"] in ("done", "failed")]
+        for rid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._renders[rid]
+
+    def _update(self, render_id: str, **fields):
+        with self._lock:
+            record = self._renders.get(render_id)
+            if record is not None:
+                record.update(fields)
+
+    def _run(self, render_id: str, render_fn, kwargs):
+        with self._lock:
+            job_id = self._renders[render_id]["job_id"]
+        try:
+            self._run_render(render_id, render_fn, kwargs)
+        finally:
+            with self._lock:
+                waiting = self._job_waiting[job_id]
+                if waiting:
+                    self._executor.submit(self._run, *waiting.pop(0))
+                else:
+                    del self._job_waiting[job_id]
+
+    def _run_render(self, render_id: str, render_fn, kwargs):
+        self._update(render_id, phase="preparing", started_at=time.time())
+
+        def progress_callback(phase: str, percent: float):
+            self._update(render_id, phase=phase, progress=round(min(max(percent, 0.0), 100.0), 1))
+
+        try:
+            result = render_fn(progress_callback=progress_callback, **kwargs)
+        except Exception as e:
+            log(f"Render {render_id} failed: {e}", "render_queue_utils")
+            self._update(render_id, phase="failed", error=str(e), finished_at=time.time())
+            return
+
+        self._update(render_id, phase="done", progress=100.0, result=result, finished_at=time.time())
+        log(f"Render {render_id} done", "render_queue_utils")
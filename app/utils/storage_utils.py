@@ -0,0 +1,317 @@
+import os
+import re
+import time
+import shutil
+import threading
+from .global_utils import log, file_sha256
+
+# Files only kept as undo history: replaced scenes/cards and merged overlay uploads
+BACKUP_PATTERN = re.compile(r"(_unused-|_editref-)[0-9a-f]+\.\w+$|^overlay-[0-9a-f]+\.png$")
+# The only images routes re-create under the same name; never replaced by a hardlink
+SCENE_PATTERN = re.compile(r"^scene_\d+\.png$")
+CANCELLED_MARKER = ".cancelled"
+# Derivatives are written right after their image; don't race a write in progress
+DERIVATIVE_GRACE_SECONDS = 300
+
+class StorageManager:
+    """
+    Disk lifecycle of the project folders (app/static/projects/<job_id>).
+
+    - usage() / job_usage() report bytes per job (hardlinked files count once).
+    - check_quota() tells a route whether a job may write more: over its
+      'job_quota_bytes', or the projects over 'global_quota_bytes', a GC pass
+      is tried first and the quota only fails if that did not free enough.
+    - collect() removes backups (_unused-, _editref-, merged overlay-) older
+      than 'backup_ttl_seconds' that the job no longer lists as references,
+      WebP derivatives whose image is gone, render HLS streams older than
+      'backup_ttl_seconds' and folders of cancelled jobs (after
+      'cancel_grace_seconds', so a running render can finish). Identical
+      image files left are deduplicated as hardlinks.
+    - If 'orphan_ttl_seconds' is set, folders the job store no longer knows
+      (e.g. expired jobs) lose their backups, derivatives and render cache
+      once they are that old. Their videos and scene images are never removed.
+    - start() runs collect() every 'interval_seconds' in a daemon thread.
+
+    'get_job' maps a job_id to its job data (or None), e.g. JOB_STORE.get.
+    """
+
+    def __init__(
+        self,
+        projects_folder: str,
+        get_job,
+        job_quota_bytes: int,
+        global_quota_bytes: int,
+        backup_ttl_seconds: float = 24 * 3600,
+        orphan_ttl_seconds: float = 0,
+        cancel_grace_seconds: float = 600,
+        interval_seconds: float = 1800
+    ):
+        self.projects_folder = projects_folder
+        self.get_job = get_job
+        self.job_quota_bytes = job_quota_bytes
+        self.global_quota_bytes = global_quota_bytes
+        self.backup_ttl_seconds = backup_ttl_seconds
+        self.orphan_ttl_seconds = orphan_ttl_seconds
+        self.cancel_grace_seconds = cancel_grace_seconds
+        self.interval_seconds = interval_seconds
+
+        self._lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._usage = None
+        self._last_run = None
+        self._thread = None
+
+    def job_folder(self, job_id: str) -> str:
+        return os.path.join(self.projects_folder, job_id)
+
+    def job_usage(self, job_id: str) -> int:
+        seen = set()
+        total = 0
+        for root, _, files in os.walk(self.job_folder(job_id)):
+            for filename in files:
+                try:
+                    stat = os.stat(os.path.join(root, filename))
+                except OSError:
+                    continue
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        return total
+
+    def usage(self, refresh: bool = False):
+        """
+        {"total_bytes", "jobs": {job_id: bytes}}, from the last scan unless
+        'refresh' (a scan walks every project folder).
+        """
+        with self._lock:
+            if self._usage is not None and not refresh:
+                return self._usage
+        jobs = {job_id: self.job_usage(job_id) for job_id in self._job_ids()}
+        usage = {"total_bytes": sum(jobs.values()), "jobs": jobs}
+        with self._lock:
+            self._usage = usage
+        return usage
+
+    def stats(self):
+        usage = self.usage()
+        return {
+            "total_bytes": usage["total_bytes"],
+            "global_quota_bytes": self.global_quota_bytes,
+            "job_quota_bytes": self.job_quota_bytes,
+            "jobs": len(usage["jobs"]),
+            "last_collect": self._last_run,
+        }
+
+    def check_quota(self, job_id: str = None):
+        """
+        Returns None if the job (and all projects) are within their quotas,
+        otherwise an error message for the client.
+        """
+        if job_id:
+            if self.job_usage(job_id) > self.job_quota_bytes:
+                self.collect(job_ids=[job_id])
+                if self.job_usage(job_id) > self.job_quota_bytes:
+                    return f"Project storage quota exceeded ({self.job_quota_bytes // (1024 * 1024)} MB)"
+            else:
+                self._refresh_jobs([job_id])
+
+        if self.usage()["total_bytes"] > self.global_quota_bytes:
+            self.collect()
+            if self.usage()["total_bytes"] > self.global_quota_bytes:
+                return "Server storage is full, please try again later"
+        return None
+
+    def mark_cancelled(self, job_id: str):
+        """
+        Flags the job's folder for removal by the next collect() after the grace period.
+        """
+        folder = self.job_folder(job_id)
+        if os.path.isdir(folder):
+            with open(os.path.join(folder, CANCELLED_MARKER), "w") as f:
+                f.write(str(time.time()))
+
+    def collect(self, job_ids=None):
+        """
+        One GC pass over 'job_ids' (default: every project folder).
+        Returns {"removed_files", "removed_jobs", "deduplicated", "freed_bytes"}.
+        """
+        with self._collect_lock:
+            summary = {"removed_files": 0, "removed_jobs": 0, "deduplicated": 0, "freed_bytes": 0}
+            now = time.time()
+            for job_id in (job_ids if job_ids is not None else self._job_ids()):
+                folder = self.job_folder(job_id)
+                if self._cancelled(folder, now):
+                    summary["freed_bytes"] += self.job_usage(job_id)
+                    shutil.rmtree(folder, ignore_errors=True)
+                    summary["removed_jobs"] += 1
+                    continue
+                if self.orphan_ttl_seconds and self._orphaned(job_id, folder, now):
+                    self._collect_orphan(folder, now, summary)
+                    continue
+                images_folder = os.path.join(folder, "images")
+                if os.path.isdir(images_folder):
+                    self._collect_images(job_id, images_folder, now, summary)
+                streams_folder = os.path.join(folder, "stream")
+                if os.path.isdir(streams_folder):
+                    self._collect_streams(streams_folder, now, summary)
+
+            self._last_run = now
+            if job_ids is None:
+                self.usage(refresh=True)
+            else:
+                self._refresh_jobs(job_ids)
+
+        if any(summary.values()):
+            log(
+                f"Storage GC: {summary['removed_files']} files, {summary['removed_jobs']} jobs removed, "
+                f"{summary['deduplicated']} deduplicated, {summary['freed_bytes']} bytes freed",
+                "storage_utils"
+            )
+        return summary
+
+    def _refresh_jobs(self, job_ids):
+        # Updates the cached usage of a few jobs without rescanning the others
+        sizes = {job_id: self.job_usage(job_id) for job_id in job_ids}
+        with self._lock:
+            if self._usage is None:
+                return
+            jobs = dict(self._usage["jobs"])
+            for job_id, size in sizes.items():
+                if os.path.isdir(self.job_folder(job_id)):
+                    jobs[job_id] = size
+                else:
+                    jobs.pop(job_id, None)
+            self._usage = {"total_bytes": sum(jobs.values()), "jobs": jobs}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            try:
+                self.collect()
+            except Exception as e:
+                log(f"Storage GC failed: {e}", "storage_utils")
+
+    def _job_ids(self):
+        if not os.path.isdir(self.projects_folder):
+            return []
+        return [
+            name for name in os.listdir(self.projects_folder)
+            if os.path.isdir(os.path.join(self.projects_folder, name))
+        ]
+
+    def _cancelled(self, folder: str, now: float) -> bool:
+        marker = os.path.join(folder, CANCELLED_MARKER)
+        try:
+            return now - os.path.getmtime(marker) > self.cancel_grace_seconds
+        except OSError:
+            return False
+
+    def _orphaned(self, job_id: str, folder: str, now: float) -> bool:
+        if self.get_job(job_id) is not None:
+            return False
+        try:
+            return now - os.path.getmtime(folder) > self.orphan_ttl_seconds
+        except OSError:
+            return False
+
+    def _collect_orphan(self, folder: str, now: float, summary: dict):
+        # Only what can be rebuilt or was undo history; the user's output stays
+        images_folder = os.path.join(folder, "images")
+        if os.path.isdir(images_folder):
+            for filename in os.listdir(images_folder):
+                if BACKUP_PATTERN.search(filename):
+                    self._remove_if_older(os.path.join(images_folder, filename), now, summary)
+        for path in (os.path.join(images_folder, "derivatives"), os.path.join(folder, "render_cache")):
+            if not os.path.isdir(path):
+                continue
+            for root, _, files in os.walk(path):
+                for filename in files:
+                    self._remove_if_older(os.path.join(root, filename), now, summary)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _collect_images(self, job_id: str, images_folder: str, now: float, summary: dict):
+        job_data = self.get_job(job_id) or {}
+        referenced = {os.path.basename(r) for r in job_data.get("reference_images") or []}
+
+        # Stale backups
+        for filename in os.listdir(images_folder):
+            path = os.path.join(images_folder, filename)
+            if filename in referenced or not BACKUP_PATTERN.search(filename):
+                continue
+            self._remove_if_older(path, now - self.backup_ttl_seconds, summary)
+
+        # Identical images (e.g. an _editref- backup and the reference it came from);
+        # scene files come first so they are always the kept copy
+        images = {}
+        for filename in sorted(os.listdir(images_folder), key=lambda name: (not SCENE_PATTERN.match(name), name)):
+            path = os.path.join(images_folder, filename)
+            if not os.path.isfile(path) or filename.endswith(".tmp"):
+                continue
+            digest = file_sha256(path)
+            if digest not in images:
+                images[digest] = path
+            elif not SCENE_PATTERN.match(filename) and self._link(images[digest], path, summary):
+                summary["deduplicated"] += 1
+
+        # Derivatives are named "<hash prefix>-<name>.webp" (see write_image_derivatives)
+        derivatives_folder = os.path.join(images_folder, "derivatives")
+        if os.path.isdir(derivatives_folder):
+            for filename in os.listdir(derivatives_folder):
+                prefix = filename.split("-", 1)[0]
+                if not any(digest.startswith(prefix) for digest in images):
+                    self._remove_if_older(os.path.join(derivatives_folder, filename), now - DERIVATIVE_GRACE_SECONDS, summary)
+
+    def _collect_streams(self, streams_folder: str, now: float, summary: dict):
+        # A stream is only watched while its render runs; the MP4 holds the same video
+        for name in os.listdir(streams_folder):
+            path = os.path.join(streams_folder, name)
+            try:
+                if now - os.path.getmtime(path) <= self.backup_ttl_seconds:
+                    continue
+            except OSError:
+                continue
+            for root, _, files in os.walk(path):
+                for filename in files:
+                    try:
+                        summary["freed_bytes"] += os.path.getsize(os.path.join(root, filename))
+                    except OSError:
+                        pass
+            shutil.rmtree(path, ignore_errors=True)
+            summary["removed_files"] += 1
+
+    @staticmethod
+    def _remove_if_older(path: str, cutoff: float, summary: dict):
+        # A rename keeps the mtime but updates the ctime, so a fresh backup of an old image is kept
+        try:
+            stat = os.stat(path)
+            if max(stat.st_mtime, stat.st_ctime) > cutoff:
+                return
+            os.remove(path)
+        except OSError:
+            return
+        summary["removed_files"] += 1
+        if stat.st_nlink <= 1:
+            summary["freed_bytes"] += stat.st_size
+
+    @staticmethod
+    def _link(source: str, duplicate: str, summary: dict) -> bool:
+        # Images are never rewritten in place (scenes are renamed away first), so sharing an inode is safe
+        try:
+            source_stat = os.stat(source)
+            duplicate_stat = os.stat(duplicate)
+            if (source_stat.st_dev, source_stat.st_ino) == (duplicate_stat.st_dev, duplicate_stat.st_ino):
+                return False
+            tmp_path = f"{duplicate}.link.tmp"
+            os.link(source, tmp_path)
+            os.replace(tmp_path, duplicate)
+        except OSError:
+            return False
+        if duplicate_stat.st_nlink <= 1:
+            summary["freed_bytes"] += duplicate_stat.st_size
+        return True
@@ -1,21 +1,68 @@
 import os
+import json
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
 from moviepy import *
-from .global_utils import log
+from proglog import ProgressBarLogger
+from defaults import VIDEO_ENGINE
+from .global_utils import log, file_sha256
+from .image_utils import load_scaled_frame, write_image_derivatives, smart_crop_box
+from .ffmpeg_utils import (
+    build_slideshow_filter_graph,
+    build_rendition_filter_graph,
+    plan_frame_layout,
+    find_split_frames,
+    scene_cut_frames,
+    vfr_frame_count,
+    concat_segments,
+    probe_media,
+    audio_mux_args,
+    mux_audio,
+    streaming_output_args,
+    run_ffmpeg
+)
 
-def create_video_from_scenes(
-    chunks,
-    images_folder: str,
-    audio_path: str,
-    output_path: str,
-    width: int,
-    height: int,
-    fade_in=2.0,
-    fade_out=2.0,
-    crossfade_dur=4.0,
-    transition_displacement=0.0
-):
+VIDEO_FPS = 24
+VIDEO_ENGINES = ("ffmpeg", "moviepy")
+
+# Draft previews: for checking timing, not for publishing
+DRAFT_SCALE = 1 / 3
+DRAFT_FPS = 12
+DRAFT_PRESET = "ultrafast"
+DRAFT_CRF = 30
+
+# Scene motion: "static" stills, or a Ken Burns pan/zoom on every scene without its own motion
+MOTION_MODES = ("static", "kenburns")
+KEN_BURNS_ZOOM = 1.12
+KEN_BURNS_MAX_ZOOM = 2.0
+
+class _RenderProgressLogger(ProgressBarLogger):
     """
-    Builds the final MP4 video from chunk data and images.
+    Forwards MoviePy's progress bars to a progress_callback(phase, percent).
+    Only the frames are written by MoviePy ("frame_index" bar); the audio is muxed in afterwards.
+    """
+
+    def __init__(self, progress_callback):
+        super().__init__()
+        self.progress_callback = progress_callback
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if attr != "index":
+            return
+        total = self.bars[bar].get("total") or 0
+        percent = 100.0 * value / total if total else 0.0
+        if bar == "frame_index":
+            self.progress_callback("encoding", percent)
+
+def compute_scene_boundaries(chunks, total_duration: float, transition_displacement=0.0):
+    """
+    Turns chunk timings into the list of scene boundaries shared by every render engine.
 
     1) Removes any gap between consecutive chunks by stretching
        the previous chunk's end to the next chunk's start (so there is no silence/black screen).
@@ -23,29 +70,10 @@ def create_video_from_scenes(
     3) Builds an array of boundaries (start/end times for each chunk).
        The first boundary is 0, the last boundary is audio total_duration.
     4) Shifts every INTERNAL boundary by 'transition_displacement'.
-    5) Creates each ImageClip with .with_duration(...), .with_start(...), .resized(...).
-    6) Adds optional fade/crossfade transitions using fade_in, fade_out, crossfade_dur.
-    7) Composites all clips to match the final audio duration.
-    """
-
-    # --- Log the transition displacement explicitly ---
-    log(f"transition_displacement param: {transition_displacement:.2f}", "video_utils")
-
-    # --- Load the audio ---
-    log(f"Loading audio for final video... (audio_path={audio_path})", "video_utils")
-    try:
-        audio_clip = AudioFileClip(audio_path)
-    except Exception as e:
-        log(f"Error creating AudioFileClip: {e}", "video_utils")
-        raise
-
-    try:
-        total_duration = audio_clip.duration
-        log(f"Audio total duration: {total_duration:.2f}s", "video_utils")
-    except Exception as e:
-        log(f"Error retrieving audio duration: {e}", "video_utils")
-        raise
 
+    boundaries[i] => start time of chunk i; boundaries[i+1] => end time of chunk i.
+    Returns an empty list if there are no chunks.
+    """
     # --- 1) Remove gaps by stretching chunks ---
     for i in range(len(chunks) - 1):
         curr_end = float(chunks[i]["end"])
@@ -76,11 +104,9 @@ def create_video_from_scenes(
                 chunks[last_idx]["end"] = total_duration
 
     if not chunks:
-        log("No chunks to process. Exiting.", "video_utils")
-        return
+        return []
 
     # --- 3) Build boundaries array ---
-    # boundaries[i] => start time of chunk i; boundaries[i+1] => end time of chunk i.
     # Force boundaries[0] = 0.0
     n = len(chunks)
     boundaries = [0.0] * (n + 1)
@@ -118,8 +144,54 @@ def create_video_from_scenes(
         if boundaries[i] < boundaries[i-1]:
             boundaries[i] = boundaries[i-1]
 
-    # --- 5) Build scene clips using these boundaries ---
-    scene_clips = []
+    return boundaries
+
+def normalize_motion(motion):
+    """
+    Validates a scene motion {"zoom": [start, end], "pan": [[x, y], [x, y]]}
+    (missing keys: no zoom, centered). Zoom is clamped to 1..KEN_BURNS_MAX_ZOOM
+    and pan positions to 0..1, where 0 and 1 put the zoomed window against the
+    left/top or right/bottom edge. Returns None for a static scene, raises
+    ValueError if malformed.
+    """
+    if not motion:
+        return None
+    try:
+        zoom = [min(KEN_BURNS_MAX_ZOOM, max(1.0, float(z))) for z in motion.get("zoom", [1.0, 1.0])]
+        pan = [[min(1.0, max(0.0, float(v))) for v in point] for point in motion.get("pan", [[0.5, 0.5], [0.5, 0.5]])]
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid scene motion: {motion}")
+    if len(zoom) != 2 or len(pan) != 2 or any(len(point) != 2 for point in pan):
+        raise ValueError(f"Invalid scene motion: {motion}")
+    if zoom == [1.0, 1.0]:
+        return None
+    return {"zoom": zoom, "pan": pan}
+
+def default_scene_motion(index: int):
+    """
+    Ken Burns motion of scene 'index' in "kenburns" mode, cycling through a
+    zoom in, a left-to-right pan, a zoom out and a right-to-left pan.
+    """
+    return [
+        {"zoom": [1.0, KEN_BURNS_ZOOM], "pan": [[0.5, 0.5], [0.5, 0.5]]},
+        {"zoom": [KEN_BURNS_ZOOM, KEN_BURNS_ZOOM], "pan": [[0.0, 0.5], [1.0, 0.5]]},
+        {"zoom": [KEN_BURNS_ZOOM, 1.0], "pan": [[0.5, 0.5], [0.5, 0.5]]},
+        {"zoom": [KEN_BURNS_ZOOM, KEN_BURNS_ZOOM], "pan": [[1.0, 0.5], [0.0, 0.5]]},
+    ][index % 4]
+
+def build_scene_plan(chunks, boundaries, images_folder: str, crossfade_dur=4.0, motion="static"):
+    """
+    Describes every scene to render, independently of the render engine.
+
+    Each entry is a dict with the chunk index, the scene image path (None when
+    the image is missing), the start time, the clip duration (including the
+    outgoing crossfade), which fades apply to it and its "motion" (None for
+    a still): the chunk's own "motion" if it has one, otherwise
+    default_scene_motion in "kenburns" mode.
+    Scenes without a valid duration after shift/clamp are skipped.
+    """
+    n = len(chunks)
+    scene_plan = []
     for i in range(n):
         start_t = boundaries[i]
         end_t = boundaries[i+1]
@@ -138,7 +210,7 @@ def create_video_from_scenes(
         image_path = os.path.join(images_folder, f"scene_{i}.png")
         if not os.path.isfile(image_path):
             log(f"Warning: Missing image for chunk #{i} => {image_path}", "video_utils")
-            continue
+            image_path = None
 
         orig_start = float(chunks[i]["start"])
         orig_end   = float(chunks[i]["end"])
@@ -149,59 +221,650 @@ def create_video_from_scenes(
             "video_utils"
         )
 
+        if "motion" in chunks[i]:
+            scene_motion = normalize_motion(chunks[i]["motion"])
+        else:
+            scene_motion = default_scene_motion(i) if motion == "kenburns" else None
+
+        scene_plan.append({
+            "index": i,
+            "image_path": image_path,
+            "start": start_t,
+            "duration": final_duration,
+            "fade_in": i == 0,
+            "fade_out": i == (n - 1),
+            "crossfade_in": i > 0,
+            "crossfade_out": i < (n - 1),
+            "motion": scene_motion,
+        })
+
+    return scene_plan
+
+def create_video_from_scenes(
+    chunks,
+    images_folder: str,
+    audio_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    fade_in=2.0,
+    fade_out=2.0,
+    crossfade_dur=4.0,
+    transition_displacement=0.0,
+    engine=VIDEO_ENGINE,
+    progress_callback=None,
+    workers=1,
+    cache_folder=None,
+    render_stats=None,
+    draft=False,
+    vfr=False,
+    stream_folder=None,
+    renditions=None,
+    motion="static"
+):
+    """
+    Builds the final MP4 video from chunk data and images.
+
+    1) Computes the scene boundaries (see compute_scene_boundaries).
+    2) Builds the scene plan (see build_scene_plan).
+    3) Renders it with the selected engine:
+       - "ffmpeg": one ffmpeg xfade/fade filter graph over looped still images.
+       - "moviepy": one ImageClip per scene composited with CompositeVideoClip.
+       The default is the VIDEO_ENGINE from defaults.py. An engine that fails
+       raises its error: there is no fallback to the other one, as MoviePy
+       needs the same ffmpeg binary (probe_media, mux_audio).
+
+    workers > 1 (ffmpeg engine only) splits the timeline at scene cuts into that
+    many segments, encodes them in parallel ffmpeg processes and joins them with
+    a stream-copy concat.
+
+    cache_folder (ffmpeg engine only) enables the incremental render cache: the
+    timeline is cut at every scene cut, each segment is stored under a key made
+    of its image content hashes, timing, size and fade settings, and only the
+    segments whose key changed are encoded again.
+
+    progress_callback(phase, percent), if given, receives the render phase and
+    the percentage of frames encoded so far.
+
+    render_stats, if given, is a dict filled with per-render counters of the MoviePy path
+    (scenes, resize_calls, frame_cache_hits) so callers can check that every
+    scene image is scaled at most once, and with the "engine_used" that
+    actually wrote the video.
+
+    draft renders a quick preview to check the timing of fades and crossfades:
+    DRAFT_SCALE of the size at DRAFT_FPS, x264 'ultrafast', from the WebP
+    preview derivatives of the scene images (see write_image_derivatives)
+    instead of the full PNGs. Drafts always use the single-process ffmpeg
+    engine, without segments or the render cache.
+
+    vfr (ffmpeg engine only) writes a variable frame rate MP4: full-rate
+    frames only inside fades and crossfades, and the still holds between
+    them as a few long frames (see ffmpeg_utils.vfr_select_filter).
+
+    stream_folder (ffmpeg engine only) also publishes the render as a growing
+    HLS playlist of fragmented MP4 segments in that folder, so it can be
+    watched while it encodes (see ffmpeg_utils.streaming_output_args).
+    Streaming renders use the single-process engine, without segments or the
+    render cache.
+
+    renditions is an optional list of extra (width, height) sizes, each written
+    to rendition_path(output_path, width, height). A size with another aspect
+    than (width, height), e.g. a 1080x1920 vertical cut, shows a smart crop of
+    each scene as the main video frames it (see image_utils.smart_crop_box).
+    The ffmpeg engine renders all sizes in one single-process pass (each image
+    decoded once, one encoder per size); MoviePy renders them one by one.
+    Drafts ignore renditions.
+
+    motion "kenburns" pans/zooms every scene (see default_scene_motion); a
+    chunk's own "motion" (see normalize_motion) always applies. The ffmpeg
+    engine uses a 'zoompan' filter over a pre-upscaled image, MoviePy a
+    precomputed crop window per frame (see _ken_burns_clip).
+    """
+
+    # --- Log the transition displacement explicitly ---
+    log(f"transition_displacement param: {transition_displacement:.2f}", "video_utils")
+
+    if engine not in VIDEO_ENGINES:
+        log(f"Unknown render engine '{engine}', using {VIDEO_ENGINE}", "video_utils")
+        engine = VIDEO_ENGINE
+    if motion not in MOTION_MODES:
+        log(f"Unknown motion mode '{motion}', using static", "video_utils")
+        motion = "static"
+
+    if draft:
+        # Even dimensions, as yuv420p requires
+        width = max(2, int(round(width * DRAFT_SCALE / 2)) * 2)
+        height = max(2, int(round(height * DRAFT_SCALE / 2)) * 2)
+        engine, workers, cache_folder = "ffmpeg", 1, None
+        log(f"Draft render at {width}x{height}, {DRAFT_FPS} fps", "video_utils")
+
+    if vfr and engine != "ffmpeg":
+        log("VFR output needs the ffmpeg engine, rendering at a constant frame rate", "video_utils")
+
+    if stream_folder:
+        if engine == "ffmpeg":
+            os.makedirs(stream_folder, exist_ok=True)
+            if workers > 1 or cache_folder:
+                log("Streaming output renders in one process, without segment workers or the render cache", "video_utils")
+            workers, cache_folder = 1, None
+        else:
+            log("Streaming output needs the ffmpeg engine, writing the MP4 only", "video_utils")
+
+    renditions = [] if draft else list(dict.fromkeys(
+        (int(w), int(h)) for w, h in renditions or [] if (int(w), int(h)) != (width, height)
+    ))
+    if renditions:
+        log(f"Extra renditions: {', '.join(f'{w}x{h}' for w, h in renditions)}", "video_utils")
+        if workers > 1 or cache_folder:
+            log("Renditions render in one process, without segment workers or the render cache", "video_utils")
+        workers, cache_folder = 1, None
+
+    if render_stats is None:
+        render_stats = {}
+
+    render_stats["engine_used"] = engine
+    if engine == "ffmpeg":
+        return _render_with_ffmpeg(
+            chunks, images_folder, audio_path, output_path, width, height,
+            fade_in, fade_out, crossfade_dur, transition_displacement,
+            progress_callback, workers, cache_folder, draft, vfr, stream_folder, renditions, motion
+        )
+
+    result_path = _render_with_moviepy(
+        chunks, images_folder, audio_path, output_path, width, height,
+        fade_in, fade_out, crossfade_dur, transition_displacement,
+        progress_callback, render_stats, motion=motion
+    )
+    if result_path:
+        for rend_width, rend_height in renditions:
+            _render_with_moviepy(
+                chunks, images_folder, audio_path, rendition_path(output_path, rend_width, rend_height),
+                rend_width, rend_height, fade_in, fade_out, crossfade_dur, transition_displacement,
+                progress_callback, main_size=(width, height), motion=motion
+            )
+    return result_path
+
+def transcript_duration(chunks):
+    """
+    End of the last chunk, used as the audio length when the audio file
+    header has none (see probe_media). None without chunks.
+    """
+    ends = [chunk["end"] for chunk in chunks or [] if chunk.get("end") is not None]
+    return max(ends) if ends else None
+
+def rendition_path(output_path: str, width: int, height: int) -> str:
+    """
+    Where an extra rendition of 'output_path' is written: {name}-{width}x{height}.mp4.
+    """
+    root, ext = os.path.splitext(output_path)
+    return f"{root}-{width}x{height}{ext}"
+
+def _rendition_crops(scene_plan, main_width: int, main_height: int, width: int, height: int):
+    """
+    Per scene crop boxes for a (width, height) rendition of a video framed at
+    (main_width, main_height), or None when both have the same aspect. The
+    crop keeps the main video's stretch of the image, cut to the new aspect.
+    """
+    main_aspect = main_width / main_height
+    aspect = width / height
+    if abs(aspect / main_aspect - 1) < 0.01:
+        return None
+    width_fraction = min(1.0, aspect / main_aspect)
+    height_fraction = min(1.0, main_aspect / aspect)
+    return [
+        smart_crop_box(scene["image_path"], width_fraction, height_fraction) if scene["image_path"] else None
+        for scene in scene_plan
+    ]
+
+def _render_with_ffmpeg(
+    chunks,
+    images_folder: str,
+    audio_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    fade_in: float,
+    fade_out: float,
+    crossfade_dur: float,
+    transition_displacement: float,
+    progress_callback=None,
+    workers=1,
+    cache_folder=None,
+    draft=False,
+    vfr=False,
+    stream_folder=None,
+    renditions=None,
+    motion="static"
+):
+    """
+    Renders the whole timeline in a single ffmpeg process, or in parallel
+    (and optionally cached) segments. The audio duration and codec are read from the container
+    metadata (no decoding), and the audio track is attached straight from the uploaded file,
+    stream-copied when its codec fits in an MP4.
+    """
+    fps = DRAFT_FPS if draft else VIDEO_FPS
+    log(f"Probing audio for ffmpeg render... (audio_path={audio_path})", "video_utils")
+    audio_info = probe_media(audio_path, fallback_duration=transcript_duration(chunks))
+    total_duration = audio_info["duration"]
+    log(f"Audio total duration: {total_duration:.2f}s, codec: {audio_info['audio_codec']}", "video_utils")
+
+    boundaries = compute_scene_boundaries(chunks, total_duration, transition_displacement)
+    if not boundaries:
+        log("No chunks to process. Exiting.", "video_utils")
+        return
+
+    scene_plan = build_scene_plan(chunks, boundaries, images_folder, crossfade_dur, motion)
+    if not scene_plan:
+        log("No valid scene clips to build. Exiting.", "video_utils")
+        return
+
+    if draft:
+        scene_plan = [
+            {**scene, "image_path": write_image_derivatives(scene["image_path"])["preview"]}
+            if scene["image_path"] else scene
+            for scene in scene_plan
+        ]
+
+    if workers > 1 or cache_folder:
+        return _render_ffmpeg_segments(
+            scene_plan, audio_path, output_path, width, height,
+            fade_in, fade_out, crossfade_dur, total_duration,
+            workers, progress_callback, cache_folder, audio_info["audio_codec"], vfr
+        )
+
+    rendition_specs = [{"width": width, "height": height}] + [
+        {"width": w, "height": h, "crops": _rendition_crops(scene_plan, width, height, w, h)}
+        for w, h in renditions or []
+    ]
+    input_args, filter_complex, video_labels = build_rendition_filter_graph(
+        scene_plan, rendition_specs, fps,
+        fade_in, fade_out, crossfade_dur, total_duration,
+        vfr=vfr
+    )
+    audio_input_idx = sum(1 for arg in input_args if arg == "-i")
+    if vfr:
+        layout = plan_frame_layout(scene_plan, fps, crossfade_dur, total_duration)
+        total_frames = vfr_frame_count(scene_plan, layout, fps, fade_in, fade_out)
+        log(f"VFR render: {total_frames} of {layout['total_frames']} frames encoded", "video_utils")
+    else:
+        total_frames = max(1, int(round(total_duration * fps)))
+
+    on_frames = None
+    if progress_callback:
+        progress_callback("encoding", 0.0)
+        on_frames = lambda frames, total: progress_callback("encoding", 100.0 * frames / total)
+
+    if stream_folder:
+        log(f"Streaming HLS segments to: {stream_folder}", "video_utils")
+        main_output = streaming_output_args(output_path, stream_folder)
+    else:
+        main_output = ["-movflags", "+faststart", output_path]
+
+    # One encoder per rendition, all fed by the same filter graph
+    output_args = []
+    for r, (spec, video_label) in enumerate(zip(rendition_specs, video_labels)):
+        output_args += (
+            ["-map", f"[{video_label}]", "-map", f"{audio_input_idx}:a:0"]
+            + _video_encode_args(draft=draft, vfr=vfr)
+            + audio_mux_args(audio_info["audio_codec"])
+            + ["-t", f"{total_duration:.3f}"]
+        )
+        if r == 0:
+            output_args += main_output
+        else:
+            output_args += ["-movflags", "+faststart", rendition_path(output_path, spec["width"], spec["height"])]
+
+    log(f"Writing final video with ffmpeg engine to: {output_path}", "video_utils")
+    run_ffmpeg(
+        input_args
+        + ["-i", audio_path]
+        + ["-filter_complex", filter_complex]
+        + output_args,
+        progress_callback=on_frames,
+        total_frames=total_frames
+    )
+    return output_path
+
+def _video_encode_args(threads=None, draft=False, vfr=False):
+    """
+    Video encoder settings shared by every ffmpeg render, so independently
+    encoded segments can be joined with stream copy. With 'vfr' the frame
+    timestamps from the filter graph are kept instead of a constant rate.
+    """
+    rate = ["-fps_mode", "vfr"] if vfr else ["-r", str(DRAFT_FPS if draft else VIDEO_FPS)]
+    if draft:
+        args = ["-c:v", "libx264", "-pix_fmt", "yuv420p", *rate, "-preset", DRAFT_PRESET, "-crf", str(DRAFT_CRF)]
+    else:
+        args = ["-c:v", "libx264", "-pix_fmt", "yuv420p", *rate]
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+def _render_ffmpeg_segments(
+    scene_plan,
+    audio_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    fade_in: float,
+    fade_out: float,
+    crossfade_dur: float,
+    total_duration: float,
+    workers: int,
+    progress_callback=None,
+    cache_folder=None,
+    audio_codec=None,
+    vfr=False
+):
+    """
+    1) Splits the timeline at scene cuts (right after a crossfade, where only one
+       scene is on screen): into up to 'workers' windows, or at every scene cut
+       when the render cache is used.
+    2) Encodes every window as a silent segment in its own ffmpeg process, with
+       at most 'workers' processes at once sharing the CPU threads. Cached
+       segments whose key did not change are reused as they are.
+    3) Joins the segments with a stream-copy concat and muxes the audio in
+       (see audio_mux_args for 'audio_codec').
+    """
+    render_started = time.time()
+    layout = plan_frame_layout(scene_plan, VIDEO_FPS, crossfade_dur, total_duration)
+    if cache_folder:
+        cuts = scene_cut_frames(layout)
+    else:
+        cuts = find_split_frames(layout, workers)
+    edges = [0] + cuts + [layout["total_frames"]]
+    windows = list(zip(edges[:-1], edges[1:]))
+    # Frames each window's ffmpeg process outputs, for progress
+    if vfr:
+        window_frames = [
+            vfr_frame_count(scene_plan, layout, VIDEO_FPS, fade_in, fade_out, window) for window in windows
+        ]
+    else:
+        window_frames = [end - start for start, end in windows]
+    parallel = max(1, min(workers, len(windows)))
+    threads_per_segment = max(1, (os.cpu_count() or 1) // parallel)
+    log(
+        f"Segmented render: {len(windows)} segments, {parallel} in parallel, "
+        f"{threads_per_segment} threads each",
+        "video_utils"
+    )
+
+    frames_done = [0] * len(windows)
+    progress_lock = threading.Lock()
+    reused = []
+
+    def report_frames(k, frames):
+        with progress_lock:
+            frames_done[k] = frames
+            done = sum(frames_done)
+        if progress_callback:
+            progress_callback("encoding", 100.0 * done / sum(window_frames))
+
+    def render_window(k):
+        input_args, filter_complex, video_label = build_slideshow_filter_graph(
+            scene_plan, width, height, VIDEO_FPS,
+            fade_in, fade_out, crossfade_dur, total_duration,
+            window=windows[k], vfr=vfr
+        )
+
+        if cache_folder:
+            key = _segment_cache_key(input_args, filter_complex)
+            segment_path = os.path.join(cache_folder, f"segment-{key}.mp4")
+            if os.path.isfile(segment_path):
+                reused.append(k)
+                report_frames(k, window_frames[k])
+                return segment_path
+            # Encode under a temporary name so a failed render never leaves a broken cache entry
+            target_path = os.path.join(cache_folder, f"tmp-{key}.mp4")
+        else:
+            segment_path = os.path.join(segments_folder, f"segment_{k:04d}.mp4")
+            target_path = segment_path
+
+        run_ffmpeg(
+            input_args
+            + ["-filter_complex", filter_complex, "-map", f"[{video_label}]", "-an"]
+            + _video_encode_args(threads_per_segment, vfr=vfr)
+            + [target_path],
+            progress_callback=lambda frames, total: report_frames(k, frames),
+            total_frames=window_frames[k]
+        )
+        if target_path != segment_path:
+            os.replace(target_path, segment_path)
+        return segment_path
+
+    if cache_folder:
+        os.makedirs(cache_folder, exist_ok=True)
+        segments_folder = None
+    else:
+        segments_folder = tempfile.mkdtemp(prefix="segments-", dir=os.path.dirname(output_path) or None)
+    try:
+        if progress_callback:
+            progress_callback("encoding", 0.0)
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            segment_paths = list(pool.map(render_window, range(len(windows))))
+        if cache_folder:
+            log(f"Render cache: reused {len(reused)} of {len(windows)} segments", "video_utils")
+
+        if progress_callback:
+            progress_callback("muxing", 100.0)
+        log(f"Joining {len(segment_paths)} segments into: {output_path}", "video_utils")
+        concat_segments(
+            segment_paths,
+            output_path,
+            extra_inputs=["-i", audio_path],
+            output_args=[
+                "-map", "0:v:0",
+                "-map", "1:a:0",
+                "-c:v", "copy",
+            ]
+            + audio_mux_args(audio_codec)
+            + [
+                "-t", f"{total_duration:.3f}",
+                "-movflags", "+faststart",
+            ]
+        )
+    finally:
+        if segments_folder:
+            shutil.rmtree(segments_folder, ignore_errors=True)
+
+    if cache_folder:
+        _prune_render_cache(cache_folder, segment_paths, render_started)
+
+    return output_path
+
+def _segment_cache_key(input_args, filter_complex: str) -> str:
+    """
+    Render cache key of one segment. The filter graph already carries every
+    timing, size and fade detail of the window; the input images are identified
+    by content hash instead of path, so a regenerated scene_{i}.png changes
+    the key while a renamed-but-identical file does not.
+    """
+    image_hashes = [file_sha256(arg) for prev, arg in zip(input_args, input_args[1:]) if prev == "-i"]
+    payload = json.dumps({
+        "images": image_hashes,
+        "filter": filter_complex,
+        "encode": _video_encode_args(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _prune_render_cache(cache_folder: str, keep_paths, older_than: float):
+    """
+    Removes cached segments that the current timeline no longer uses.
+    Only segments last written before 'older_than' (the render start) are
+    removed, and never the tmp-* files of an encode in progress.
+    """
+    keep = {os.path.abspath(p) for p in keep_paths}
+    for filename in os.listdir(cache_folder):
+        path = os.path.abspath(os.path.join(cache_folder, filename))
+        if path in keep or filename.startswith("tmp-"):
+            continue
+        try:
+            if os.path.getmtime(path) < older_than:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _render_with_moviepy(
+    chunks,
+    images_folder: str,
+    audio_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    fade_in: float,
+    fade_out: float,
+    crossfade_dur: float,
+    transition_displacement: float,
+    progress_callback=None,
+    render_stats=None,
+    main_size=None,
+    motion="static"
+):
+    """
+    1) Creates each ImageClip from a pre-scaled frame (see image_utils.load_scaled_frame),
+       with .with_duration(...) and .with_start(...). With 'main_size' the video
+       is a rendition of one framed at that size (see _rendition_crops).
+    2) Adds optional fade/crossfade transitions using fade_in, fade_out, crossfade_dur.
+       Scenes with a motion get a _ken_burns_clip instead.
+    3) Composites all clips to match the final audio duration and writes them
+       as a silent video.
+    4) Muxes the original audio in with ffmpeg (see ffmpeg_utils.mux_audio),
+       so the audio is never decoded into memory.
+    """
+
+    # --- Probe the audio ---
+    log(f"Probing audio for final video... (audio_path={audio_path})", "video_utils")
+    try:
+        audio_info = probe_media(audio_path, fallback_duration=transcript_duration(chunks))
+        total_duration = audio_info["duration"]
+        log(f"Audio total duration: {total_duration:.2f}s, codec: {audio_info['audio_codec']}", "video_utils")
+    except Exception as e:
+        log(f"Error probing audio: {e}", "video_utils")
+        raise
+
+    boundaries = compute_scene_boundaries(chunks, total_duration, transition_displacement)
+    if not boundaries:
+        log("No chunks to process. Exiting.", "video_utils")
+        return
+
+    # --- Build scene clips using these boundaries ---
+    if render_stats is None:
+        render_stats = {}
+    render_stats.update({"scenes": 0, "resize_calls": 0, "frame_cache_hits": 0})
+    scene_clips = []
+    scene_plan = build_scene_plan(chunks, boundaries, images_folder, crossfade_dur, motion)
+    crops = _rendition_crops(scene_plan, *main_size, width, height) if main_size else None
+    for j, scene in enumerate(scene_plan):
+        i = scene["index"]
+        if not scene["image_path"]:
+            continue
+
         effects_list = []
-        # Resize
-        effects_list.append(vfx.Resize((width, height)))
         # Fade in on first scene
-        if i == 0 and fade_in > 0:
+        if scene["fade_in"] and fade_in > 0:
             effects_list.append(vfx.FadeIn(fade_in))
             log(f"Applying FadeIn({fade_in:.1f}) on scene #{i}", "video_utils")
         # CrossFadeIn if not first scene
-        if i > 0 and crossfade_dur > 0:
+        if scene["crossfade_in"] and crossfade_dur > 0:
             effects_list.append(vfx.CrossFadeIn(crossfade_dur))
             log(f"Applying CrossFadeIn({crossfade_dur:.1f}) on scene #{i}", "video_utils")
         # CrossFadeOut if not last scene
-        if i < (n - 1) and crossfade_dur > 0:
+        if scene["crossfade_out"] and crossfade_dur > 0:
             effects_list.append(vfx.CrossFadeOut(crossfade_dur))
             log(f"Applying CrossFadeOut({crossfade_dur:.1f}) on scene #{i}", "video_utils")
         # Fade out on last scene
-        if i == (n - 1) and fade_out > 0:
+        if scene["fade_out"] and fade_out > 0:
             effects_list.append(vfx.FadeOut(fade_out))
             log(f"Applying FadeOut({fade_out:.1f}) on last scene", "video_utils")
 
         log(f"Effects on clip #{i}: {[e.__class__.__name__ for e in effects_list]}", "video_utils")
 
         try:
+            crop = crops[j] if crops else None
+            if scene["motion"]:
+                clip = _ken_burns_clip(
+                    scene["image_path"], scene["motion"], width, height, scene["duration"], crop, render_stats
+                )
+            else:
+                # Decoded and scaled once, instead of a lazy per-frame vfx.Resize
+                clip = ImageClip(load_scaled_frame(scene["image_path"], width, height, stats=render_stats, crop=crop))
+            render_stats["scenes"] += 1
             clip = (
-                ImageClip(image_path)
-                .with_duration(final_duration)
+                clip
+                .with_duration(scene["duration"])
                 .with_effects(effects_list)
-                .with_start(start_t)
+                .with_start(scene["start"])
             )
             scene_clips.append(clip)
         except Exception as e:
             log(f"Error creating image clip #{i}: {e}", "video_utils")
             raise
 
+    log(
+        f"Scene frames: {render_stats['scenes']} scenes, {render_stats['resize_calls']} resize calls, "
+        f"{render_stats['frame_cache_hits']} frame cache hits",
+        "video_utils"
+    )
+
     if not scene_clips:
         log("No valid scene clips to build. Exiting.", "video_utils")
         return
 
-    # --- 6) Composite & attach audio, final output ---
+    # --- Composite, write the silent video, mux the audio in ---
+    root, ext = os.path.splitext(output_path)
+    silent_path = f"{root}-silent{ext}"
     try:
         log(f"Building CompositeVideoClip at {width}x{height}", "video_utils")
         final_clip = CompositeVideoClip(scene_clips, size=(width, height))
         # Force entire track to match total audio length
-        final_clip = final_clip.with_duration(total_duration).with_audio(audio_clip)
+        final_clip = final_clip.with_duration(total_duration)
 
-        log(f"Writing final video to: {output_path}", "video_utils")
+        log(f"Writing silent video to: {silent_path}", "video_utils")
         final_clip.write_videofile(
-            filename=output_path,
-            fps=24,
+            filename=silent_path,
+            fps=VIDEO_FPS,
             codec="libx264",
-            audio_codec="aac",
-            threads=4
+            audio=False,
+            threads=4,
+            logger=_RenderProgressLogger(progress_callback) if progress_callback else "bar"
         )
+
+        if progress_callback:
+            progress_callback("muxing", 100.0)
+        log(f"Muxing audio into final video: {output_path}", "video_utils")
+        mux_audio(silent_path, audio_path, output_path, total_duration, audio_info["audio_codec"])
     except Exception as e:
         log(f"Error during final video composition/writing: {e}", "video_utils")
         raise
+    finally:
+        if os.path.exists(silent_path):
+            os.remove(silent_path)
+
+    return output_path
+
+def _ken_burns_clip(image_path: str, motion, width: int, height: int, duration: float, crop=None, stats=None):
+    """
+    MoviePy clip of a still with a Ken Burns motion (see normalize_motion).
+    The image is scaled once to the output size times the largest zoom, and
+    the crop window of every frame is precomputed; each frame is then one
+    bilinear resize of its window, which takes fractional coordinates so
+    slow pans don't jitter.
+    """
+    max_zoom = max(motion["zoom"])
+    source_w, source_h = int(round(width * max_zoom)), int(round(height * max_zoom))
+    source = Image.fromarray(load_scaled_frame(image_path, source_w, source_h, stats=stats, crop=crop))
+
+    frames = max(1, int(round(duration * VIDEO_FPS)))
+    progress = np.linspace(0.0, 1.0, frames)
+    (zoom_start, zoom_end), ((x_start, y_start), (x_end, y_end)) = motion["zoom"], motion["pan"]
+    window_w = source_w / (zoom_start + (zoom_end - zoom_start) * progress)
+    window_h = source_h / (zoom_start + (zoom_end - zoom_start) * progress)
+    left = (source_w - window_w) * (x_start + (x_end - x_start) * progress)
+    top = (source_h - window_h) * (y_start + (y_end - y_start) * progress)
+    windows = np.stack([left, top, left + window_w, top + window_h], axis=1)
+
+    def frame_function(t):
+        k = min(frames - 1, int(round(t * VIDEO_FPS)))
+        return np.asarray(source.resize((width, height), Image.BILINEAR, box=tuple(windows[k])))
+
+    return VideoClip(frame_function, duration=duration)
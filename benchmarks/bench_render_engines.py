@@ -0,0 +1,101 @@
+"""
+Compares wall time and peak RSS of the ffmpeg and MoviePy render engines on a
+synthetic 50-scene project.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_render_engines [--scenes 50] [--scene-seconds 4] [--size 1920x1080] [--audio wav]
+
+"--engines ffmpeg-draft,ffmpeg" compares a draft preview render with the
+full one instead (the draft includes writing the WebP previews it renders from).
+"--engines ffmpeg-vfr,ffmpeg" compares the variable frame rate output, where
+the still holds are encoded as a few long frames, with the constant rate one.
+"--engines ffmpeg-kenburns,ffmpeg" (or moviepy-kenburns,moviepy) measures the
+cost of the Ken Burns pan/zoom against static scenes.
+
+"--audio m4a" (or mp3) narrates with an encoded file, which the renders mux in
+with stream copy; the default PCM wav is transcoded to AAC once.
+
+Each engine runs in a fresh child process, so peak RSS is not polluted by the
+other engine. A run rendered by another engine than asked is reported as failed.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_project import make_synthetic_project, peak_rss_mb, print_result, parse_result
+
+def run_engine(engine, folder, scenes, scene_seconds, width, height, audio_format):
+    from app.utils.video_utils import create_video_from_scenes
+
+    chunks, images_folder, audio_path = make_synthetic_project(folder, scenes, scene_seconds, audio_format=audio_format)
+    output_path = os.path.join(folder, f"bench-{engine}.mp4")
+
+    base_engine, _, mode = engine.partition("-")
+    render_stats = {}
+    t0 = time.perf_counter()
+    create_video_from_scenes(
+        chunks, images_folder, audio_path, output_path, width, height,
+        fade_in=1.5, fade_out=2.0, crossfade_dur=1.0,
+        engine=base_engine, draft=mode == "draft", vfr=mode == "vfr",
+        motion="kenburns" if mode == "kenburns" else "static", render_stats=render_stats
+    )
+    wall = time.perf_counter() - t0
+    # Only ever measure the engine asked for
+    if render_stats["engine_used"] != base_engine:
+        raise SystemExit(f"{engine} was rendered with {render_stats['engine_used']}, not measured")
+
+    print_result({
+        "engine": engine,
+        "wall_s": wall,
+        "peak_rss_mb": peak_rss_mb(),
+        "size_mb": os.path.getsize(output_path) / (1024 * 1024),
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--scene-seconds", type=float, default=4.0)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--engines", default="ffmpeg,moviepy")
+    parser.add_argument("--audio", default="wav", choices=("wav", "m4a", "mp3"))
+    parser.add_argument("--run-engine", help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    if args.run_engine:
+        run_engine(args.run_engine, args.folder, args.scenes, args.scene_seconds, width, height, args.audio)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Build the project once, outside of the measured processes
+        make_synthetic_project(folder, args.scenes, args.scene_seconds, audio_format=args.audio)
+
+        results = []
+        for engine in args.engines.split(","):
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_render_engines",
+                 "--run-engine", engine, "--folder", folder,
+                 "--scenes", str(args.scenes), "--scene-seconds", str(args.scene_seconds),
+                 "--size", args.size, "--audio", args.audio],
+                capture_output=True, text=True
+            )
+            result = parse_result(proc.stdout)
+            if result is None:
+                print(f"{engine}: failed\n{proc.stderr[-2000:]}")
+                continue
+            results.append(result)
+
+    print(f"\n{args.scenes} scenes x {args.scene_seconds:.1f}s at {args.size}, {args.audio} narration")
+    print(f"{'engine':<18}{'wall (s)':>12}{'peak RSS (MB)':>16}{'size (MB)':>12}")
+    for r in results:
+        print(f"{r['engine']:<18}{r['wall_s']:>12.2f}{r['peak_rss_mb']:>16.1f}{r['size_mb']:>12.2f}")
+    if len(results) == 2 and results[0]["wall_s"] > 0:
+        print(f"\nspeedup {results[0]['engine']} vs {results[1]['engine']}: "
+              f"{results[1]['wall_s'] / results[0]['wall_s']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures how the segmented ffmpeg render scales with the number of parallel
+segment workers on a synthetic project.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_segmented_scaling [--scenes 50] [--scene-seconds 4] [--workers 1,2,4,8]
+
+Speedups are relative to the single-process render (workers=1). They are
+bounded by the number of CPU cores of the machine running the benchmark.
+"""
+import argparse
+import copy
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_project import make_synthetic_project
+from app.utils.video_utils import create_video_from_scenes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=50)
+    parser.add_argument("--scene-seconds", type=float, default=4.0)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        chunks, images_folder, audio_path = make_synthetic_project(folder, args.scenes, args.scene_seconds)
+        for workers in (int(w) for w in args.workers.split(",")):
+            output_path = os.path.join(folder, f"bench-{workers}.mp4")
+            render_stats = {}
+            t0 = time.perf_counter()
+            create_video_from_scenes(
+                copy.deepcopy(chunks), images_folder, audio_path, output_path, width, height,
+                fade_in=1.5, fade_out=2.0, crossfade_dur=1.0, engine="ffmpeg", workers=workers,
+                render_stats=render_stats
+            )
+            if render_stats["engine_used"] != "ffmpeg":
+                raise SystemExit(f"workers={workers} was rendered with {render_stats['engine_used']}")
+            results.append((workers, time.perf_counter() - t0))
+
+    print(f"\n{args.scenes} scenes x {args.scene_seconds:.1f}s at {args.size}, {os.cpu_count()} CPU cores")
+    print(f"{'workers':<10}{'wall (s)':>12}{'speedup':>10}")
+    baseline = results[0][1]
+    for workers, wall in results:
+        print(f"{workers:<10}{wall:>12.2f}{baseline / wall:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Helpers to build a synthetic story project (scene images, narration audio and
+chunks) so the render paths can be benchmarked without calling OpenAI.
+"""
+import os
+import json
+import math
+import resource
+import struct
+import wave
+
+from PIL import Image, ImageDraw
+
+def make_synthetic_project(folder, scenes=50, scene_seconds=4.0, image_size=(1536, 1024), audio_format="wav"):
+    """
+    Writes images/scene_{i}.png and narration.wav into 'folder' and returns
+    (chunks, images_folder, audio_path). Images are cheap gradients with some
+    shapes so the encoder has real detail to work with. audio_format "m4a"
+    (AAC) or "mp3" also writes an encoded copy of the narration and returns
+    that one, like a typical upload.
+    """
+    images_folder = os.path.join(folder, "images")
+    os.makedirs(images_folder, exist_ok=True)
+
+    w, h = image_size
+    for i in range(scenes):
+        path = os.path.join(images_folder, f"scene_{i}.png")
+        if os.path.isfile(path):
+            continue
+        img = Image.new("RGB", (w, h))
+        draw = ImageDraw.Draw(img)
+        for y in range(0, h, 8):
+            shade = int(255 * y / h)
+            draw.rectangle([0, y, w, y + 8], fill=((shade + i * 37) % 256, (i * 53) % 256, 255 - shade))
+        for k in range(12):
+            x0 = (k * 131 + i * 71) % w
+            y0 = (k * 89 + i * 29) % h
+            draw.ellipse([x0, y0, x0 + 120, y0 + 120], fill=((k * 20) % 256, 200, (i * 9) % 256))
+        img.save(path, format="PNG")
+
+    total_duration = scenes * scene_seconds
+    audio_path = os.path.join(folder, "narration.wav")
+    if not os.path.isfile(audio_path):
+        rate = 16000
+        with wave.open(audio_path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            frames = bytearray()
+            for n in range(int(total_duration * rate)):
+                frames += struct.pack("<h", int(3000 * math.sin(2 * math.pi * 220 * n / rate)))
+            wav.writeframes(bytes(frames))
+
+    if audio_format != "wav":
+        from app.utils.ffmpeg_utils import run_ffmpeg
+
+        encoded_path = os.path.join(folder, f"narration.{audio_format}")
+        if not os.path.isfile(encoded_path):
+            codec = "aac" if audio_format == "m4a" else "libmp3lame"
+            run_ffmpeg(["-i", audio_path, "-c:a", codec, "-b:a", "128k", encoded_path])
+        audio_path = encoded_path
+
+    chunks = [
+        {"start": i * scene_seconds, "end": (i + 1) * scene_seconds, "text": f"Scene {i}"}
+        for i in range(scenes)
+    ]
+    return chunks, images_folder, audio_path
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and its waited-for children
+    (ffmpeg subprocesses included), in MB.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024.0
+
+def print_result(result):
+    """
+    Child processes report their measurements as a single JSON line.
+    """
+    print("RESULT " + json.dumps(result), flush=True)
+
+def parse_result(stdout):
+    for line in stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    return None
@@ -6,6 +6,41 @@ CROSSFADE_DUR            = 4.0
 FADE_IN                  = 1.5
 FADE_OUT                 = 2.0
 IMAGES_AI_QUALITY        = "high"
+VIDEO_ENGINE             = "ffmpeg"
+RENDER_MAX_WORKERS       = 2
+RENDER_MAX_QUEUE         = 8
+RENDER_SEGMENT_WORKERS   = 1
+RENDER_INCREMENTAL_CACHE = True
+RENDER_VFR               = False
+RENDER_STREAM            = False
+VIDEO_RENDITIONS         = ()
+VIDEO_MOTION             = "static"
+PREPROCESS_WORKERS       = 6
+MAX_PREPROCESS_WORKERS   = 16
+IMAGE_BATCH_WORKERS      = 4
+MAX_IMAGE_BATCH_WORKERS  = 8
+IMAGES_PER_MINUTE        = 20
+OPENAI_MAX_CONNECTIONS   = 20
+OPENAI_KEEPALIVE_POOL    = 10
+OPENAI_KEEPALIVE_EXPIRY  = 60.0
+OPENAI_CONNECT_TIMEOUT   = 10.0
+OPENAI_READ_TIMEOUT      = 300.0
+JOB_STORE_URL            = "sqlite:///instance/jobs.sqlite3"
+JOB_CACHE_SIZE           = 64
+JOB_TTL_HOURS            = 168
+CACHE_DIR                = "instance/cache"
+TRANSCRIPT_CACHE_MB      = 200
+TRANSCRIBE_SPLIT_SECONDS = 600
+TRANSCRIBE_WORKERS       = 4
+LLM_CACHE_ENABLED        = False
+LLM_CACHE_MB             = 100
+LLM_CACHE_TTL_HOURS      = 72
+REFERENCE_CACHE_MB       = 500
+STORAGE_JOB_QUOTA_MB     = 2048
+STORAGE_TOTAL_QUOTA_MB   = 20480
+STORAGE_BACKUP_TTL_HOURS = 24
+STORAGE_ORPHAN_TTL_HOURS = 0
+STORAGE_GC_MINUTES       = 30
 
 IMAGE_PROMPT_STYLE = (
 """A cinematic full-bleed illustration that fills the entire 16:9 frame, rendered in vivid yet soft colors. The aesthetic is whimsical, magical, and nostalgic, with a slightly dreamlike tone. The textures are gently painterly, blending traditional oil painting warmth with modern digital clarity — very realistic but not hyper-realistic. The environments are rich, detailed, and lively, with many small, creative, almost hidden funny unexpected details (playful surprises to make the final scene worth watching with attention). Lighting is natural and warm, evoking a serene, enchanted atmosphere full of quiet wonder and gentle storytelling."""
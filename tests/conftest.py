@@ -0,0 +1,74 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import create_app
+from app.utils.fake_openai_utils import FakeOpenAI
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app({
+        "TESTING": True,
+        "JOB_STORE_URL": "memory://",
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "IMAGES_PER_MINUTE": 0,
+        "LLM_CACHE_ENABLED": False,
+        "STORAGE_GC_MINUTES": 0,
+    })
+
+@pytest.fixture
+def job_store(app):
+    return app.extensions["job_store"]
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def fake_openai(app):
+    """
+    Installs a FakeOpenAI as the app's shared client; tests tune its latency
+    and rate limit errors through the returned instance.
+    """
+    fake = FakeOpenAI(latency=0.05)
+    app.extensions["openai_client"] = SimpleNamespace(get=lambda: fake)
+    return fake
+
+@pytest.fixture
+def job(job_store, tmp_path):
+    """
+    A job with six chunks, as left by /upload-audio and /extract-details.
+    """
+    chunk_count = 6
+    job_id = "testjob"
+    job_store.create(job_id, {
+        "audio_path": str(tmp_path / "audio.mp3"),
+        "full_text": "Once upon a time.",
+        "text_model": "gpt-4o-mini",
+        "images_ai_width": 64,
+        "images_ai_height": 48,
+        "images_ai_quality": "low",
+        "video_width": 64,
+        "video_height": 48,
+        "image_prompt_style": "Watercolor.",
+        "characters_prompt_style": "Simple shapes.",
+        "image_preprocessing_prompt": "Describe the scene.",
+        "story_ingredients": "A fox.",
+        "chunks": [{"text": f"Scene {i} text.", "start": i * 5.0, "end": (i + 1) * 5.0} for i in range(chunk_count)],
+        "images": [None] * chunk_count,
+        "prompts": [None] * chunk_count,
+        "job_folder": str(tmp_path / job_id),
+        "reference_images": []
+    })
+    return job_id
+
+def parse_sse(body: str):
+    """
+    [(event, data)] of a server-sent event stream.
+    """
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+from tests.conftest import parse_sse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_routes_has_no_side_effects(tmp_path):
+    script = (
+        "import os, threading\n"
+        "import app.routes\n"
+        "print(sorted(os.listdir('.')), threading.active_count())\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": ROOT}, check=True
+    )
+    assert result.stdout.split() == ["[]", "1"]
+
+def test_each_app_gets_its_own_services(tmp_path):
+    from app import create_app
+
+    config = {"JOB_STORE_URL": "memory://", "CACHE_DIR": str(tmp_path), "STORAGE_GC_MINUTES": 0}
+    first, second = create_app(config), create_app(config)
+    first.extensions["job_store"].create("a", {"title": "only in the first app"})
+
+    assert second.extensions["job_store"].get("a") is None
+    assert first.extensions["storage"]._thread is None
+
+def test_routes_read_their_settings_from_the_app_config(app, client, fake_openai, job):
+    app.config.update(PREPROCESS_WORKERS=1, WORDS_PER_SCENE=37)
+
+    assert 'value="37"' in client.get("/").get_data(as_text=True)
+    parse_sse(client.post("/preprocess-all", json={"job_id": job}).get_data(as_text=True))
+    assert fake_openai.max_in_flight == 1
@@ -0,0 +1,62 @@
+import json
+import subprocess
+
+import pytest
+
+from app.utils.ffmpeg_utils import FFMPEG_BINARY, probe_media, parse_ffmpeg_info, parse_ffprobe_json
+
+def write_tone(path, seconds, codec, fmt, piped=False):
+    """
+    Writes a sine tone. Written through a pipe, some containers (e.g. FLAC)
+    get no duration in their header, as with streamed uploads.
+    """
+    cmd = [FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi", "-i", f"sine=d={seconds}", "-c:a", codec, "-f", fmt]
+    if piped:
+        with open(path, "wb") as f:
+            subprocess.run(cmd + ["-"], stdout=f, check=True)
+    else:
+        subprocess.run(cmd + [str(path)], check=True)
+
+def test_probe_media_reads_duration_and_codec(tmp_path):
+    path = tmp_path / "tone.mp3"
+    write_tone(path, 3, "libmp3lame", "mp3")
+
+    info = probe_media(str(path))
+
+    assert info["duration"] == pytest.approx(3.0, abs=0.1)
+    assert info["audio_codec"] == "mp3"
+
+def test_probe_media_without_header_duration_uses_fallback(tmp_path):
+    path = tmp_path / "tone.flac"
+    write_tone(path, 3, "flac", "flac", piped=True)
+
+    with pytest.raises(RuntimeError):
+        probe_media(str(path))
+    info = probe_media(str(path), fallback_duration=2.9)
+    assert info == {"duration": 2.9, "audio_codec": "flac"}
+
+def test_parse_ffmpeg_info():
+    info = parse_ffmpeg_info(
+        "Input #0, mp3, from 'a.mp3':\n"
+        "  Duration: 00:01:02.50, start: 0.025057, bitrate: 128 kb/s\n"
+        "  Stream #0:0: Audio: mp3 (mp3float), 44100 Hz, stereo, fltp, 128 kb/s\n"
+    )
+    assert info == {"duration": 62.5, "audio_codec": "mp3"}
+
+    info = parse_ffmpeg_info(
+        "Input #0, matroska,webm, from 'pipe.mka':\n"
+        "  Duration: N/A, start: -0.023000, bitrate: N/A\n"
+        "  Stream #0:0: Audio: aac (LC), 44100 Hz, mono, fltp\n"
+    )
+    assert info == {"duration": None, "audio_codec": "aac"}
+
+def test_parse_ffprobe_json():
+    output = json.dumps({
+        "streams": [{"codec_type": "video", "codec_name": "h264"}, {"codec_type": "audio", "codec_name": "aac"}],
+        "format": {"duration": "12.345000"}
+    })
+    assert parse_ffprobe_json(output) == {"duration": 12.345, "audio_codec": "aac"}
+
+    output = json.dumps({"streams": [{"codec_type": "audio", "codec_name": "flac"}], "format": {"duration": "N/A"}})
+    assert parse_ffprobe_json(output) == {"duration": None, "audio_codec": "flac"}
+    assert parse_ffprobe_json(json.dumps({"format": {}})) == {"duration": None, "audio_codec": None}
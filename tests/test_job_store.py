@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from app.utils.job_store_utils import JobStore, SQLiteJobStore
+
+def test_incomplete_store_fails_when_created():
+    class NoDeleteStore(JobStore):
+        def create(self, job_id, data):
+            pass
+
+        def get(self, job_id):
+            return None
+
+        def _modify(self, job_id, apply):
+            pass
+
+    with pytest.raises(TypeError):
+        NoDeleteStore()
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("a", {"chunks": ["x", "y"], "usage": None})
+    store.set_item("a", "chunks", 1, "z")
+    store.increment("a", "usage", {"tokens": 3})
+
+    assert store.get("a") == {"chunks": ["x", "z"], "usage": {"tokens": 3}}
+    store.delete("a")
+    assert store.get("a") is None
+
+def test_sqlite_store_expires_jobs_on_get(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), ttl_seconds=0.2)
+    store.create("old", {"title": "old"})
+    assert store.get("old") == {"title": "old"}
+
+    time.sleep(0.3)
+
+    assert store.get("old") is None
+    assert store._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
@@ -0,0 +1,156 @@
+import httpx
+import pytest
+from openai import RateLimitError, APIConnectionError, InternalServerError
+
+from app.utils import prompt_utils
+from app.utils.concurrency_utils import call_with_backoff
+from app.utils.openai_client_utils import OpenAIClientFactory
+from tests.conftest import parse_sse
+
+def test_preprocess_all_streams_one_event_per_chunk_then_done(client, fake_openai, job, job_store):
+    response = client.post("/preprocess-all", json={"job_id": job, "concurrency": 3})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert response.mimetype == "text/event-stream"
+    assert [name for name, _ in events] == ["prompt"] * 6 + ["done"]
+    assert sorted(data["index"] for _, data in events[:-1]) == list(range(6))
+    assert events[-1][1]["completed"] == 6
+    assert events[-1][1]["failed"] == 0
+    assert fake_openai.calls["chat"] == 6
+    assert all(job_store.get(job)["prompts"])
+
+def test_preprocess_all_bounds_concurrency(client, fake_openai, job):
+    fake_openai.latency = 0.2
+    response = client.post("/preprocess-all", json={"job_id": job, "concurrency": 2})
+    parse_sse(response.get_data(as_text=True))
+
+    assert fake_openai.max_in_flight == 2
+
+def test_preprocess_all_only_given_chunks(client, fake_openai, job, job_store):
+    response = client.post("/preprocess-all", json={"job_id": job, "chunk_indexes": [1, 4]})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert sorted(data["index"] for name, data in events if name == "prompt") == [1, 4]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["completed"] == 2
+    assert job_store.get(job)["prompts"][0] is None
+
+def test_preprocess_all_retries_rate_limited_calls(client, fake_openai, job):
+    fake_openai.rate_limit_errors = 2
+    response = client.post("/preprocess-all", json={"job_id": job, "concurrency": 1})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert events[-1][1]["completed"] == 6
+    assert fake_openai.rate_limited == 2
+    assert fake_openai.calls["chat"] == 6
+
+def test_generate_images_batch_streams_images_then_done(client, fake_openai, job, job_store):
+    scenes = [{"scene_index": i, "prompt": f"Scene {i}"} for i in range(5)]
+    response = client.post("/generate-images-batch", json={"job_id": job, "scenes": scenes, "concurrency": 2})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert [name for name, _ in events] == ["image"] * 5 + ["done"]
+    assert sorted(data["scene_index"] for _, data in events[:-1]) == list(range(5))
+    assert all(data["thumb_url"].endswith("-thumb.webp") for _, data in events[:-1])
+    assert events[-1][1]["completed"] == 5
+    assert events[-1][1]["failed"] == 0
+    assert fake_openai.calls["images"] == 5
+    assert fake_openai.max_in_flight <= 2
+    assert all(job_store.get(job)["images"][:5])
+
+def test_generate_images_batch_bounds_concurrency(client, fake_openai, job):
+    fake_openai.latency = 0.2
+    scenes = [{"scene_index": i, "prompt": f"Scene {i}"} for i in range(6)]
+    response = client.post("/generate-images-batch", json={"job_id": job, "scenes": scenes, "concurrency": 3})
+    parse_sse(response.get_data(as_text=True))
+
+    assert fake_openai.max_in_flight == 3
+
+def test_generate_images_batch_rejects_invalid_scene(client, fake_openai, job):
+    response = client.post("/generate-images-batch", json={"job_id": job, "scenes": [{"scene_index": 99, "prompt": "x"}]})
+
+    assert response.status_code == 400
+    assert fake_openai.calls["images"] == 0
+
+def test_generate_images_batch_rejects_duplicate_scenes(client, fake_openai, job):
+    scenes = [{"scene_index": 1, "prompt": "x"}, {"scene_index": 1, "prompt": "y"}]
+    response = client.post("/generate-images-batch", json={"job_id": job, "scenes": scenes})
+
+    assert response.status_code == 400
+    assert fake_openai.calls["images"] == 0
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return RateLimitError("Rate limited", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+def test_call_with_backoff_retries_rate_limit_errors():
+    attempts = []
+    retries = []
+
+    def flaky(value):
+        attempts.append(value)
+        if len(attempts) < 3:
+            raise rate_limit_error("0")
+        return value * 2
+
+    result = call_with_backoff(flaky, 21, on_retry=lambda attempt, delay: retries.append((attempt, delay)))
+
+    assert result == 42
+    assert len(attempts) == 3
+    assert retries == [(1, 0.0), (2, 0.0)]
+
+def test_call_with_backoff_retries_connection_and_server_errors():
+    request = httpx.Request("POST", "https://api.openai.com/v1/images/generations")
+    errors = [
+        APIConnectionError(request=request),
+        InternalServerError("Bad gateway", response=httpx.Response(502, request=request), body=None),
+    ]
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert call_with_backoff(flaky, base_delay=0.001) == "ok"
+
+def test_shared_client_leaves_retries_to_call_openai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("OPENAI_FAKE_LATENCY", raising=False)
+
+    assert OpenAIClientFactory().get().max_retries == 0
+
+def test_call_with_backoff_gives_up_after_retries():
+    attempts = []
+
+    def always_limited():
+        attempts.append(1)
+        raise rate_limit_error()
+
+    with pytest.raises(RateLimitError):
+        call_with_backoff(always_limited, retries=2, base_delay=0.001)
+    assert len(attempts) == 3
+
+def test_call_with_backoff_raises_other_errors_right_away():
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_backoff(broken)
+    assert len(attempts) == 1
+
+def test_generated_image_is_kept_when_derivatives_fail(client, fake_openai, job, job_store, monkeypatch):
+    def fail(path):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(prompt_utils, "write_image_derivatives", fail)
+
+    response = client.post("/generate-images-batch", json={"job_id": job, "scenes": [{"scene_index": 0, "prompt": "x"}]})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert [name for name, _ in events] == ["image", "done"]
+    assert events[0][1]["image_url"].endswith("/scene_0.png")
+    assert "thumb_url" not in events[0][1]
+    assert job_store.get(job)["images"][0]
@@ -0,0 +1,144 @@
+import os
+import copy
+import inspect
+import time
+
+import pytest
+
+import defaults
+from app.utils import video_utils
+from benchmarks.synthetic_project import make_synthetic_project
+from app.utils.storage_utils import StorageManager
+
+@pytest.fixture
+def render_job(job_store, tmp_path):
+    folder = str(tmp_path / "renderjob")
+    chunks, _, audio_path = make_synthetic_project(folder, scenes=3, scene_seconds=2.0, image_size=(320, 180))
+    job_store.create("renderjob", {
+        "chunks": chunks,
+        "audio_path": audio_path,
+        "video_width": 160,
+        "video_height": 90,
+        "fade_in": 0.5,
+        "fade_out": 0.5,
+        "crossfade_dur": 0.5,
+        "transition_displacement": 0.0,
+        "job_folder": folder
+    })
+    return "renderjob"
+
+def wait_for_render(client, status_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(status_url).get_json()
+        if status["phase"] in ("done", "failed"):
+            return status
+        time.sleep(0.2)
+    raise AssertionError("Render did not finish")
+
+def test_render_reports_engine_and_uses_cache_without_stream(client, job_store, render_job):
+    response = client.post("/create-video", json={"job_id": render_job, "engine": "ffmpeg"})
+    data = response.get_json()
+
+    assert response.status_code == 202
+    assert "stream_url" not in data
+    status = wait_for_render(client, data["status_url"])
+    assert status["phase"] == "done", status
+    assert status["engine_used"] == "ffmpeg"
+    job_data = job_store.get(render_job)
+    assert job_data["video_engine"] == "ffmpeg"
+    assert os.listdir(os.path.join(job_data["job_folder"], "render_cache"))
+
+def test_failed_ffmpeg_render_is_reported_not_rerendered(client, job_store, render_job, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("ffmpeg failed")
+    monkeypatch.setattr(video_utils, "_render_with_ffmpeg", fail)
+    monkeypatch.setattr(video_utils, "_render_with_moviepy", fail)
+
+    data = client.post("/create-video", json={"job_id": render_job, "engine": "ffmpeg"}).get_json()
+    status = wait_for_render(client, data["status_url"])
+
+    assert status["phase"] == "failed"
+    assert status["error"] == "ffmpeg failed"
+    assert "video_path" not in job_store.get(render_job)
+
+def test_unknown_engine_is_rejected(client, render_job):
+    response = client.post("/create-video", json={"job_id": render_job, "engine": "gstreamer"})
+
+    assert response.status_code == 400
+
+def test_render_defaults_to_the_configured_engine():
+    engine = inspect.signature(video_utils.create_video_from_scenes).parameters["engine"].default
+    assert engine == defaults.VIDEO_ENGINE
+
+def test_render_leaves_the_stored_chunks_alone(client, job_store, render_job):
+    # A gap after the first chunk, which the renderer closes on its own copy
+    job_store.set_item(render_job, "chunks", 0, {**job_store.get(render_job)["chunks"][0], "end": 1.5})
+    chunks = copy.deepcopy(job_store.get(render_job)["chunks"])
+
+    data = client.post("/create-video", json={"job_id": render_job, "engine": "ffmpeg"}).get_json()
+
+    assert wait_for_render(client, data["status_url"])["phase"] == "done"
+    assert job_store.get(render_job)["chunks"] == chunks
+
+def test_stream_render_is_opt_in(client, job_store, render_job):
+    data = client.post("/create-video", json={"job_id": render_job, "engine": "ffmpeg", "stream": True}).get_json()
+
+    assert data["stream_url"].endswith("/master.m3u8")
+    assert wait_for_render(client, data["status_url"])["phase"] == "done"
+    streams = os.listdir(os.path.join(job_store.get(render_job)["job_folder"], "stream"))
+    assert len(streams) == 1
+
+    # The next render drops the earlier playlist
+    data = client.post("/create-video", json={"job_id": render_job, "engine": "ffmpeg"}).get_json()
+    assert wait_for_render(client, data["status_url"])["phase"] == "done"
+    assert os.listdir(os.path.join(job_store.get(render_job)["job_folder"], "stream")) == []
+
+def test_storage_gc_removes_old_streams(tmp_path):
+    streams = tmp_path / "projects" / "job1" / "stream"
+    for name in ("old", "new"):
+        (streams / name).mkdir(parents=True)
+        (streams / name / "index.m3u8").write_text("#EXTM3U\n")
+    two_days_ago = time.time() - 2 * 24 * 3600
+    os.utime(streams / "old", (two_days_ago, two_days_ago))
+
+    storage = StorageManager(
+        str(tmp_path / "projects"), lambda job_id: {"reference_images": []},
+        job_quota_bytes=1 << 30, global_quota_bytes=1 << 30, backup_ttl_seconds=24 * 3600
+    )
+    storage.collect()
+
+    assert os.listdir(streams) == ["new"]
+
+@pytest.mark.parametrize("size", ["0x90", "-160x90", "161x90", "160x91", "wide"])
+def test_invalid_rendition_sizes_are_rejected(client, render_job, size):
+    response = client.post("/create-video", json={"job_id": render_job, "renditions": [size]})
+
+    assert response.status_code == 400
+
+def test_rendition_of_the_main_size_is_skipped(client, job_store, render_job):
+    data = client.post("/create-video", json={
+        "job_id": render_job, "engine": "ffmpeg", "renditions": ["160x90", "96x160", "96x160"]
+    }).get_json()
+
+    assert list(data["rendition_urls"]) == ["96x160"]
+    assert wait_for_render(client, data["status_url"])["phase"] == "done"
+    rendition_paths = job_store.get(render_job)["rendition_paths"]
+    assert list(rendition_paths) == ["96x160"]
+    assert os.path.isfile(rendition_paths["96x160"])
+
+@pytest.mark.parametrize("chunk_index", [-1, 3, "0", None])
+def test_scene_motion_rejects_invalid_chunk_index(client, job_store, render_job, chunk_index):
+    chunks = job_store.get(render_job)["chunks"]
+    response = client.post("/scene-motion", json={
+        "job_id": render_job, "chunk_index": chunk_index, "motion": {"zoom": [1.0, 1.2]}
+    })
+
+    assert response.status_code == 400
+    assert job_store.get(render_job)["chunks"] == chunks
+
+def test_scene_motion_sets_one_scene(client, job_store, render_job):
+    response = client.post("/scene-motion", json={"job_id": render_job, "chunk_index": 2, "motion": {"zoom": [1.0, 1.2]}})
+
+    assert response.status_code == 200
+    assert [("motion" in chunk) for chunk in job_store.get(render_job)["chunks"]] == [False, False, True]
@@ -0,0 +1,70 @@
+import os
+import time
+
+from app.utils.storage_utils import StorageManager
+
+def make_project(projects, job_id):
+    folder = projects / job_id
+    (folder / "images" / "derivatives").mkdir(parents=True)
+    (folder / "render_cache").mkdir()
+    (folder / "final_video.mp4").write_bytes(b"video")
+    (folder / "images" / "scene_0.png").write_bytes(b"scene")
+    (folder / "images" / "scene_0_unused-0123abcd.png").write_bytes(b"old scene")
+    (folder / "images" / "derivatives" / "0123abcd-scene_0_thumb.webp").write_bytes(b"thumb")
+    (folder / "render_cache" / "segment.mp4").write_bytes(b"segment")
+    two_weeks_ago = time.time() - 14 * 24 * 3600
+    for root, dirs, files in os.walk(folder, topdown=False):
+        for name in dirs + files:
+            os.utime(os.path.join(root, name), (two_weeks_ago, two_weeks_ago))
+    os.utime(folder, (two_weeks_ago, two_weeks_ago))
+    return folder
+
+def make_storage(projects, **kwargs):
+    return StorageManager(
+        str(projects), lambda job_id: None,
+        job_quota_bytes=1 << 30, global_quota_bytes=1 << 30, backup_ttl_seconds=30 * 24 * 3600, **kwargs
+    )
+
+def test_collect_keeps_folders_unknown_to_the_store(tmp_path):
+    folder = make_project(tmp_path, "oldjob")
+
+    summary = make_storage(tmp_path).collect()
+
+    assert summary["removed_jobs"] == 0
+    assert (folder / "final_video.mp4").read_bytes() == b"video"
+    assert (folder / "images" / "scene_0.png").exists()
+    assert (folder / "render_cache" / "segment.mp4").exists()
+
+def test_orphan_cleanup_only_removes_rebuildable_files(tmp_path):
+    folder = make_project(tmp_path, "oldjob")
+
+    make_storage(tmp_path, orphan_ttl_seconds=7 * 24 * 3600).collect()
+
+    assert (folder / "final_video.mp4").read_bytes() == b"video"
+    assert sorted(os.listdir(folder / "images")) == ["scene_0.png"]
+    assert not (folder / "render_cache").exists()
+
+def test_cancelled_job_is_removed_after_grace(tmp_path):
+    folder = make_project(tmp_path, "cancelled")
+    storage = make_storage(tmp_path, cancel_grace_seconds=0)
+    storage.mark_cancelled("cancelled")
+    os.utime(folder / ".cancelled", (time.time() - 1, time.time() - 1))
+
+    assert storage.collect()["removed_jobs"] == 1
+    assert not folder.exists()
+
+def test_overlay_is_refused_over_quota(app, client, job, job_store, tmp_path):
+    images = tmp_path / job / "images"
+    images.mkdir(parents=True)
+    (images / "scene_0.png").write_bytes(b"scene")
+    (images / "overlay-0123abcd.png").write_bytes(b"overlay")
+    app.extensions["storage"] = StorageManager(
+        str(tmp_path), job_store.get, job_quota_bytes=1, global_quota_bytes=1 << 30
+    )
+
+    response = client.post("/overlay-scene-image", json={
+        "job_id": job, "scene_index": 0, "overlay_filename": "overlay-0123abcd.png"
+    })
+
+    assert response.status_code == 507
+    assert sorted(os.listdir(images)) == ["overlay-0123abcd.png", "scene_0.png"]
@@ -0,0 +1,118 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.audio_utils import chunk_transcript
+
+def baseline_chunk_transcript(whisper_data, words_per_scene):
+    """
+    The chunking as it was before the prefix-sum timeline, kept verbatim as
+    the reference the new implementation must match.
+    """
+    segments = whisper_data.segments
+    if not segments:
+        return []
+
+    last_end = 0.0
+    for seg in segments:
+        if seg.start > last_end:
+            gap = seg.start - last_end
+            seg.start = last_end
+            seg.end -= gap
+        last_end = seg.end
+
+    chunks = []
+    current_chunk = []
+    current_word_count = 0
+    chunk_start = None
+
+    for seg in segments:
+        seg_word_count = len(seg.text.strip().split())
+        if chunk_start is None:
+            chunk_start = seg.start
+        if current_word_count + seg_word_count >= words_per_scene and current_word_count > 0:
+            chunks.append({
+                "start": chunk_start,
+                "end": current_chunk[-1].end,
+                "text": " ".join(s.text.strip() for s in current_chunk)
+            })
+            current_chunk = [seg]
+            current_word_count = seg_word_count
+            chunk_start = seg.start
+        else:
+            current_chunk.append(seg)
+            current_word_count += seg_word_count
+
+    if current_chunk:
+        chunks.append({
+            "start": chunk_start,
+            "end": current_chunk[-1].end,
+            "text": " ".join(s.text.strip() for s in current_chunk)
+        })
+    return chunks
+
+def assert_same_chunks(segments, words_per_scene):
+    whisper_data = SimpleNamespace(segments=[SimpleNamespace(**seg) for seg in segments])
+    expected = baseline_chunk_transcript(whisper_data, words_per_scene)
+    assert chunk_transcript(segments, words_per_scene) == expected
+
+def words(count, tag="w"):
+    return " " + " ".join(f"{tag}{k}" for k in range(count))
+
+def random_segments(rng, count):
+    segments = []
+    t = rng.uniform(0.0, 2.0)
+    for _ in range(count):
+        length = rng.uniform(0.5, 6.0)
+        segments.append({"start": t, "end": t + length, "text": words(rng.choice([0, 1, 3, 7, 12, 30]))})
+        # Some segments follow right away, some after a silent gap
+        t += length + rng.choice([0.0, 0.0, rng.uniform(0.1, 3.0)])
+    return segments
+
+@pytest.mark.parametrize("words_per_scene", [1, 5, 10, 25, 60])
+def test_chunking_matches_baseline_on_random_transcripts(words_per_scene):
+    rng = random.Random(words_per_scene)
+    for count in (1, 2, 5, 20, 80):
+        assert_same_chunks(random_segments(rng, count), words_per_scene)
+
+def test_chunking_of_empty_transcript():
+    assert chunk_transcript([], 10) == []
+    assert_same_chunks([], 10)
+
+def test_chunking_with_empty_segments():
+    segments = [
+        {"start": 0.5, "end": 1.0, "text": ""},
+        {"start": 1.0, "end": 2.0, "text": "   "},
+        {"start": 2.5, "end": 4.0, "text": words(4)},
+        {"start": 4.0, "end": 4.5, "text": ""},
+        {"start": 5.0, "end": 7.0, "text": words(6)},
+        {"start": 7.0, "end": 7.2, "text": ""},
+    ]
+    for words_per_scene in (1, 4, 5, 10, 11):
+        assert_same_chunks(segments, words_per_scene)
+
+def test_chunking_of_one_long_segment():
+    segments = [{"start": 3.0, "end": 95.0, "text": words(400)}]
+    for words_per_scene in (1, 10, 400, 1000):
+        assert_same_chunks(segments, words_per_scene)
+    assert len(chunk_transcript(segments, 10)) == 1
+
+def test_chunking_at_words_per_scene_boundary():
+    # A chunk closes before the segment that would make it reach words_per_scene,
+    # so 5 + 5 and 9 + 1 words with words_per_scene=10 stay apart
+    segments = [
+        {"start": 0.0, "end": 2.0, "text": words(5)},
+        {"start": 2.0, "end": 4.0, "text": words(5)},
+        {"start": 4.0, "end": 6.0, "text": words(9)},
+        {"start": 6.0, "end": 6.5, "text": words(1)},
+        {"start": 6.5, "end": 8.0, "text": words(10)},
+    ]
+    for words_per_scene in (4, 5, 6, 9, 10, 11, 20):
+        assert_same_chunks(segments, words_per_scene)
+    assert [len(c["text"].split()) for c in chunk_transcript(segments, 10)] == [5, 5, 9, 1, 10]
+
+def test_chunking_does_not_modify_segments():
+    segments = [{"start": 1.0, "end": 2.0, "text": " a b "}, {"start": 4.0, "end": 5.0, "text": " c "}]
+    chunk_transcript(segments, 2)
+    assert segments == [{"start": 1.0, "end": 2.0, "text": " a b "}, {"start": 4.0, "end": 5.0, "text": " c "}]
@@ -0,0 +1,94 @@
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import audio_utils
+from app.utils.audio_utils import audio_duration, load_transcript, plan_audio_pieces, transcribe_audio_split
+from app.utils.fake_openai_utils import FakeOpenAI
+from app.utils.ffmpeg_utils import FFMPEG_BINARY
+
+def write_narration(path, seconds, silences=(), codec="flac", fmt="flac"):
+    """
+    Writes a tone with the given (start, end) silences, piped so that the
+    container header has no duration, as with streamed uploads.
+    """
+    mute = "+".join(f"between(t,{start},{end})" for start, end in silences) or "0"
+    cmd = [
+        FFMPEG_BINARY, "-v", "error", "-y", "-f", "lavfi", "-i", f"sine=f=220:d={seconds}",
+        "-af", f"volume=enable='{mute}':volume=0", "-c:a", codec, "-f", fmt, "-"
+    ]
+    with open(path, "wb") as f:
+        subprocess.run(cmd, stdout=f, check=True)
+
+def test_audio_duration_decodes_when_the_header_has_none(tmp_path):
+    path = str(tmp_path / "narration.flac")
+    write_narration(path, 4)
+
+    assert audio_duration(path) == pytest.approx(4.0, abs=0.05)
+
+def test_load_transcript_splits_audio_without_header_duration(tmp_path):
+    path = str(tmp_path / "narration.flac")
+    write_narration(path, 25, silences=[(9.0, 10.0)])
+    client = FakeOpenAI(latency=0)
+
+    transcript = load_transcript(client, path, split_seconds=10, workers=2)
+
+    assert client.calls["transcriptions"] == 3
+    assert transcript["segments"][0]["start"] == 0.0
+    assert transcript["segments"][-1]["end"] == pytest.approx(25.0, abs=0.1)
+
+def test_plan_audio_pieces_cuts_at_silences():
+    pieces = plan_audio_pieces(25.0, [(9.0, 10.0), (19.8, 20.6)], 10.0)
+    # 9.5 is a silence midpoint; no silence in [17, 19.5], so a hard cut there
+    assert pieces == [(0.0, 9.5), (9.5, 19.5), (19.5, 25.0)]
+
+def test_transcribe_audio_split_shifts_segments_by_piece_start(monkeypatch, tmp_path):
+    audio_path = str(tmp_path / "long.mp3")
+    monkeypatch.setattr(audio_utils, "audio_duration", lambda path: 25.0)
+    monkeypatch.setattr(audio_utils, "detect_silences", lambda path: [(9.0, 10.0), (19.8, 20.6)])
+
+    def fake_run_ffmpeg(args, **kwargs):
+        open(args[-1], "wb").close()
+    monkeypatch.setattr(audio_utils, "run_ffmpeg", fake_run_ffmpeg)
+
+    def fake_transcribe(client, piece_path, model):
+        i = int(os.path.basename(piece_path)[len("piece_"):-len(".mp3")])
+        # The last segment runs past the piece end, as Whisper sometimes reports
+        return SimpleNamespace(
+            text=f" piece {i} ",
+            segments=[
+                SimpleNamespace(start=0.0, end=4.0, text=f" first {i}"),
+                SimpleNamespace(start=4.5, end=12.0, text=f" second {i}"),
+            ]
+        )
+    monkeypatch.setattr(audio_utils, "transcribe_audio", fake_transcribe)
+
+    transcript = transcribe_audio_split(None, audio_path, max_piece_seconds=10.0, workers=3)
+
+    assert transcript["text"] == "piece 0 piece 1 piece 2"
+    assert transcript["segments"] == [
+        {"start": 0.0, "end": 4.0, "text": " first 0"},
+        {"start": 4.5, "end": 9.5, "text": " second 0"},
+        {"start": 9.5, "end": 13.5, "text": " first 1"},
+        {"start": 14.0, "end": 19.5, "text": " second 1"},
+        {"start": 19.5, "end": 23.5, "text": " first 2"},
+        {"start": 24.0, "end": 25.0, "text": " second 2"},
+    ]
+
+def test_transcribe_audio_split_with_a_fake_client(tmp_path):
+    path = str(tmp_path / "narration.mp3")
+    write_narration(path, 25, silences=[(9.0, 10.0)], codec="libmp3lame", fmt="mp3")
+    client = FakeOpenAI(latency=0)
+
+    transcript = transcribe_audio_split(client, path, max_piece_seconds=10.0, workers=3)
+
+    # Cut in the middle of the silence, then a hard cut 10s later; each piece's
+    # transcript starts over at 0 and is shifted by the piece start
+    assert client.calls["transcriptions"] == 3
+    piece_starts = [seg["start"] for seg in transcript["segments"] if seg["text"].startswith(" Fake words from 0 ")]
+    assert piece_starts == pytest.approx([0.0, 9.5, 19.5], abs=0.1)
+    starts = [seg["start"] for seg in transcript["segments"]]
+    assert starts == sorted(starts)
+    assert transcript["segments"][-1]["end"] == pytest.approx(25.0, abs=0.1)